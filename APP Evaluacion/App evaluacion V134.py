@@ -1,14 +1,29 @@
 # -*- coding: utf-8 -*-
 import math
+import os
+import uuid
 from pathlib import Path
-from typing import Dict, List
-import io
-import pandas as pd
+from typing import Dict, List, Mapping
 
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import date, datetime, timedelta
-from PIL import Image
-import base64
+
+import assets
+import branding
+import calculadora
+import peso_pagina
+import subidas
+import tema
+from evaluacion_core import almacen, catalogo, cotizaciones, exportacion, precios, tiempos, trabajos
+from evaluacion_core.catalogo import config_pais
+from evaluacion_core.combos import P3_FLAGS, combos_por_flags
+from evaluacion_core.composicion import (
+    CIERRE_RESULTADOS, INTRO_RESULTADOS, edad_aproximada, edad_desde_fecha, rango_grasa_tabla,
+)
+from evaluacion_core.composicion import narrativa as narrativa_composicion
+from evaluacion_core.composicion import resultados as resultados_composicion
 
 # -------------------------------------------------------------
 # Configuración de página (TIENE QUE SER LO PRIMERO DE STREAMLIT)
@@ -23,533 +38,72 @@ APP_DIR = Path(__file__).parent.resolve()
 # Ruta del logo
 logo_path = Path(__file__).parent / "logo.png"
 
-# Convertir el logo a base64 (para incrustarlo en HTML)
-if logo_path.exists():
-    with open(logo_path, "rb") as f:
-        logo_base64 = base64.b64encode(f.read()).decode()
+@st.cache_resource(show_spinner=False)
+def _logo_src():
+    # Se construye una vez por proceso; cada rerun sólo envía la URL/etiqueta
+    return branding.src_logo(logo_path, bool(st.get_option("server.enableStaticServing")))
 
-    st.markdown(
-        f"""
-        <style>
-        [data-testid="stAppViewContainer"] {{
-            position: relative;
-        }}
-        .logo-fixed {{
-            position: fixed;
-            top: 40px;
-            right: 25px;
-            width: 160px;
-            z-index: 1000;
-        }}
-        </style>
-        <img src="data:image/png;base64,{logo_base64}" class="logo-fixed">
-        """,
-        unsafe_allow_html=True
-    )
+if logo_path.exists():
+    st.markdown(branding.html_logo(_logo_src()), unsafe_allow_html=True)
 else:
     st.warning("⚠️ No se encontró el archivo 'logo.png' en la carpeta del proyecto.")
 
-# =========================
-# Forzar estilo del botón "Guardar y continuar"
-# =========================
-st.markdown("""
-<style>
-[data-testid="stFormSubmitButton"] > button {
-    background-color: #3A6B64 !important;   /* mismo verde que la barra lateral */
-    color: #ffffff !important;              /* texto blanco puro */
-    border: none !important;
-    border-radius: 999px !important;
-    font-weight: 700 !important;            /* mismo grosor que la barra lateral */
-    font-family: "Source Sans Pro", sans-serif !important;  /* misma fuente Streamlit */
-    letter-spacing: 0.3px !important;       /* mismo espaciado */
-    font-size: 1rem !important;
-    padding: 0.75rem 1.2rem !important;     /* corregido con ceros */
-    width: 100% !important;
-    box-shadow: 0px 2px 4px rgba(0,0,0,0.15) !important;
-    transition: all 0.2s ease-in-out !important;
-    text-transform: none !important;
-}
-
-/* Hover: tono más oscuro */
-[data-testid="stFormSubmitButton"] > button:hover {
-    background-color: #2F5A53 !important;
-    color: #ffffff !important;
-    transform: translateY(-1px);
-}
-
-/* Focus: borde verde menta */
-[data-testid="stFormSubmitButton"] > button:focus {
-    outline: 3px solid #8BBFB5 !important;
-    outline-offset: 2px;
-}
-
-/* Forzar el estilo del texto interno (span dentro del botón) */
-[data-testid="stFormSubmitButton"] > button span {
-    color: #ffffff !important;
-    font-family: "Source Sans Pro", sans-serif !important;
-    font-weight: 700 !important;
-    letter-spacing: 0.3px !important;
-    font-size: 1rem !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# ——— Autorefresh opcional (recomendado para el contador) ———
+# (El estilo del botón "Guardar y continuar" vive en tema.css)
+
+# ——— Contador de la promo ———
+# True: el contador corre en el navegador (sin reruns). False: modo anterior,
+# el reloj se re-ejecuta cada segundo en el servidor (un fragmento; sin
+# st.fragment, un rerun completo con streamlit-autorefresh).
+COUNTDOWN_EN_NAVEGADOR = True
+
+# ——— Calculadora de composición corporal (pantalla 3) ———
+# True: altura, peso y % de grasa se ajustan en el navegador (calculadora.py) y
+# llegan al servidor sólo con "Anterior"/"Siguiente". False: widgets de
+# Streamlit, un rerun por cada cambio.
+CALCULADORA_EN_NAVEGADOR = True
+
+# ——— Latencias por rerun / pantalla / helper (evaluacion_core.tiempos) ———
+# Se miden siempre (cuesta ~1 µs por tramo); la tabla del sidebar sólo con MOSTRAR_TIEMPOS=1.
+# Cada TIEMPOS_CADA_S se escribe una foto en METRICAS_ARCHIVO (.prom = Prometheus, si no JSON;
+# vacío = no escribir).
+MOSTRAR_TIEMPOS = os.environ.get("MOSTRAR_TIEMPOS", "0") == "1"
+METRICAS_ARCHIVO = os.environ.get("METRICAS_ARCHIVO", str(APP_DIR / "datos" / "latencias.prom"))
+TIEMPOS_CADA_S = tiempos.ESCRITURA_CADA_S
+
+@st.cache_resource(show_spinner=False)
+def _escritor_tiempos():
+    return tiempos.Escritor(METRICAS_ARCHIVO, TIEMPOS_CADA_S) if METRICAS_ARCHIVO else None
+
+# ——— Peso de cada rerun en el websocket (peso_pagina), sólo con MEDIR_PESO=1 ———
+# Loguea el total y los sitios más pesados de cada rerun; WARNING si una pantalla
+# supera su presupuesto (KB por rerun).
+MEDIR_PESO = os.environ.get("MEDIR_PESO", "0") == "1"
+# medido con el tema inline (sin static serving: ~9.5 KB de CSS por rerun) + ~25 % de margen
+PESO_PRESUPUESTO_KB = {"pantalla1": 24, "pantalla2": 24, "pantalla3": 28, "pantalla4": 20,
+                       "pantalla5": 20, "pantalla6": 32, "pantalla7": 30}
+
+@st.cache_resource(show_spinner=False)
+def _medidor_peso():
+    return peso_pagina.Medidor(__file__, PESO_PRESUPUESTO_KB)
+
+# ——— Autorefresh opcional (sólo para el contador en modo servidor) ———
 try:
     from streamlit_autorefresh import st_autorefresh
     HAVE_AUTOREFRESH = True
 except Exception:
     HAVE_AUTOREFRESH = False
 
-# =========================
-# Config por país
-# =========================
-COUNTRY_CONFIG: Dict[str, Dict] = {
-    "Perú": {
-        "code": "PE",
-        "currency_symbol": "S/",
-        "thousands_sep": ".",
-        "prices": {
-                "Batido": 197,
-                "Té de Hierbas": 147,
-                "Aloe Concentrado": 183,
-                "Beverage Mix": 162,
-                "Beta Heart": 239,
-                "Fibra Activa": 174,
-                "Golden Beverage": 159,
-                "NRG": 113,
-                "Herbalifeline": 183,
-                "PDM": 238,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    "Chile": {
-        "code": "CL",
-        "currency_symbol": "$",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 41790,
-            "Beta Heart": 50148,
-            "PDM": 53487,
-            "Beverage Mix": 36166,
-            "Té de Hierbas": 33431,
-            "Aloe Concentrado": 44358,
-            "Fibra Activa": 40886,
-            "Herbalifeline": 46357,
-            "NRG": 26554,
-            "Golden Beverage": 45978,
-        },
-        "available_products": [
-            "Batido","Beta Heart","PDM","Beverage Mix","Té de Hierbas",
-            "Aloe Concentrado","Fibra Activa","Herbalifeline","NRG","Golden Beverage"
-        ],
-    },
-    # ==== NUEVO: Colombia ====
-    "Colombia": {
-        "code": "CO",
-        "currency_symbol": "$",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 164000,
-            "Té de Hierbas": 126000,
-            "Aloe Concentrado": 166000,
-            "Beverage Mix": 140000,
-            "Beta Heart": 186000,
-            "Fibra Activa": 135000,
-            "Golden Beverage": 186000,
-            "NRG": 97000,
-            "Herbalifeline": 171000,
-            "PDM": 205000,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: España Península ====
-    "España (Península)": {
-        "code": "ES-PEN",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 65.72,
-            "Té de Hierbas": 42.75,
-            "Aloe Concentrado": 57.67,
-            "Beverage Mix": 54.31,
-            "Beta Heart": 59.67,
-            "Fibra Activa": 41.98,
-            "Golden Beverage": 86.91,
-            "NRG": 75.51,
-            "Herbalifeline": 45.65,
-            "PDM": 75.75,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: España Canarias ====
-    "España (Canarias)": {
-        "code": "ES-CAN",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 67.99,
-            "Té de Hierbas": 48.70,
-            "Aloe Concentrado": 60.14,
-            "Beverage Mix": 57.93,
-            "Beta Heart": 63.16,
-            "Fibra Activa": 44.89,
-            "Golden Beverage": 88.60,
-            "NRG": 77.51,
-            "Herbalifeline": 48.47,
-            "PDM": 75.75,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Italia ====
-    "Italia": {
-        "code": "IT",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 61.60,
-            "Té de Hierbas": 41.11,
-            "Aloe Concentrado": 54.56,
-            "Beverage Mix": 48.41,
-            "Beta Heart": 54.33,
-            "Fibra Activa": 43.34,
-            "Golden Beverage": 40.84,
-            "NRG": 69.87,
-            "Herbalifeline": 40.54,
-            "PDM": 72.69,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Francia ====
-    "Francia": {
-        "code": "FR",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 55.78,
-            "Té de Hierbas": 32.26,
-            "Aloe Concentrado": 42.79,
-            "Beverage Mix": 65.85,
-            "Beta Heart": 50.34,
-            "Fibra Activa": 38.16,
-            "Golden Beverage": 74.05,
-            "NRG": 32.60,
-            "Herbalifeline": 35.82,
-            "PDM": 62.73,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Argentina ====
-    "Argentina": {
-        "code": "AR",
-        "currency_symbol": "$",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 88.881,
-            "Té de Hierbas": 67.407,
-            "Aloe Concentrado": 90.074,
-            "Beverage Mix": 92.529,
-            "Beta Heart": 127.262,
-            "Fibra Activa": 89.080,
-            "Golden Beverage": 75.751,
-            "NRG": 54.681,
-            "Herbalifeline": 100.811,
-            "PDM": 147.917,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Estados Unidos ====
-    "Estados Unidos": {
-        "code": "US",
-        "currency_symbol": "$",
-        "thousands_sep": ",",
-        "prices": {
-            "Batido": 75.85,
-            "Té de Hierbas": 48.59,
-            "Aloe Concentrado": 59.33,
-            "Beverage Mix": 50.27,
-            "Fibra Activa": 54.92,
-            "Golden Beverage": 86.36,
-            "NRG": 40.65,
-            "Herbalifeline": 60.84,
-            "PDM": 91.40,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Canada ====
-    "Canada": {
-        "code": "CA",
-        "currency_symbol": "$",
-        "thousands_sep": ",",
-        "prices": {
-            "Batido": 73.10,
-            "Té de Hierbas": 44.80,
-            "Aloe Concentrado": 55.70,
-            "Beverage Mix": 46.25,
-            "Beta Heart": 56.40,
-            "Fibra Activa": 56.40,
-            "Golden Beverage": 84.75,
-            "NRG": 35.75,
-            "Herbalifeline": 57.40,
-            "PDM": 89.95,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: Mexico ====
-    "Mexico": {
-        "code": "MX",
-        "currency_symbol": "$",
-        "thousands_sep": ",",
-        "prices": {
-            "Batido": 901,
-            "Té de Hierbas": 497,
-            "Aloe Concentrado": 649,
-            "Beverage Mix": 703,
-            "Beta Heart": 1350,
-            "Fibra Activa": 749,
-            "Golden Beverage": 460,
-            "NRG": 369,
-            "Herbalifeline": 887,
-            "PDM": 1228,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-    # ==== NUEVO: República Dominicana ====
-    "República Dominicana": {
-        "code": "RD",
-        "currency_symbol": "$",
-        "thousands_sep": ",",
-        "prices": {
-            "Batido": 49.44,
-            "Té de Hierbas": 72.15,
-            "Aloe Concentrado": 51.52,
-            "Beverage Mix": 42.79,
-            "Beta Heart": 47.39,
-            "Fibra Activa": 47.39,
-            "Golden Beverage": 60.77,
-            "NRG": 30.41,
-            "Herbalifeline": 53.07,
-            "PDM": 63.35,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-
-    # ==== NUEVO: Ecuador ====
-    "Ecuador": {
-        "code": "EC",
-        "currency_symbol": "$",
-        "thousands_sep": ",",
-        "prices": {
-            "Batido": 57.87,
-            "Té de Hierbas": 38.66,
-            "Aloe Concentrado": 55.00,
-            "Beverage Mix": 50.08,
-            "Beta Heart": 63.15,
-            "Fibra Activa": 53.50,
-            "Golden Beverage": 35.51,
-            "NRG": 28.43,
-            "Herbalifeline": 53.80,
-            "PDM": 74.07,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-
-    # ==== NUEVO: Holanda ====
-    "Holanda": {
-        "code": "NL",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 65.35,
-            "Té de Hierbas": 40.60,
-            "Aloe Concentrado": 57.60,
-            "Beverage Mix": 72.60,
-            "Beta Heart": 57.35,
-            "Fibra Activa": 43.45,
-            "Golden Beverage": 82.35,
-            "NRG": 36.45,
-            "Herbalifeline": 40.80,
-            "PDM": 72.90,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-
-    # ==== NUEVO: Francia ====
-    "Francia": {
-        "code": "FR",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 55.78,
-            "Té de Hierbas": 32.26,
-            "Aloe Concentrado": 42.79,
-            "Beverage Mix": 65.85,
-            "Beta Heart": 50.34,
-            "Fibra Activa": 38.16,
-            "Golden Beverage": 74.05,
-            "NRG": 32.60,
-            "Herbalifeline": 35.82,
-            "PDM": 62.73,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-
-    # ==== NUEVO: Portugal ====
-    "Portugal": {
-        "code": "PT",
-        "currency_symbol": "€",
-        "thousands_sep": ".",
-        "prices": {
-            "Batido": 49.70,
-            "Té de Hierbas": 35.21,
-            "Aloe Concentrado": 43.07,
-            "Beverage Mix": 58.93,
-            "Beta Heart": 43.34,
-            "Fibra Activa": 32.06,
-            "Golden Beverage": 63.75,
-            "NRG": 33.91,
-            "Herbalifeline": 32.32,
-            "PDM": 56.11,
-        },
-        "available_products": [
-            "Batido","Té de Hierbas","Aloe Concentrado","Beverage Mix","Beta Heart",
-            "Fibra Activa","Golden Beverage","NRG","Herbalifeline","PDM"
-        ],
-    },
-}
-
-# =========================
-# Utilidades IMC
-# =========================
-def _imc_categoria_y_sintomas(imc: float):
-    if imc is None:
-        return None, ""
-    if imc < 18.5:
-        return "BAJO PESO", "Fatiga, fragilidad, baja masa muscular"
-    elif imc < 25:
-        return "PESO NORMAL", ""
-    elif imc < 30:
-        return "SOBREPESO", "Enfermedades digestivas, problemas de circulación en piernas, varices"
-    elif imc < 35:
-        return "OBESIDAD I", "Apnea del sueño, hipertensión, resistencia a la insulina"
-    elif imc < 40:
-        return "OBESIDAD II", "Dolor articular, hígado graso, riesgo cardiovascular"
-    else:
-        return "OBESIDAD III", "Riesgo cardiovascular elevado, diabetes tipo 2, problemas respiratorios"
-
-def _imc_texto_narrativo(imc: float):
-    cat, sintomas = _imc_categoria_y_sintomas(imc)
-    imc_str = f"{imc:.1f}" if imc is not None else "0"
-    if cat == "PESO NORMAL":
-        return (f"Tu Índice de Masa Corporal (IMC) es de {imc_str}, eso indica que tienes PESO NORMAL y deberías sentirte con buen nivel de energía, "
-                f"vitalidad y buena condición física. ¿Te sientes así?")
-    else:
-        return (f"Tu Índice de Masa Corporal (IMC) es de {imc_str}, eso indica que tienes {cat} y eres propenso a {sintomas}.")
-                
-
-# =========================
-# Edad desde fecha
-# =========================
-def edad_desde_fecha(fecha_nac):
-    if not fecha_nac:
-        return None
-    try:
-        if isinstance(fecha_nac, str):
-            fecha_nac = datetime.fromisoformat(fecha_nac).date()
-        elif hasattr(fecha_nac, "year"):
-            fecha_nac = date(fecha_nac.year, fecha_nac.month, fecha_nac.day)
-        else:
-            return None
-        hoy = date.today()
-        return hoy.year - fecha_nac.year - ((hoy.month, hoy.day) < (fecha_nac.month, fecha_nac.day))
-    except Exception:
-        return None
-
-# =========================
-# Rango de grasa de referencia (CORREGIDO)
-# =========================
-def _rango_grasa_referencia(genero: str, edad: int):
-    gen = (genero or "").strip().lower()
-    tabla_mujer = [(20, 39, 21.0, 32.9), (40, 59, 23.0, 33.9), (60, 79, 24.0, 35.9)]
-    tabla_hombre = [(20, 39, 8.0, 19.9), (40, 59, 11.0, 21.9), (60, 79, 13.0, 24.9)]
-    tabla = tabla_mujer if gen.startswith("muj") else tabla_hombre
-    try:
-        e = int(edad)
-    except Exception:
-        e = 30
-    for lo, hi, rmin, rmax in tabla:
-        if lo <= e <= hi:
-            return rmin, rmax
-    # fallback seguro
-    return tabla[0][2], tabla[0][3]
-
 # -------------------------------------------------------------
 # Helpers / Estado
+# (catálogo, fórmulas, precios y exportación viven en evaluacion_core)
 # -------------------------------------------------------------
-P3_FLAGS = [
-    "p3_estrenimiento",
-    "p3_colesterol_alto",
-    "p3_baja_energia",
-    "p3_dolor_muscular",
-    "p3_gastritis",
-    "p3_hemorroides",
-    "p3_hipertension",
-    "p3_dolor_articular",
-    "p3_ansiedad_por_comer",
-    "p3_jaquecas_migranas",
-    "p3_diabetes_antecedentes_familiares",
-]
-
 def _apply_country_config(country_name: str):
-    cfg = COUNTRY_CONFIG.get(country_name) or COUNTRY_CONFIG["Perú"]
+    # Sólo el nombre: moneda, precios y disponibles se leen del catálogo compartido
+    # (catalogo.json, se recarga solo si cambia), nada se copia a la sesión.
     st.session_state.country_name = country_name
-    st.session_state.country_code = cfg["code"]
-    st.session_state.currency_symbol = cfg["currency_symbol"]
-    st.session_state.thousands_sep = cfg["thousands_sep"]
-    st.session_state.precios = cfg["prices"]
-    st.session_state.available_products = set(cfg["available_products"])
+
+def _pais() -> catalogo.Pais:
+    return config_pais(st.session_state.get("country_name"))
 
 def init_state():
     if "step" not in st.session_state:
@@ -572,7 +126,6 @@ def init_state():
     st.session_state.setdefault("promo_deadline", None)
     st.session_state.setdefault("auto_added_items", {})   # <-- NUEVO
 
-    st.session_state.setdefault("custom_qty_version", 0)
     
     if "country_name" not in st.session_state:
         _apply_country_config("Perú")
@@ -591,285 +144,57 @@ def go(prev=False, next=False, to=None):
 def ir_prev(): go(prev=True)
 def ir_next(): go(next=True)
 
-def bton_nav(id_pantalla: int | None = None):
+def bton_nav(id_pantalla: int | None = None, guardar=None):
+    # Dentro de un st.form se pasa ``guardar``: los botones envían el formulario
+    # y guardar(ir_prev / ir_next) copia lo enviado antes de cambiar de pantalla.
     if id_pantalla is None:
         try:
             id_pantalla = int(st.session_state.get("step", 1))
         except Exception:
             id_pantalla = 1
+    boton = st.button if guardar is None else st.form_submit_button
+    def al_click(ir):
+        return {"on_click": ir} if guardar is None else {"on_click": guardar, "args": (ir,)}
     c1, c2 = st.columns([1, 1])
     with c1:
-        st.button("⬅️ Anterior", key=f"prev_{id_pantalla}", on_click=ir_prev, type="primary")
+        boton("⬅️ Anterior", key=f"prev_{id_pantalla}", type="primary", **al_click(ir_prev))
     with c2:
-        st.button("Siguiente ➡️", key=f"next_{id_pantalla}", on_click=ir_next, type="primary")
-
-def imc(peso_kg: float, altura_cm: float) -> float:
-    if not peso_kg or not altura_cm:
-        return 0.0
-    h = altura_cm / 100.0
-    return round(peso_kg / (h*h), 1)
-
-def rango_imc_texto(imc_val: float) -> str:
-    if imc_val < 5.0:
-        return "Delgadez III: Postración, Astenia, Adinamia, Enfermedades Degenerativas."
-    if 5.0 <= imc_val <= 9.9:
-        return "Delgadez II: Anorexia, Bulimia, Osteoporosis, Autoconsumo de Masa Muscular."
-    if 10.0 <= imc_val <= 18.5:
-        return "Delgadez I: Transtornos Digestivos, Debilidad, Fatiga Crónica, Ansiedad, Disfunción Hormonal."
-    if 18.6 <= imc_val <= 24.9:
-        return "PESO NORMAL: Estado Normal, Buen nivel de Energía, Vitalidad y Buena Condición Física."
-    if 25.0 <= imc_val <= 29.9:
-        return "Sobrepeso: Fatiga, Enfermedades Digestivas, Problemas de Circulación en Piernas, Varices."
-    if 30.0 <= imc_val <= 34.0:
-        return "Obesidad I: Diabetes, Hipertensión, Enfermedades Cardiovascular, Problemas Articulares."
-    if 35.0 <= imc_val <= 39.9:
-        return "Obesidad II: Cáncer, Angina de Pecho, Trombeflebitis, Arteriosclerosis, Embolias."
-    return "Obesidad III: Falta de Aire, Apnea, Somnolencia, Trombosis Pulmonar, Úlceras."
-
-def rango_grasa_referencia(genero: str, edad: int) -> str:
-    if genero == "MUJER":
-        if 16 <= edad <= 39: return "21% – 32.9%"
-        if 40 <= edad <= 59: return "23% – 33.9%"
-        if 60 <= edad <= 79: return "21% – 32.9%"
-    else:
-        if 16 <= edad <= 39: return "8.0% – 19.9%"
-        if 40 <= edad <= 59: return "11% – 21.9%"
-        if 60 <= edad <= 79: return "13% – 24.9%"
-    return "—"
-
-def req_hidratacion_ml(peso_kg: float) -> int:
-    if not peso_kg: return 0
-    return int(round((peso_kg/7.0)*250))
-
-def req_proteina(genero:str, metas:dict, peso_kg:float) -> int:
-    if not peso_kg: return 0
-    if genero == "HOMBRE":
-        if metas.get("masa_muscular"): mult = 2.0
-        elif metas.get("rendimiento"): mult = 2.0
-        elif metas.get("perder_peso"): mult = 1.6
-        elif metas.get("tonificar"): mult = 1.6
-        elif metas.get("energia"): mult = 1.6
-        elif metas.get("salud"): mult = 1.6
-        else: mult = 1.6
-    else:
-        if metas.get("masa_muscular"): mult = 1.8
-        elif metas.get("rendimiento"): mult = 1.8
-        elif metas.get("perder_peso"): mult = 1.4
-        elif metas.get("tonificar"): mult = 1.4
-        elif metas.get("energia"): mult = 1.4
-        elif metas.get("salud"): mult = 1.4
-        else: mult = 1.4
-    return int(round(peso_kg * mult))
-
-def bmr_mifflin(genero:str, peso_kg:float, altura_cm:float, edad:int) -> int:
-    if genero == "HOMBRE":
-        val = (10*peso_kg) + (6.25*altura_cm) - (5*edad) + 5
-    else:
-        val = (10*peso_kg) + (6.25*altura_cm) - (5*edad) - 161
-    return int(round(val))
-
-def comparativos_proteina(gramos:int) -> str:
-    porciones_pollo_100g = gramos / 22.5
-    huevos = gramos / 5.5
-    return (f"{gramos} g ≈ {round(porciones_pollo_100g*100)} g de pechuga de pollo "
-            f"o ≈ {huevos:.0f} huevos.")
-
-def load_img(filename: str):
-    p = APP_DIR / filename
-    if p.exists():
-        try: return Image.open(p)
-        except Exception: return None
-    return None
+        boton("Siguiente ➡️", key=f"next_{id_pantalla}", type="primary", **al_click(ir_next))
 
 # =============================================================
 # PRECIOS, VISUAL Y SELECCIÓN
 # =============================================================
+def _formato() -> precios.Formateador:
+    # Uno por moneda, compartido por todas las sesiones
+    pais = _pais()
+    return precios.formateador(pais.currency_symbol, pais.thousands_sep)
+
 def _mon(v: float | int):
-    symbol = st.session_state.get("currency_symbol", "S/")
-    sep = st.session_state.get("thousands_sep", ".")
-    s = f"{int(round(v)):,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    if sep != ".":
-        s = s.replace(".", sep)
-    return f"{symbol}{s}"
+    return _formato()(v)
 
-def _get_precios() -> Dict[str, int]:
-    return st.session_state.get("precios", COUNTRY_CONFIG["Perú"]["prices"])
+def _get_precios() -> Mapping[str, int]:
+    return _pais().precios
 
 def _precio_sumado(items: List[str]):
-    total = 0
-    faltantes = []
-    precios = _get_precios()
-    for it in items:
-        precio = precios.get(it)
-        if precio is None:
-            faltantes.append(it)
-        else:
-            total += precio
-    return total, faltantes
+    return precios.precio_sumado(items, _get_precios())
 
-def _chip_desc(pct:int):
-    # Colores ajustados a la nueva paleta (no cambia el texto)
-    return f"<span class='rd-pill'>-{pct}%</span>"
+_chip_desc = precios.chip_desc
 
 def _producto_disponible(nombre: str) -> bool:
-    disp = st.session_state.get("available_products")
-    return True if not disp else (nombre in disp)
+    return precios.producto_disponible(nombre, _pais().disponibles)
 
 # ——— NOMBRE MOSTRADO (sin afectar precios) ———
-def _display_name(product: str) -> str:
-    cc = st.session_state.get("country_code")
-
-    # Canadá
-    if cc == "CA":
-        if product == "Golden Beverage":
-            return "Collagen Beauty Drink"
-        if product == "NRG":
-            return "LiftOff"
-        if product == "Beta Heart":
-            return "Fibra Activa"
-        return product
-
-    # España / Italia
-    if cc in ("ES-PEN", "ES-CAN", "IT"):
-        # Solo Golden Beverage cambia
-        if product == "Golden Beverage":
-            return "Collagen Booster" if cc in ("ES-PEN", "ES-CAN") else "Herbalifeline"
-        # NO CAMBIAR Beverage Mix
-        # NO CAMBIAR NRG
-        return product
-
-    # Chile y Estados Unidos — caso especial solo cuando hay dolor articular
-    if (
-        cc in ("CL", "US")
-        and st.session_state.get("p3_dolor_articular")
-        and product == "Golden Beverage"
-    ):
-        return "Collagen Drink"
-
-    # México — Golden Beverage cambia siempre
-    if cc == "MX" and product == "Golden Beverage":
-        return "Collagen Beauty Drink"
-
-    # Otros países (Perú, Colombia, Argentina, RD, etc.)
-    return product
-
-def _render_card(titulo:str, items:List[str], descuento_pct:int=0, seleccionable:bool=False, key_sufijo:str=""):
-    if not all(_producto_disponible(i) for i in items):
-        return None
-
-    total, faltantes = _precio_sumado(items)
-
-    # ========= LÓGICA ESPECIAL SOLO PARA CANADÁ =========
-    if st.session_state.get("country_code") == "CA" and titulo.strip() != "Batido + Chupapanza":
-        # 1) Sumar $15 al paquete
-        base_con_recargo = int(round(total + 15))
-        # 2) Mostrar precio inflado como "regular" y el real (con recargo) como "promocional"
-        if descuento_pct:
-            precio_promocional = base_con_recargo  # precio real que pagará
-            inflado = int(round(precio_promocional / (1 - descuento_pct/100)))
-            tachado = f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{_mon(inflado)}</span>"
-            precio_html = f"{tachado}<strong style='font-size:20px'>{_mon(precio_promocional)}</strong> {_chip_desc(descuento_pct)}"
-        else:
-            precio_promocional = base_con_recargo
-            precio_html = f"<strong style='font-size:20px'>{_mon(precio_promocional)}</strong>"
+# Reglas en catalogo.json; el mapa de cada (país, condiciones marcadas) se arma una vez.
+def _nombres() -> catalogo.NombresMostrados:
+    cat = catalogo.actual()
+    return cat.nombres_mostrados(_pais().code, [c for c in cat.condiciones_nombres if st.session_state.get(c)])
 
-        precio_desc = precio_promocional  # mantener compatibilidad con variables usadas abajo
-
-    # ========= Resto de países =========
-    else:
-        if descuento_pct:
-            # Precio real = total. Precio "regular" mostrado = total / (1 - d%)
-            precio_promocional = int(round(total))
-            inflado = int(round(precio_promocional / (1 - descuento_pct/100)))
-            tachado = f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{_mon(inflado)}</span>"
-            precio_html = f"{tachado}<strong style='font-size:20px'>{_mon(precio_promocional)}</strong> {_chip_desc(descuento_pct)}"
-            # Texto bajo precio para Batido 5% en PE/CL/CO/ES/IT/US
-            if titulo.strip().lower() in ("batido nutricional", "batido") and descuento_pct == 5:
-                cc = st.session_state.get("country_code")
-                if cc == "PE":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>(S/7.9 al dia)</span>"
-                elif cc == "CL":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>($1.744 al dia)</span>"
-                elif cc == "CO":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>($6.693 al dia)</span>"
-                elif cc in ("ES-PEN", "ES-CAN", "IT"):
-                    diario = round(precio_promocional / 22.0, 2)
-                    precio_html += f" <span style='font-size:13px; opacity:.8'>(€{diario:.2f} al dia)</span>"
-                elif cc == "US":
-                    diario = round(precio_promocional / 30.0, 2)
-                    precio_html += f" <span style='font-size:13px; opacity:.8'>(${diario:.2f} al dia)</span>"
-            precio_desc = precio_promocional
-        else:
-            precio_desc = total
-            precio_html = f"<strong style='font-size:20px'>{_mon(precio_desc)}</strong>"
-
-    faltante_txt = ""
-    if faltantes:
-        faltante_txt = f"<div style='color:#b00020; font-size:12px; margin-top:6px'>Falta configurar precio: {', '.join(faltantes)}</div>"
-
-    items_txt = " + ".join(_display_name(i) for i in items)
-    st.markdown(
-        f"""
-        <div class='rd-card' style='margin:10px 0'>
-          <div style='font-weight:800; font-size:17px; margin-bottom:4px'>{titulo}</div>
-          <div style='font-size:13px; margin-bottom:8px'>{items_txt}</div>
-          <div>{precio_html}</div>
-          {faltante_txt}
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # Para coherencia con lo mostrado: precio_regular será el inflado cuando aplique,
-    # y precio_final el promocional (real). Si no hay descuento, ambos son el total normal.
-    if st.session_state.get("country_code") == "CA" and titulo.strip() != "Batido + Chupapanza":
-        if descuento_pct:
-            precio_regular_for_payload = int(round(precio_desc / (1 - descuento_pct/100)))
-        else:
-            precio_regular_for_payload = precio_desc
-    else:
-        if descuento_pct:
-            precio_regular_for_payload = int(round(precio_desc / (1 - descuento_pct/100)))
-        else:
-            precio_regular_for_payload = precio_desc
-
-    payload = {
-        "titulo": titulo,
-        "items": items,
-        "precio_regular": precio_regular_for_payload,
-        "descuento_pct": descuento_pct,
-        "precio_final": precio_desc,
-    }
-
-    return precio_desc
+def _display_name(product: str) -> str:
+    return _nombres()(product)
 
 def _combos_por_flags() -> List[Dict]:
-    combos = []
-    ss = st.session_state
-    cc = ss.get("country_code")
-    if ss.get("p3_estrenimiento"):
-        combos.append((f"Batido + {_display_name('Fibra Activa')}", ["Batido", "Fibra Activa"]))
-    if ss.get("p3_colesterol_alto"):
-        combos.append((f"Batido + {_display_name('Herbalifeline')}", ["Batido", "Herbalifeline"]))
-    if ss.get("p3_baja_energia"):
-        combos.append((f"Batido + {_display_name('Té de Hierbas')}", ["Batido", "Té de Hierbas"]))
-    if ss.get("p3_dolor_muscular"):
-        combos.append((f"Batido + {_display_name('Beverage Mix')}", ["Batido", "Beverage Mix"]))
-    if ss.get("p3_gastritis"):
-        combos.append((f"Batido + {_display_name('Aloe Concentrado')}", ["Batido", "Aloe Concentrado"]))
-    if ss.get("p3_hemorroides"):
-        combos.append(("Batido + Aloe", ["Batido", "Aloe Concentrado"]))
-    if ss.get("p3_hipertension"):
-        combos.append((f"Batido + {_display_name('Fibra Activa')}", ["Batido", "Fibra Activa"]))
-    if ss.get("p3_dolor_articular"):
-        combos.append((f"Batido + {_display_name('Golden Beverage')}", ["Batido", "Golden Beverage"]))
-    if ss.get("p3_ansiedad_por_comer"):
-        combos.append((f"Batido + {_display_name('PDM')}", ["Batido", "PDM"]))
-    if ss.get("p3_jaquecas_migranas"):
-        combos.append((f"Batido + {_display_name('NRG')}", ["Batido", "NRG"]))
-    if ss.get("p3_diabetes_antecedentes_familiares"):
-        combos.append((f"Batido + {_display_name('Fibra Activa')}", ["Batido", "Fibra Activa"]))
-    return combos
+    flags = {k: st.session_state.get(k) for k in P3_FLAGS}
+    return combos_por_flags(flags, _nombres())
 
 # ------------------------------
 # Cuenta regresiva (48 horas)
@@ -878,9 +203,49 @@ def _init_promo_deadline():
     if not st.session_state.promo_deadline:
         st.session_state.promo_deadline = (datetime.now() + timedelta(hours=48)).isoformat()
 
+# st.iframe reemplaza a components.html en versiones nuevas de Streamlit
+_iframe_html = getattr(st, "iframe", None) or components.html
+
+_COUNTDOWN_HTML = """
+<div id="rd-countdown" style="background:#ffffffcc; padding:.6rem .9rem; display:inline-block;
+  border:1px solid #EAE6E1; border-radius:999px; box-shadow:0 10px 24px rgba(20,40,40,.08);
+  color:#1F2A2E; font-family:'Source Sans Pro',sans-serif; font-size:1rem;"></div>
+<script>
+  const fin = __DEADLINE_MS__;
+  const el = document.getElementById("rd-countdown");
+  const dos = (n) => String(n).padStart(2, "0");
+  function tick() {
+    const seg = Math.max(0, Math.round((fin - Date.now()) / 1000));
+    if (seg > 0) {
+      const h = Math.floor(seg / 3600), m = Math.floor((seg % 3600) / 60), s = seg % 60;
+      el.innerHTML = "⏳ Promoción válida por <strong>" + dos(h) + ":" + dos(m) + ":" + dos(s) + "</strong>";
+    } else {
+      el.innerHTML = "<strong>⏳ Promoción finalizada</strong>";
+      clearInterval(timer);
+    }
+  }
+  const timer = setInterval(tick, 1000);
+  tick();
+</script>
+"""
+
+@tiempos.medido()
 def _render_countdown():
+    deadline = datetime.fromisoformat(st.session_state.promo_deadline)
+    if COUNTDOWN_EN_NAVEGADOR:
+        # El HTML es el mismo en todos los reruns de la sesión (sólo depende del
+        # deadline), así que el iframe no se recarga y el tic lo hace el navegador.
+        _iframe_html(_COUNTDOWN_HTML.replace("__DEADLINE_MS__", str(int(deadline.timestamp() * 1000))), height=56)
+        return
+
+    if _fragmento is not None:
+        _reloj_promo()      # sólo el reloj se re-ejecuta cada segundo
+        return
     if HAVE_AUTOREFRESH:
         st_autorefresh(interval=1000, key="promo_timer_tick")
+    _reloj_promo()
+
+def _reloj_promo():
     deadline = datetime.fromisoformat(st.session_state.promo_deadline)
     restante = max(deadline - datetime.now(), timedelta(0))
     total_seg = int(restante.total_seconds())
@@ -893,88 +258,82 @@ def _render_countdown():
 
 
 # ========= CORREGIDO: Sección de Personalización =========
+DESCRIPCION_PRODUCTO = {
+    "Batido": "Reemplazo de comida alto en proteína",
+    "Té de Hierbas": "Aumenta energía y metabolismo",
+    "Aloe Concentrado": "Mejora digestión y reduce inflamación",
+    "Beverage Mix": "Proteína ligera para recuperación",
+    "Beta Heart": "Fibra para colesterol y corazón",
+    "Fibra Activa": "Mejora digestión y saciedad",
+    "Golden Beverage": "Alivia articulaciones y piel",
+    "NRG": "Energía natural y enfoque",
+    "Herbalifeline": "Omega 3 para salud cardiovascular",
+    "PDM": "Proteína extra para controlar hambre",
+}
+CANTIDAD_MAX = 10
+# Estado de la grilla de cantidades; al elegir un programa en la pantalla 6 se borra
+# y la grilla vuelve a las cantidades de ese programa (auto_added_items).
+CLAVE_GRILLA = "personaliza_cantidades"
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _tabla_personaliza(_cat: catalogo.Catalogo, version: tuple, pais: str, condiciones: tuple, iniciales: tuple):
+    """(productos, DataFrame de la grilla) de un país; una vez por versión del catálogo, país, nombres y cantidades iniciales.
+
+    La clave es ``version`` (ruta y mtime), no el objeto: una recarga del
+    catálogo no deja el anterior vivo en el cache."""
+    import pandas as pd
+
+    cat = _cat
+    p = cat.pais(pais)
+    precios_prod = p.precios
+    disponibles = p.disponibles or set(precios_prod.keys())
+    productos = tuple(x for x in precios_prod.keys() if x in disponibles)
+    cantidad = dict(iniciales)
+    df = pd.DataFrame({
+        "Producto": cat.nombres_mostrados(p.code, condiciones).lista(productos),
+        "Para qué sirve": [DESCRIPCION_PRODUCTO.get(x, "") for x in productos],
+        "Precio unitario": precios.formateador(p.currency_symbol, p.thousands_sep).lote(
+            [precios_prod.get(x, 0) for x in productos]),
+        "Cantidad": [cantidad.get(x, 0) for x in productos],
+    })
+    return productos, df
+
+@tiempos.medido()
 def _render_personaliza_programa():
     st.divider()
     st.subheader("¿Requieres cubrir alguna necesidad específica adicional?")
 
-    precios = _get_precios()
-    disponibles = st.session_state.get("available_products") or set(precios.keys())
-    productos_ordenados = [p for p in precios.keys() if p in disponibles]
-
-    # Cabecera de tabla
-    cols = st.columns([3, 2, 2])
-    with cols[0]:
-        st.markdown("**Producto**")
-    with cols[1]:
-        st.markdown("**Precio unitario**")
-    with cols[2]:
-        st.markdown("**Cantidad**")
-
-    cantidades = {}
-    for prod in productos_ordenados:
-        c = st.columns([3, 2, 2])
-        with c[0]:
-            desc = {
-                "Batido": "Reemplazo de comida alto en proteína",
-                "Té de Hierbas": "Aumenta energía y metabolismo",
-                "Aloe Concentrado": "Mejora digestión y reduce inflamación",
-                "Beverage Mix": "Proteína ligera para recuperación",
-                "Beta Heart": "Fibra para colesterol y corazón",
-                "Fibra Activa": "Mejora digestión y saciedad",
-                "Golden Beverage": "Alivia articulaciones y piel",
-                "NRG": "Energía natural y enfoque",
-                "Herbalifeline": "Omega 3 para salud cardiovascular",
-                "PDM": "Proteína extra para controlar hambre",
-            }.get(prod, "")
-
-            st.write(f"**{_display_name(prod)}** — {desc}")
-        with c[1]:
-            st.write(_mon(precios.get(prod, 0)))
-        with c[2]:
-
-            # 🔥 PASO 3: aplicar cantidades automáticas
-            default_qty = st.session_state.auto_added_items.get(prod, 0)
-
-            cantidades[prod] = st.selectbox(
-                " ",
-                options=list(range(0, 11)),
-                index=default_qty,
-                key=f"custom_qty_{prod}_{st.session_state.custom_qty_version}",
-                label_visibility="collapsed"
-            )
+    cat = catalogo.actual()
+    pais = _pais()
+    iniciales = {k: int(v) for k, v in st.session_state.auto_added_items.items() if v}
+    productos, df = _tabla_personaliza(
+        cat, (str(cat.ruta), cat.mtime_ns), pais.nombre,
+        tuple(c for c in cat.condiciones_nombres if st.session_state.get(c)),
+        tuple(sorted(iniciales.items())))
+
+    # Una sola grilla en vez de una fila de columnas + selectbox por producto
+    st.data_editor(
+        df,
+        key=CLAVE_GRILLA,
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True,
+        disabled=["Producto", "Para qué sirve", "Precio unitario"],
+        column_config={
+            "Cantidad": st.column_config.NumberColumn(min_value=0, max_value=CANTIDAD_MAX, step=1, format="%d"),
+        },
+    )
 
-    # Cálculo de totales
-    total_items = sum(int(q) for q in cantidades.values())
-    total_base = 0
-    for prod, q in cantidades.items():
-        precio_u = precios.get(prod, 0)
-        total_base += int(q) * (precio_u if isinstance(precio_u, (int, float)) else 0)
-
-    # Regla de descuento
-    if total_items <= 0:
-        descuento_pct = 0
-    elif total_items == 1:
-        descuento_pct = 5
-    else:
-        descuento_pct = 10
-
-    # Recargo Canadá: +15 si hay al menos 1 ítem
-    cc = st.session_state.get("country_code")
-    recargo_ca = 15 if (cc == "CA" and total_items > 0) else 0
-
-    # Precio real (promocional)
-    precio_promocional = int(round(total_base + recargo_ca))
-
-    # Precio regular “inflado” cuando hay descuento (coherente con tarjetas)
-    if descuento_pct > 0:
-        precio_regular_inflado = int(round(precio_promocional / (1 - descuento_pct/100)))
-        html_total = (
-            f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{_mon(precio_regular_inflado)}</span>"
-            f"<strong style='font-size:20px'>{_mon(precio_promocional)}</strong> "
-            f"{_chip_desc(descuento_pct)}"
-        )
-    else:
-        html_total = f"<strong style='font-size:20px'>{_mon(precio_promocional)}</strong>"
+    # Totales: las cantidades iniciales más sólo las filas que se editaron
+    # (descuento por cantidad y recargo Canadá en evaluacion_core.precios)
+    cantidades = {k: v for k, v in iniciales.items() if k in productos}
+    for fila, cambios in (st.session_state.get(CLAVE_GRILLA) or {}).get("edited_rows", {}).items():
+        q = cambios.get("Cantidad")
+        if q is not None:
+            cantidades[productos[int(fila)]] = min(max(int(q or 0), 0), CANTIDAD_MAX)
+    tot = precios.total_personalizado(cantidades, pais.precios, pais.code)
+    st.session_state.personaliza_total = tot
+    html_total = precios.html_precio(tot["precio_final"], tot["descuento_pct"], _mon)
 
     # Tarjeta visual
     st.markdown(
@@ -991,330 +350,15 @@ def _render_personaliza_programa():
 # -------------------------------------------------------------
 # THEME (paleta inspirada en la plantilla Wix del enlace)
 # -------------------------------------------------------------
-def inject_theme():
-    st.markdown("""
-    <style>
-      :root{
-        /* Paleta: tonos cálidos crema + acentos verde salvia */
-        --rd-bg-start:#FFF9F4;      /* crema muy claro */
-        --rd-bg-end:#F7F3EE;        /* beige suave */
-        --rd-card:#FFFFFF;
-        --rd-border:#EAE6E1;
-        --rd-accent:#3A6B64;        /* verde salvia principal */
-        --rd-accent-2:#8BBFB5;      /* verde menta suave */
-        --rd-text:#1F2A2E;          /* gris petróleo */
-        --rd-muted:#6C7A7E;
-        --rd-pill-bg:#EAF6F3;
-        --rd-shadow:0 10px 24px rgba(20,40,40,.08);
-        --rd-radius:18px;
-        --rd-input-bg:#EEF4F2;      /* verde oliva muy claro */
-        --rd-input-border:#D5E2DE;  /* borde suave */
-      }
-
-      /* Fondo general y tipografía */
-      [data-testid="stAppViewContainer"]{
-        background: linear-gradient(180deg,var(--rd-bg-start),var(--rd-bg-end)) fixed;
-        color: var(--rd-text);
-        font-family: "Inter",-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,Helvetica,Arial,sans-serif;
-      }
-
-      /* Contenedor central más ancho */
-      .block-container{ max-width: 1200px; }
-
-      /* Sidebar */
-      [data-testid="stSidebar"]{
-        background: #ffffffE6;
-        border-right: 1px solid var(--rd-border);
-        backdrop-filter: blur(2px);
-      }
-      [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3{
-        color: var(--rd-accent);
-        font-weight: 800;
-      }
-
-      /* Títulos */
-      h1, h2, h3{
-        font-family: ui-serif, Georgia, "Times New Roman", serif !important;
-        color: var(--rd-accent);
-        letter-spacing:.2px;
-      }
-      h1{
-        position: relative;
-        display: inline-block;
-        padding-bottom: .25rem;
-      }
-      h1:after{
-        content:"";
-        position:absolute; left:0; bottom:0;
-        width: 56%;
-        height: 8px;
-        background: linear-gradient(90deg,var(--rd-accent-2),transparent);
-        border-radius: 999px;
-        opacity:.6;
-      }
-
-      /* Texto y enlaces */
-      p, li, label, span, div{ color: var(--rd-text); }
-      a{ color: var(--rd-accent); text-decoration: none; }
-      a:hover{ text-decoration: underline; }
-
-      /* Botones con estilo pastilla (texto siempre visible) */
-      .stButton>button{
-        background: var(--rd-accent) !important;
-        color: #fff !important;
-        padding: .75rem 1.1rem !important;
-        border-radius: 999px !important;
-        border: 1px solid var(--rd-accent) !important;
-        box-shadow: var(--rd-shadow) !important;
-        font-weight: 700 !important;
-        transition: transform .03s ease, background .2s ease;
-        opacity: 1 !important;
-      }
-      .stButton>button *, .stButton>button svg{ color:#fff !important; fill:#fff !important; opacity:1 !important; }
-      .stButton>button:hover{ background:#2F5A53 !important; transform: translateY(-1px); }
-      .stButton>button:focus{ outline: 3px solid var(--rd-accent-2) !important; }
-
-      /* === NUEVO: mismo look para st.form_submit_button === */
-      [data-testid="stFormSubmitter"] > div > button,
-      [data-testid="baseButton-primaryFormSubmit"],
-      [data-testid="baseButton-secondaryFormSubmit"]{
-        background: var(--rd-accent) !important;
-        color: #fff !important;
-        padding: .75rem 1.1rem !important;
-        border-radius: 999px !important;
-        border: 1px solid var(--rd-accent) !important;
-        box-shadow: var(--rd-shadow) !important;
-        font-weight: 700 !important;
-        transition: transform .03s ease, background .2s ease;
-        opacity: 1 !important;
-      }
-      [data-testid="stFormSubmitter"] > div > button:hover,
-      [data-testid="baseButton-primaryFormSubmit"]:hover,
-      [data-testid="baseButton-secondaryFormSubmit"]:hover{
-        background:#2F5A53 !important; transform: translateY(-1px);
-      }
-      [data-testid="stFormSubmitter"] > div > button:focus,
-      [data-testid="baseButton-primaryFormSubmit"]:focus,
-      [data-testid="baseButton-secondaryFormSubmit"]:focus{
-        outline: 3px solid var(--rd-accent-2) !important;
-      }
-
-      /* Inputs redondeados */
-      input, textarea{ border-radius: 14px !important; }
-      .stSelectbox [data-baseweb="select"]{ border-radius: 14px !important; }
-
-      /* === Campos de entrada más claros (verde oliva suave) === */
-      [data-testid="stTextInput"] input,
-      [data-testid="stTextArea"] textarea,
-      [data-testid="stNumberInput"] input,
-      [data-testid="stDateInput"] input,
-      .stSelectbox [data-baseweb="select"] > div{
-        background: var(--rd-input-bg) !important;
-        border: 1px solid var(--rd-input-border) !important;
-        color: var(--rd-text) !important;
-        box-shadow: none !important;
-      }
-      [data-testid="stTextInput"] input::placeholder,
-      [data-testid="stTextArea"] textarea::placeholder{
-        color: rgba(31,42,46,.55) !important;
-      }
-      [data-testid="stTextInput"] input:focus,
-      [data-testid="stTextArea"] textarea:focus,
-      [data-testid="stNumberInput"] input:focus,
-      [data-testid="stDateInput"] input:focus,
-      .stSelectbox [data-baseweb="select"] > div:focus-within{
-        border-color: var(--rd-accent) !important;
-        outline: 2px solid var(--rd-accent-2) !important;
-      }
-      [data-testid="stTextInput"] input,
-      [data-testid="stTextArea"] textarea{ caret-color: var(--rd-accent) !important; }
-
-      /* === LISTA DESPLEGABLE MÁS CLARA (selectbox abierto) === */
-      /* Fondo del menú (en el popover de BaseWeb) */
-      .stSelectbox [data-baseweb="select"] [role="listbox"],
-      [data-baseweb="popover"] [role="listbox"]{
-        background: var(--rd-input-bg) !important;   /* verde claro */
-        border: 1px solid var(--rd-input-border) !important;
-        color: var(--rd-text) !important;
-      }
-      /* Opción normal */
-      .stSelectbox [data-baseweb="select"] [role="option"],
-      [data-baseweb="popover"] [role="option"]{
-        color: var(--rd-text) !important;
-        background: transparent !important;
-      }
-      /* Hover/selección: verde menta suave para contraste */
-      .stSelectbox [data-baseweb="select"] [role="option"]:hover,
-      [data-baseweb="popover"] [role="option"]:hover,
-      .stSelectbox [data-baseweb="select"] [role="option"][aria-selected="true"],
-      [data-baseweb="popover"] [role="option"][aria-selected="true"]{
-        background: var(--rd-pill-bg) !important;    /* #EAF6F3 */
-        color: var(--rd-accent) !important;
-      }
-      /* Borde del control cuando está abierto/enfocado */
-      .stSelectbox [data-baseweb="select"] > div:focus-within{
-        border-color: var(--rd-accent) !important;
-        box-shadow: 0 0 0 2px var(--rd-accent-2) inset !important;
-      }
-
-      /* Tarjetas reutilizables */
-      .rd-card{
-        background: var(--rd-card);
-        border: 1px solid var(--rd-border);
-        border-radius: var(--rd-radius);
-        box-shadow: var(--rd-shadow);
-        padding: 16px 18px;
-      }
-
-      /* Chips / etiquetas de descuento */
-      .rd-pill{ background: var(--rd-pill-bg); color: var(--rd-accent); padding:2px 10px; border-radius:999px; font-size:12px; font-weight:700; }
-
-      /* Tablas y contenedores */
-      .stTable { border-radius: var(--rd-radius); overflow:hidden; box-shadow: var(--rd-shadow); }
-
-      /* Divisor sutil */
-      hr, .stDivider { opacity:.6; border-color: var(--rd-border) !important; }
-
-      /* Countdown destacado */
-      .rd-countdown{ background:#ffffffcc; backdrop-filter:saturate(1.2) blur(3px); padding:.6rem .9rem; display:inline-block; border:1px solid var(--rd-border); border-radius:999px; box-shadow: var(--rd-shadow); }
-      [data-baseweb="popover"] {
-    background: var(--rd-input-bg) !important;
-    border: 1px solid var(--rd-input-border) !important;
-}
-
-/* Fondo interno del calendario */
-[data-baseweb="calendar"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-}
-
-/* Cada celda del calendario (días) */
-[data-baseweb="calendar"] [role="gridcell"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-}
-
-/* Hover en días */
-[data-baseweb="calendar"] [role="gridcell"]:hover {
-    background: var(--rd-pill-bg) !important;
-    color: var(--rd-accent) !important;
-}
-
-/* Día seleccionado */
-[data-baseweb="calendar"] [aria-selected="true"] {
-    background: var(--rd-accent-2) !important;
-    color: #000 !important;
-}
-
-/* Header (mes/año) */
-[data-baseweb="calendar"] button,
-[data-baseweb="calendar"] [role="heading"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-}
-/* ============================================================
-   FIX DEFINITIVO REAL – ELIMINAR BACKGROUND NEGRO DE FOCUS
-   ============================================================ */
-
-/* Eliminar focus ring negro global de BaseWeb */
-*[data-baseweb]::before,
-*[data-baseweb]::after {
-    background: transparent !important;
-    box-shadow: none !important;
-    border: none !important;
-    outline: none !important;
-}
+@st.cache_resource(show_spinner=False)
+def _tema():
+    # tema.css compilado (minificado + hash) una vez por proceso
+    hoja = tema.compilar()
+    return hoja, tema.etiqueta(hoja, bool(st.get_option("server.enableStaticServing")))
 
-/* Eliminar focus ring especificamente en botones del calendario */
-[data-baseweb="calendar"] *::before,
-[data-baseweb="calendar"] *::after {
-    background: transparent !important;
-    box-shadow: none !important;
-    border: none !important;
-    outline: none !important;
-}
-
-/* Eliminar focus ring en popover del datepicker */
-[data-baseweb="popover"] *::before,
-[data-baseweb="popover"] *::after {
-    background: transparent !important;
-    box-shadow: none !important;
-    border: none !important;
-    outline: none !important;
-}
-/* ============================================================
-   FIX GLOBAL DEFINITIVO – Estilos oscuros residuales del UI
-   ============================================================ */
-
-/* 1) Header oscuro del calendario */
-[data-baseweb="calendar"] [data-baseweb="calendar-header"],
-[data-baseweb="calendar-header"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-    border: none !important;
-}
-
-/* 2) Botones dentro del header del calendario */
-[data-baseweb="calendar-header"] [data-baseweb="button"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-    border: none !important;
-}
-[data-baseweb="calendar-header"] [data-baseweb="button"] svg {
-    fill: var(--rd-text) !important;
-}
-
-/* 3) Forzar fondo claro al contenedor del POPUP del selectbox */
-[data-baseweb="popover"] {
-    background: var(--rd-input-bg) !important;
-    border: 1px solid var(--rd-input-border) !important;
-    box-shadow: var(--rd-shadow) !important;
-}
-
-/* 4) Los wrappers oscuros internos del selectbox (clases dinámicas) */
-[data-baseweb="popover"] > div,
-[data-baseweb="popover"] > div > div,
-[data-baseweb="popover"] .buiqZc,
-[data-baseweb="popover"] .buiqXa,
-[data-baseweb="popover"] .buiqBd,
-[data-baseweb="popover"] .buiqYe {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-}
-
-/* 5) Fondo y texto de cada opción */
-[data-baseweb="popover"] [role="option"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-}
-
-/* 6) Hover y opción seleccionada */
-[data-baseweb="popover"] [role="option"]:hover,
-[data-baseweb="popover"] [role="option"][aria-selected="true"] {
-    background: var(--rd-pill-bg) !important;
-    color: var(--rd-accent) !important;
-}
-
-/* 7) Evitar que se superponga un fondo oscuro por focus */
-[data-baseweb="popover"] *::before,
-[data-baseweb="popover"] *::after {
-    background: transparent !important;
-    box-shadow: none !important;
-}
-/* ============================================================
-   🔥 FIX FINAL – CONTENEDOR SUPERIOR DEL CALENDARIO
-   ============================================================ */
-
-/* El contenedor superior que envuelve el header */
-[data-baseweb="calendar"] [data-baseweb="header"],
-[data-baseweb="header"] {
-    background: var(--rd-input-bg) !important;
-    color: var(--rd-text) !important;
-    border: none !important;
-    box-shadow: none !important;
-}
-    </style>
-    """, unsafe_allow_html=True)
+@tiempos.medido()
+def inject_theme():
+    st.markdown(_tema()[1], unsafe_allow_html=True)
 
 # -------------------------------------------------------------
 # STEP 1 - Perfil de Bienestar
@@ -1352,7 +396,7 @@ def pantalla1():
         st.subheader("País")
         pais = st.selectbox(
             "Selecciona tu país",
-            sorted(COUNTRY_CONFIG.keys()),
+            catalogo.actual().nombres,
             index=0,
             help="Esto ajustará los precios y la moneda en las recomendaciones."
         )
@@ -1409,276 +453,265 @@ def pantalla1():
 # -------------------------------------------------------------
 # STEP 2 - Estilo de Vida y Objetivos
 # -------------------------------------------------------------
+# Todo va en un st.form: escribir o marcar no hace rerun; "Anterior"/"Siguiente"
+# envían el formulario y _guardar_p2 copia lo enviado (y calcula los p3_*) una vez.
+P2_HABITOS = [
+    ("ev_menos_energia", "¿En qué momento del día sientes menos energía?"),
+    ("ev_actividad", "¿Practicas actividad física al menos 3 veces/semana?"),
+    ("ev_intentos", "¿Has intentado algo antes para verte/estar mejor? (Gym, Dieta, App, Otros)"),
+    ("ev_complica", "¿Qué es lo que más se te complica? (Constancia, Alimentación, Motivación, Otros)"),
+    ("ev_prioridad_personal", "¿Consideras que cuidar de ti es una prioridad?"),
+]
+# (etiqueta, clave del checkbox, flag de combos o None); 7 por columna
+P2_CONDICIONES = [
+    ("¿Estreñimiento?", "cond_estre", "p3_estrenimiento"),
+    ("¿Colesterol Alto?", "cond_colesterol", "p3_colesterol_alto"),
+    ("¿Baja Energía?", "cond_baja_ene", "p3_baja_energia"),
+    ("¿Dolor Muscular?", "cond_dolor_musc", "p3_dolor_muscular"),
+    ("¿Gastritis?", "cond_gastritis", "p3_gastritis"),
+    ("¿Hemorroides?", "cond_hemorroides", "p3_hemorroides"),
+    ("¿Hiper/Hipotiroidismo?", "cond_hiper", None),
+    ("¿Hipertensión?", "cond_hta", "p3_hipertension"),
+    ("¿Dolor Articular?", "cond_dolor_art", "p3_dolor_articular"),
+    ("¿Ansiedad por comer?", "cond_ansiedad", "p3_ansiedad_por_comer"),
+    ("¿Jaquecas / Migrañas?", "cond_jaquecas", "p3_jaquecas_migranas"),
+    ("¿Resistencia a la Insulina?", "cond_diabetes_fam", "p3_diabetes_antecedentes_familiares"),
+    ("¿Hígado Graso?", "cond_higado", None),
+    ("¿Triglicéridos Altos?", "cond_trigli", None),
+]
+P2_OBJETIVOS = [
+    ("obj_talla", "¿Qué talla de ropa te gustaría ser o mantener?"),
+    ("obj_ropero", "¿Qué prenda tienes en tu ropero que podamos usar como meta?"),
+    ("obj_partes", "¿Qué partes de tu cuerpo te gustaría mejorar?"),
+    ("obj_beneficio", "¿Cómo mejoraría tu vida al alcanzar tus objetivos de bienestar?"),
+    ("obj_eventos", "¿Qué eventos tienes en los próximos 3 o 6 meses que te inspiren a lograr tus objetivos?"),
+    ("obj_compromiso", "Del 1 al 10, ¿cuál es tu nivel de compromiso en alcanzar una mejor versión de ti?"),
+]
+
+def _guardar_p2(ir):
+    ss = st.session_state
+    ss.estilo_vida.update({k: ss.get(k, "") for k, _ in P2_HABITOS})
+    ss.metas.update({k: ss.get(k, "") for k, _ in P2_OBJETIVOS})
+    ss.condiciones_p2 = {clave: bool(ss.get(clave)) for _, clave, _ in P2_CONDICIONES}
+    for _, clave, flag in P2_CONDICIONES:
+        if flag:
+            ss[flag] = ss.condiciones_p2[clave]
+    ir()
+
 def pantalla2():
     scroll_to_top()
 
     st.header("2) Evaluación de Estilo de Vida")
 
-    st.subheader("Hábitos y energía")
-    c1, c2 = st.columns(2)
-    with c1:
-        st.text_input("¿En qué momento del día sientes menos energía?", key="ev_menos_energia")
-        st.text_input("¿Practicas actividad física al menos 3 veces/semana?", key="ev_actividad")
-        st.text_input("¿Has intentado algo antes para verte/estar mejor? (Gym, Dieta, App, Otros)", key="ev_intentos")
-        st.text_input("¿Qué es lo que más se te complica? (Constancia, Alimentación, Motivación, Otros)", key="ev_complica")
-        st.text_input("¿Consideras que cuidar de ti es una prioridad?", key="ev_prioridad_personal")
-    with c2:
-        st.write("¿Presentas alguna de las siguientes condiciones?")
-        cols = st.columns(2)
-        with cols[0]:
-            estre       = st.checkbox("¿Estreñimiento?")
-            colesterol  = st.checkbox("¿Colesterol Alto?")
-            baja_ene    = st.checkbox("¿Baja Energía?")
-            dolor_musc  = st.checkbox("¿Dolor Muscular?")
-            gastritis   = st.checkbox("¿Gastritis?")
-            hemorroides = st.checkbox("¿Hemorroides?")
-            hiper       = st.checkbox("¿Hiper/Hipotiroidismo?")
-        with cols[1]:
-            hta         = st.checkbox("¿Hipertensión?")
-            dolor_art   = st.checkbox("¿Dolor Articular?")
-            ansiedad    = st.checkbox("¿Ansiedad por comer?")
-            jaquecas    = st.checkbox("¿Jaquecas / Migrañas?")
-            diabetes_fam= st.checkbox("¿Resistencia a la Insulina?")
-            higado      = st.checkbox("¿Hígado Graso?")
-            trigli      = st.checkbox("¿Triglicéridos Altos?")
-
-    st.session_state.p3_estrenimiento                      = bool(estre)
-    st.session_state.p3_colesterol_alto                    = bool(colesterol)
-    st.session_state.p3_baja_energia                       = bool(baja_ene)
-    st.session_state.p3_dolor_muscular                     = bool(dolor_musc)
-    st.session_state.p3_gastritis                          = bool(gastritis)
-    st.session_state.p3_hemorroides                        = bool(hemorroides)
-    st.session_state.p3_hipertension                       = bool(hta)
-    st.session_state.p3_dolor_articular                    = bool(dolor_art)
-    st.session_state.p3_ansiedad_por_comer                 = bool(ansiedad)
-    st.session_state.p3_jaquecas_migranas                  = bool(jaquecas)
-    st.session_state.p3_diabetes_antecedentes_familiares   = bool(diabetes_fam)
-
-    st.subheader("Objetivos")
-    c1, c2 = st.columns(2)
-    with c1:
-        st.text_input("¿Qué talla de ropa te gustaría ser o mantener?", key="obj_talla")
-        st.text_input("¿Qué prenda tienes en tu ropero que podamos usar como meta?", key="obj_ropero")
-        st.text_input("¿Qué partes de tu cuerpo te gustaría mejorar?", key="obj_partes")
-    with c2:
-        st.text_input("¿Cómo mejoraría tu vida al alcanzar tus objetivos de bienestar?", key="obj_beneficio")
-        st.text_input("¿Qué eventos tienes en los próximos 3 o 6 meses que te inspiren a lograr tus objetivos?", key="obj_eventos")
-        st.text_input("Del 1 al 10, ¿cuál es tu nivel de compromiso en alcanzar una mejor versión de ti?", key="obj_compromiso")
+    # al volver a la pantalla los widgets arrancan con lo último que se envió
+    ev, metas = st.session_state.estilo_vida, st.session_state.metas
+    marcadas = st.session_state.get("condiciones_p2", {})
+    with st.form("estilo_vida"):
+        st.subheader("Hábitos y energía")
+        c1, c2 = st.columns(2)
+        with c1:
+            for k, pregunta in P2_HABITOS:
+                st.text_input(pregunta, value=ev.get(k, ""), key=k)
+        with c2:
+            st.write("¿Presentas alguna de las siguientes condiciones?")
+            cols = st.columns(2)
+            for i, (etiqueta, clave, _) in enumerate(P2_CONDICIONES):
+                with cols[i // 7]:
+                    st.checkbox(etiqueta, value=marcadas.get(clave, False), key=clave)
 
-    bton_nav()
+        st.subheader("Objetivos")
+        c1, c2 = st.columns(2)
+        for i, (k, pregunta) in enumerate(P2_OBJETIVOS):
+            with (c1 if i < 3 else c2):
+                st.text_input(pregunta, value=metas.get(k, ""), key=k)
+
+        bton_nav(guardar=_guardar_p2)
 
 # -------------------------------------------------------------
 # STEP 3 - Evaluación de Composición Corporal
 # -------------------------------------------------------------
-def _calcular_edad(fecha_iso: str) -> int:
-    try:
-        anio = int(str(fecha_iso).split("-")[0])
-    except Exception:
-        return 30
-    return max(16, min(79, date.today().year - anio))
-
-def pantalla3():
-    scroll_to_top()
-
-
-    st.header ("3) Análisis de presupuesto")
-
-    col = st.columns(4)
-    cur = st.session_state.get("currency_symbol", "S/")
-
-    with col[0]:
-        st.number_input(f"¿Cuánto gastas a la semana en tu comida? ({cur})", min_value=0.0, step=0.1, key="presu_comida")
-    with col[1]:
-        st.number_input(f"¿Cuánto en dulces, golosinas y/o snacks salados? ({cur})", min_value=0.0, step=0.1, key="presu_snacks")
-    with col[2]:
-        st.number_input(f"¿Cuánto en gaseosas/agua/refrescos/alcohol? ({cur})", min_value=0.0, step=0.1, key="presu_bebidas")
-    with col[3]:
-        st.number_input(f"¿Cuánto en deliveries/salidas a comer? ({cur})", min_value=0.0, step=0.1, key="presu_deliveries")
-
-    # ================================
-    # Cálculos de presupuestos diarios
-    # ================================
-    presu_comida_diario = round(float(st.session_state.get("presu_comida", 0.0)) / 7, 2)
-    presu_snacks_diario = round(float(st.session_state.get("presu_snacks", 0.0)) / 7, 2)
-    presu_bebidas_diario = round(float(st.session_state.get("presu_bebidas", 0.0)) / 7, 2)
-    presu_deliveries_diario = round(float(st.session_state.get("presu_deliveries", 0.0)) / 7, 2)
-
-    prom_diario_total = round(
-        presu_comida_diario +
-        presu_snacks_diario +
-        presu_bebidas_diario +
-        presu_deliveries_diario, 2
-    )
-
-    # ================================
-    # Resultados
-    # ================================
-    st.markdown("### Presupuesto diario estimado:")
-    st.write(f"- **Comida:** {cur} {presu_comida_diario:.2f}")
-    st.write(f"- **Golosinas/snacks:** {cur} {presu_snacks_diario:.2f}")
-    st.write(f"- **Bebidas:** {cur} {presu_bebidas_diario:.2f}")
-    st.write(f"- **Restaurantes/deliveries:** {cur} {presu_deliveries_diario:.2f}")
-    st.markdown("---")
-
-    st.text_input(
-        "¿Consideras valioso optimizar tu presupuesto para alcanzar tus objetivos?",
-        key="ev_valora_optimizar"
-    )
+# ——— Composición corporal (pantalla 3) ———
+CLAVE_CALCULADORA = "calculadora_composicion"
+
+def _fijos_composicion() -> Dict:
+    # lo que no cambia mientras el cliente ajusta altura, peso y grasa
+    datos = st.session_state.datos
+    edad_ref = edad_desde_fecha(datos.get("fecha_nac")) or int(datos.get("edad", 30))
+    return {
+        "genero": datos.get("genero", "HOMBRE"),
+        "edad": edad_aproximada(datos.get("fecha_nac")),
+        "edad_ref": edad_ref,
+        "rango": rango_grasa_tabla(datos.get("genero") or "Hombre", edad_ref),
+    }
 
-    st.session_state.estilo_vida.update({
-        "ev_menos_energia":      st.session_state.get("ev_menos_energia", ""),
-        "ev_actividad":          st.session_state.get("ev_actividad", ""),
-        "ev_intentos":           st.session_state.get("ev_intentos", ""),
-        "ev_complica":           st.session_state.get("ev_complica", ""),
-        "ev_prioridad_personal": st.session_state.get("ev_prioridad_personal",""),
-        "ev_valora_optimizar":   st.session_state.get("ev_valora_optimizar",""),
-        "presu_comida":          st.session_state.get("presu_comida", 0.0),
-        "presu_snacks":          st.session_state.get("presu_snacks", 0.0),
-        "presu_bebidas":         st.session_state.get("presu_bebidas", 0.0),
-        "presu_deliveries":      st.session_state.get("presu_deliveries", 0.0),
-    })
+def _valores_composicion() -> Dict:
+    datos = st.session_state.datos
+    peso_kg = float(st.session_state.get("peso_kg_value", datos.get("peso_kg", 0) or 0))
+    return {
+        "altura_cm": max(50, min(250, int(datos.get("altura_cm", 170)))),
+        "peso_kg": float(min(400.0, max(0.0, peso_kg))),
+        "peso_lb": float(st.session_state.get("peso_lb_value", 0.0)),
+        "grasa_pct": int(datos.get("grasa_pct", 20)),
+    }
 
-    st.session_state.metas.update({
-        "obj_talla":      st.session_state.get("obj_talla",""),
-        "obj_partes":     st.session_state.get("obj_partes",""),
-        "obj_ropero":     st.session_state.get("obj_ropero",""),
-        "obj_beneficio":  st.session_state.get("obj_beneficio",""),
-        "obj_eventos":    st.session_state.get("obj_eventos",""),
-        "obj_compromiso": st.session_state.get("obj_compromiso",""),
-    })
+# claves de los widgets de composición cuando CALCULADORA_EN_NAVEGADOR = False
+CLAVES_SERVIDOR = {"altura_cm": "altura_cm_input", "peso_kg": "peso_kg_input",
+                   "peso_lb": "peso_lb_input", "grasa_pct": "grasa_pct_input"}
 
-    
-    
-    st.header("Evaluación de Composición Corporal")
+def _guardar_composicion():
+    ss = st.session_state
+    if CALCULADORA_EN_NAVEGADOR:
+        envio = ss.get(CLAVE_CALCULADORA)
+    else:
+        envio = {campo: ss.get(clave) for campo, clave in CLAVES_SERVIDOR.items()}
+    v = calculadora.valores_finales(envio, _valores_composicion())
+    ss.datos.update(altura_cm=v["altura_cm"], peso_kg=v["peso_kg"], grasa_pct=v["grasa_pct"])
+    ss.peso_kg_value = v["peso_kg"]
+    if v["peso_lb"]:
+        ss.peso_lb_value = v["peso_lb"]
+
+def _guia_grasa():
+    st.write("### ¿Cuál consideras que es tu % de grasa según la imagen?")
+    img_local = (_datos_img_local("imagen_grasa_corporal.png", assets.ANCHO_COMPLETO)
+                 or _datos_img_local("grasa_ref.png", assets.ANCHO_COMPLETO))
+    img_local = _foto_actual("foto_grasa_referencia") or img_local
+    if img_local:
+        st.image(img_local, use_container_width=True)
+    else:
+        st.caption("Coloca 'imagen_grasa_corporal.png' o 'grasa_ref.png' en esta misma carpeta para mostrar una guía visual.")
 
+def _convertir_lb():
+    ss = st.session_state
+    peso_lb = ss.get(CLAVES_SERVIDOR["peso_lb"]) or 0.0
+    if peso_lb > 0:
+        ss.peso_kg_value = ss[CLAVES_SERVIDOR["peso_kg"]] = round(peso_lb * 0.45359237, 2)
+        ss.peso_lb_value = float(peso_lb)
+
+def _composicion_servidor():
+    # CALCULADORA_EN_NAVEGADOR = False: widgets de Streamlit dentro del formulario
+    # de la pantalla; los resultados se actualizan con cada envío
+    # arrancan con lo guardado; "Convertir" cambia peso_kg_input desde su callback
+    valores = _valores_composicion()
+    for campo, clave in CLAVES_SERVIDOR.items():
+        st.session_state.setdefault(clave, valores[campo])
     col = st.columns([2,1,1])
     with col[1]:
         peso_lb = st.number_input("Peso (lb)", min_value=0.0, max_value=900.0, step=0.1,
-                                  value=float(st.session_state.get("peso_lb_value", 0.0)))
-        if st.button("Convertir a kilogramos"):
-            if peso_lb and peso_lb > 0:
-                st.session_state["peso_kg_value"] = round(peso_lb * 0.45359237, 2)
-                st.session_state["peso_lb_value"]  = float(peso_lb)
-                st.success(f"{peso_lb} lb = {st.session_state['peso_kg_value']} kg")
+                                  key=CLAVES_SERVIDOR["peso_lb"])
+        if st.form_submit_button("Convertir a kilogramos", on_click=_convertir_lb) and peso_lb > 0:
+            st.success(f"{peso_lb} lb = {st.session_state['peso_kg_value']} kg")
 
     with col[0]:
         altura_cm = st.number_input("Altura (cm)", min_value=50, max_value=250, step=1,
-                                    value=max(50, min(250, int(st.session_state.datos.get("altura_cm", 170)))))
-        st.session_state.datos["altura_cm"] = altura_cm
-        default_kg = float(st.session_state.get("peso_kg_value", st.session_state.datos.get("peso_kg", 0) or 0))
+                                    key=CLAVES_SERVIDOR["altura_cm"])
         peso_kg = st.number_input("Peso (kg)", min_value=0.0, max_value=400.0, step=0.1,
-                                  value=float(min(400.0, max(0.0, default_kg))), key="peso_kg_input")
+                                  key=CLAVES_SERVIDOR["peso_kg"])
         st.caption("Tip: si tienes libras, usa el conversor para pasar a kg.")
     with col[2]:
         st.write(" ")
-        grasa_pct = st.slider("¿Selecciona el % de grasa que más se parece?", 8, 45, 20)
+        grasa_pct = st.slider("¿Selecciona el % de grasa que más se parece?", 8, 45,
+                              key=CLAVES_SERVIDOR["grasa_pct"])
 
-    st.write("### ¿Cuál consideras que es tu % de grasa según la imagen?")
-    img_local = load_img("imagen_grasa_corporal.png") or load_img("grasa_ref.png")
-    uploaded = st.file_uploader("Sube una imagen de referencia (opcional)", type=["png","jpg","jpeg"])
-    if uploaded is not None:
-        try:
-            img_local = Image.open(uploaded)
-        except Exception:
-            st.warning("No pude abrir la imagen subida.")
-    if img_local:
-        st.image(img_local, use_container_width=True)
-    else:
-        st.caption("Coloca 'imagen_grasa_corporal.png' o 'grasa_ref.png' en esta misma carpeta para mostrar una guía visual.")
+    _guia_grasa()
 
     st.divider()
     st.subheader("Resultados Personalizados")
-    st.session_state.datos["altura_cm"] = altura_cm
-    st.session_state.datos["peso_kg"]   = peso_kg
-    st.session_state.datos["grasa_pct"] = grasa_pct
-
-    edad   = _calcular_edad(st.session_state.datos.get("fecha_nac"))
-    genero = st.session_state.datos.get("genero", "HOMBRE")
 
-    imc_val = imc(peso_kg, altura_cm)
+    f = _fijos_composicion()
+    r = resultados_composicion(peso_kg, altura_cm, f["genero"], f["edad"], st.session_state.metas)
 
-    datos = st.session_state.get('datos', {})
-    genero_ref = (datos.get('genero') or 'Hombre')
-    fecha_nac  = (datos.get('fecha_nac'))
-    edad_ref   = edad_desde_fecha(fecha_nac) or int(datos.get('edad', 30))
-    rmin, rmax = _rango_grasa_referencia(genero_ref, edad_ref)
+    st.write(INTRO_RESULTADOS)
+    for parrafo in narrativa_composicion(r, grasa_pct, f["genero"], f["edad_ref"], *f["rango"]):
+        st.write(parrafo)
+    st.write(CIERRE_RESULTADOS)
 
-    agua_ml = req_hidratacion_ml(peso_kg)
-    prote_g = req_proteina(genero, st.session_state.metas, peso_kg)
-    bmr     = bmr_mifflin(genero, peso_kg, altura_cm, edad)
+# (clave, pregunta, etiqueta del presupuesto diario)
+PRESUPUESTO = [
+    ("presu_comida", "¿Cuánto gastas a la semana en tu comida?", "Comida"),
+    ("presu_snacks", "¿Cuánto en dulces, golosinas y/o snacks salados?", "Golosinas/snacks"),
+    ("presu_bebidas", "¿Cuánto en gaseosas/agua/refrescos/alcohol?", "Bebidas"),
+    ("presu_deliveries", "¿Cuánto en deliveries/salidas a comer?", "Restaurantes/deliveries"),
+]
 
-    meta_masa = st.session_state.metas.get("masa_muscular", False)
-    objetivo_kcal = bmr + 250 if meta_masa else bmr - 250
+def _guardar_presupuesto():
+    ss = st.session_state
+    semanal = {k: float(ss.get(k) or 0.0) for k, _, _ in PRESUPUESTO}
+    ss.estilo_vida.update(semanal)
+    ss.presu_diario = {k: round(v / 7, 2) for k, v in semanal.items()}
 
-    st.write("Lo que estás a punto de escuchar no es “un dato más”. Es tu mapa personal de bienestar."
-             " Son números que explican cómo está respondiendo tu cuerpo hoy… y hacia dónde puede ir, tomando buenas decisiones. ")
+def _guardar_p3(ir=None):
+    # "Calcular presupuesto diario" (ir=None) guarda sin cambiar de pantalla
+    ss = st.session_state
+    _guardar_presupuesto()
+    ss.estilo_vida["ev_valora_optimizar"] = ss.get("ev_valora_optimizar", "")
+    _guardar_composicion()
+    if ir:
+        ir()
 
-    if 18.6 <= imc_val <= 24.9:
-        st.write(
-            f"📌 Tu Índice de Masa Corporal (IMC) es de {imc_val:.1f}, eso indica que tienes PESO NORMAL lo que significa que deberías tener buena condición física, "
-            f"vitalidad y buen nivel de energía, ¿Te sientes así? . Si la respuesta es “no”, entonces el IMC solo te está diciendo que estás “dentro del rango”, pero tu cuerpo ya te está pidiendo ajustes."
-)
-    else:
-        st.write(
-            f"📌 Tu Índice de Masa Corporal (IMC) es de **{imc_val:.1f}**, eso indica que tienes **{_imc_categoria_y_sintomas(imc_val)[0]}** "
-            f"y eres propenso a **{_imc_categoria_y_sintomas(imc_val)[1] or '—'}**. "
-            f"Como referencia, el IMC ideal es de 18.6 a 24.9."
-        )
+def pantalla3():
+    scroll_to_top()
 
-    genero_pal = "mujer" if str(genero).strip().upper().startswith("M") else "hombre"
-    articulo = "Una" if genero_pal == "mujer" else "Un"
-    st.write(
-        f"📌 {articulo} {genero_pal} de {edad_ref} años como tú tiene "
-        f"**{rmin:.1f} % de grasa en el mejor de los casos y {rmax:.1f} % en el peor de los casos. "
-        f" Tú tienes {grasa_pct}%**. La grasa corporal es un indicador clave: cuanto más cerca te encuentres al mejor de los casos, tu energía, tu sueño, tu digestión y tu estado emocional mejoran."
-    )
 
-    st.write(f"📌 Tu requerimiento diario y mínimo de hidratación es de **{agua_ml:,} ml/día.** "
-                f"Tu cuerpo lo necesita para limpiar toxinas, optimizar la función cerebral, transportar nutrientes y estabilizar el apetito. "
-                f"Cuando no llegas a este nivel, tu cuerpo funciona a “media máquina”. Hidratarte correctamente es uno de los cambios más poderosos que puedes hacer."
-                 
-    )
+    st.header ("3) Análisis de presupuesto")
 
-    if objetivo_kcal < 1200:
-        st.write(
-            f"📌 Tu metabolismo en reposo es de {bmr:,} y para alcanzar tu objetivo "
-            f"se recomienda una ingesta diaria de 1,200 calorías. "
-            f"Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal."
+    cur = _pais().currency_symbol
+    ev = st.session_state.estilo_vida
+
+    # Un solo formulario: montos, respuesta y composición (también la
+    # calculadora del navegador) llegan juntos con "Calcular presupuesto
+    # diario" o con "Anterior"/"Siguiente"; escribir no provoca reruns.
+    with st.form("pantalla3", enter_to_submit=False):
+        col = st.columns(4)
+        for c, (k, pregunta, _) in zip(col, PRESUPUESTO):
+            with c:
+                st.number_input(f"{pregunta} ({cur})", min_value=0.0, step=0.1,
+                                value=float(ev.get(k, 0.0)), key=k)
+        st.form_submit_button("Calcular presupuesto diario", key="enviar_presupuesto",
+                              on_click=_guardar_p3, use_container_width=True)
+
+        # ================================
+        # Resultados
+        # ================================
+        st.markdown("### Presupuesto diario estimado:")
+        fmt = _formato()
+        diario = st.session_state.get("presu_diario", {})
+        for k, _, etiqueta in PRESUPUESTO:
+            st.write(f"- **{etiqueta}:** {fmt.decimales(diario.get(k, 0.0))}")
+        st.markdown("---")
 
-        )
-    else:
-        st.write(
-            f"📌 Tu metabolismo en resposo es de {bmr:,} calorías y para alcanzar tu objetivo "
-            f"**se recomienda una ingesta diaria de {objetivo_kcal:,} calorías.** "
-            f"Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal."
+        st.text_input(
+            "¿Consideras valioso optimizar tu presupuesto para alcanzar tus objetivos?",
+            value=ev.get("ev_valora_optimizar", ""),
+            key="ev_valora_optimizar",
         )
 
-    pollo_g = int(round((prote_g / 22.5) * 100))
-    huevos_n = int(round(prote_g / 5.5))
-    st.write(
-        f"📌 Tu **requerimiento de proteína** según el objetivo que te has propuesto es de **{prote_g} gramos al día.** "
-        f"Esto es lo que realmente define tu composición corporal. "
-        f"Como referencia, si solo comieras pollo o huevo durante el dia, esto equivale a {pollo_g} g de pechuga de pollo o {huevos_n} huevos. "
-        f"Alcanzar tu requerimiento de proteína diario te permite preservar y aumentar músculo, evitar la flacidez en la pérdida de peso, controlar el apetito, mejorar tu metabolismo y mantener tu energía estable. "
-        f"La proteína no es un suplemento exclusivo para deportistas, es un pilar de la nutrición diaria."
-    )
+        st.header("Evaluación de Composición Corporal")
 
-    st.write("Hasta aqui, ¿Qué te parece la información que has recibido en esta evaluación?")
+        if CALCULADORA_EN_NAVEGADOR:
+            # altura, peso y % de grasa se ajustan en el navegador sin reruns
+            _guia_grasa()
+            f = _fijos_composicion()
+            calculadora.mostrar(_valores_composicion(), f["genero"], f["edad"], f["edad_ref"], f["rango"],
+                                st.session_state.metas, key=CLAVE_CALCULADORA)
+        else:
+            _composicion_servidor()
 
+        bton_nav(guardar=_guardar_p3)
 
-    bton_nav()
+    # el uploader avisa al subir (on_change), algo que un st.form no permite
+    _foto_subida("foto_grasa_referencia", "Sube una imagen de referencia para el % de grasa (opcional)")
 
 
     
 # -------------------------------------------------------------
 # STEP 4 - Quiénes somos
 # -------------------------------------------------------------
-def show_img(filename: str, caption: str = ""):
-    p = (APP_DIR / filename)
-    if p.exists():
+def show_img(filename: str, caption: str = "", ancho: int = assets.ANCHO_COMPLETO):
+    img = assets.imagen(filename, ancho)
+    if img:
         try:
-            img = Image.open(p)
-            st.image(img, caption=caption if caption else None, use_container_width=True)
+            # Bytes ya listos: st.image envía el JPEG/PNG tal cual si cabe en el ancho
+            st.image(img.datos, caption=caption if caption else None, use_container_width=True)
         except Exception as e:
             st.warning(f"No pude abrir '{filename}': {e}")
     else:
@@ -1687,13 +720,6 @@ def show_img(filename: str, caption: str = ""):
 def pantalla4():
     st.header("4) Resultados")
 
-    # (Estilo se puede dejar aunque ya no haya texto; no rompe nada)
-    st.markdown("""
-        <style>
-        .testi-title{ font-weight: 800; font-size: 1.2rem; margin: 8px 0 2px 0; }
-        .testi-box{ margin-bottom: 18px; }
-        </style>
-    """, unsafe_allow_html=True)
 
     testimonios = [
         ("jessiyroi.jpg","Jessi y Roi son papás de 3 niños",
@@ -1725,18 +751,9 @@ def pantalla4():
     st.divider()
     st.markdown("## Y yo también tengo un resultado que compartirte")
 
-    foto_usuario = st.file_uploader(
-        "Sube tu foto aquí",
-        type=["jpg", "jpeg", "png"],
-        key="foto_resultado_usuario"
-    )
-
+    foto_usuario = _foto_subida("foto_resultado_usuario", "Sube tu foto aquí")
     if foto_usuario:
-        try:
-            img_user = Image.open(foto_usuario)
-            st.image(img_user, use_container_width=True)
-        except Exception as e:
-            st.error(f"No se pudo mostrar la imagen: {e}")
+        st.image(foto_usuario, use_container_width=True)
     # ====================================
 
     bton_nav()
@@ -1793,321 +810,216 @@ def pantalla5():
 # =========================
 # Utilidad: construir Excel
 # =========================
-def _excel_bytes():
-    d = st.session_state.get("datos", {})
-    e = st.session_state.get("estilo_vida", {})
-    m = st.session_state.get("metas", {})
-    refs = st.session_state.get("valoracion_contactos", []) or []
-    combo = st.session_state.get("combo_elegido")
+EXPORT_CACHE_MAX = 64   # workbooks distintos que se guardan por proceso
 
-    altura_cm = d.get("altura_cm")
-    peso_kg   = d.get("peso_kg")
-    grasa_pct = d.get("grasa_pct")
-    edad_calc = edad_desde_fecha(d.get("fecha_nac")) or 0
-    genero    = d.get("genero") or "HOMBRE"
-    imc_val   = imc(peso_kg or 0, altura_cm or 0)
-    agua_ml   = req_hidratacion_ml(peso_kg or 0)
-    prote_g   = req_proteina(genero, m, peso_kg or 0)
-    bmr_val   = bmr_mifflin(genero, peso_kg or 0, altura_cm or 0, max(edad_calc, 16))
-    objetivo_kcal = m.get("masa_muscular") and (bmr_val + 250) or (bmr_val - 250)
-
-    cur = st.session_state.get("currency_symbol", "S/")
-    perfil = [
-        ("¿Cuál es tu nombre completo?", d.get("nombre","")),
-        ("¿Cuál es tu correo electrónico?", d.get("email","")),
-        ("¿Cuál es su número de teléfono?", d.get("movil","")),
-        ("¿En que ciudad vives?", d.get("ciudad","")),
-        ("¿Cuál es tu fecha de nacimiento?", d.get("fecha_nac","")),
-        ("¿Cuál es tu género?", d.get("genero","")),
-        ("País seleccionado", st.session_state.get("country_name","Perú")),
-        ("Altura (cm)", altura_cm),
-        ("Peso (kg)", peso_kg),
-        ("% de grasa estimado", grasa_pct),
-    ]
-    estilo = [
-        ("¿Tomas desayuno todos los días? ¿A qué hora?", e.get("desayuno_h","")),
-        ("¿Qué sueles desayunar?", e.get("que_desayunas","")),
-        ("¿Comes entre comidas? ¿Qué sueles comer?", e.get("meriendas","")),
-        ("Tiendes a comer de más por las noches?", e.get("comer_noche","")),
-        ("Cuál es tu mayor reto respecto a la comida?", e.get("reto","")),
-        ("¿Tomas por lo menos 8 vasos de agua al dia?", e.get("agua8_p1","")),
-        ("¿En qué momento del día sientes menos energía?", e.get("ev_menos_energia","")),
-        ("¿Practicas actividad física al menos 3 veces/semana?", e.get("ev_actividad","")),
-        ("¿Has intentado algo antes para verte/estar mejor? (Gym, Dieta, App, Otros)", e.get("ev_intentos","")),
-        ("¿Qué es lo que más se te complica? (Constancia, Alimentación, Motivación, Otros)", e.get("ev_complica","")),
-        ("¿Consideras que cuidar de ti es una prioridad?", e.get("ev_prioridad_personal","")),
-        ("¿Consideras valioso optimizar tu presupuesto y darle prioridad a comidas y bebidas que aporten a tu bienestar y objetivos?",
-         e.get("ev_valora_optimizar","")),
-    ]
-    metas = [
-        ("Perder Peso", bool(m.get("perder_peso"))),
-        ("Tonificar / Bajar Grasa", bool(m.get("tonificar"))),
-        ("Aumentar Masa Muscular", bool(m.get("masa_muscular"))),
-        ("Aumentar Energía", bool(m.get("energia"))),
-        ("Mejorar Rendimiento Físico", bool(m.get("rendimiento"))),
-        ("Mejorar Salud", bool(m.get("salud"))),
-        ("Otros", m.get("otros","")),
-        ("¿Qué talla te gustaría ser?", m.get("obj_talla","")),
-        ("¿Qué partes del cuerpo te gustaría mejorar?", m.get("obj_partes","")),
-        ("¿Qué tienes en tu ropero que podamos usar como meta?", m.get("obj_ropero","")),
-        ("¿Cómo te beneficia alcanzar tu meta?", m.get("obj_beneficio","")),
-        ("¿Qué eventos tienes en los próximos 3 o 6 meses?", m.get("obj_eventos","")),
-        ("Nivel de compromiso (1-10)", m.get("obj_compromiso","")),
-        (f"Gasto diario en comida ({cur}.)", e.get("presu_comida","")),
-        (f"Gasto diario en postres/snacks/dulces ({cur}.)", e.get("presu_cafe","")),
-        (f"Gasto semanal en bebidas ({cur}.)", e.get("presu_alcohol","")),
-        (f"Gasto semanal en deliveries/salidas a comer ({cur}.)", e.get("presu_deliveries","")),
-    ]
-    composicion = [
-        ("IMC", imc_val),
-        ("Requerimiento de hidratación (ml/día)", agua_ml),
-        ("Requerimiento de proteína (g/día)", prote_g),
-        ("Metabolismo en reposo (kcal/día)", bmr_val),
-        ("Objetivo calórico (kcal/día)", objetivo_kcal),
-    ]
-    condiciones = [
-        ("¿Estreñimiento?", bool(st.session_state.get("p3_estrenimiento"))),
-        ("¿Colesterol Alto?", bool(st.session_state.get("p3_colesterol_alto"))),
-        ("¿Baja Energía?", bool(st.session_state.get("p3_baja_energia"))),
-        ("¿Dolor Muscular?", bool(st.session_state.get("p3_dolor_muscular"))),
-        ("¿Gastritis?", bool(st.session_state.get("p3_gastritis"))),
-        ("¿Hemorroides?", bool(st.session_state.get("p3_hemorroides"))),
-        ("¿Hipertensión?", bool(st.session_state.get("p3_hipertension"))),
-        ("¿Dolor Articular?", bool(st.session_state.get("p3_dolor_articular"))),
-        ("¿Ansiedad por comer?", bool(st.session_state.get("p3_ansiedad_por_comer"))),
-        ("¿Jaquecas / Migrañas?", bool(st.session_state.get("p3_jaquecas_migranas"))),
-        ("Diabetes (antecedentes familiares)", bool(st.session_state.get("p3_diabetes_antecedentes_familiares"))),
-    ]
-    seleccion = []
-    if combo:
-        seleccion = [
-            ("Programa elegido", combo.get("titulo","")),
-            ("Items", " + ".join(combo.get("items",[]))),
-            ("Precio regular", combo.get("precio_regular","")),
-            ("Descuento (%)", combo.get("descuento_pct","")),
-            ("Precio final", combo.get("precio_final","")),
-            ("Moneda", st.session_state.get("currency_symbol","S/")),
-        ]
-
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        pd.DataFrame(perfil, columns=["Pregunta","Respuesta"]).to_excel(writer, index=False, sheet_name="Perfil")
-        pd.DataFrame(estilo, columns=["Pregunta","Respuesta"]).to_excel(writer, index=False, sheet_name="Estilo de Vida")
-        pd.DataFrame(metas, columns=["Pregunta","Respuesta"]).to_excel(writer, index=False, sheet_name="Metas")
-        pd.DataFrame(composicion, columns=["Indicador","Valor"]).to_excel(writer, index=False, sheet_name="Composición")
-        pd.DataFrame(condiciones, columns=["Condición","Sí/No"]).to_excel(writer, index=False, sheet_name="Condiciones")
-        if refs:
-            pd.DataFrame(refs).to_excel(writer, index=False, sheet_name="Referidos")
-        if seleccion:
-            pd.DataFrame(seleccion, columns=["Detalle","Valor"]).to_excel(writer, index=False, sheet_name="Selección")
-    buf.seek(0)
-    return buf.getvalue()
-
-# ========= util para cargar imágenes locales (APP_DIR o /mnt/data) =========
-def _carga_img_local(nombre: str):
-    p1 = APP_DIR / nombre
-    if p1.exists():
-        try:
-            return Image.open(p1)
-        except Exception:
-            pass
-    p2 = Path("/mnt/data") / nombre
-    if p2.exists():
-        try:
-            return Image.open(p2)
-        except Exception:
-            pass
-    return None
-
-# ========= calcula HTML de precio y payload coherente con tus reglas =========
-def _precio_programa_html_y_payload(titulo: str, items: List[str], descuento_pct: int):
-    total, faltantes = _precio_sumado(items)
-    cc = st.session_state.get("country_code")
-
-    # Canadá (recargo +15 y presentación especial salvo Chupapanza)
-    if cc == "CA" and titulo.strip() != "Batido + Chupapanza":
-        base_con_recargo = int(round(total + 15))
-        if descuento_pct:
-            precio_promocional = base_con_recargo
-            inflado = int(round(precio_promocional / (1 - descuento_pct/100)))
-            tachado = f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{_mon(inflado)}</span>"
-            precio_html = f"{tachado}<strong style='font-size:20px'>{_mon(precio_promocional)}</strong> {_chip_desc(descuento_pct)}"
-        else:
-            precio_promocional = base_con_recargo
-            precio_html = f"<strong style='font-size:20px'>{_mon(precio_promocional)}</strong>"
-        precio_final = precio_promocional
-        precio_regular = int(round(precio_final / (1 - descuento_pct/100))) if descuento_pct else precio_final
-    else:
-        precio_promocional = int(round(total))
-        if descuento_pct:
-            inflado = int(round(precio_promocional / (1 - descuento_pct/100)))
-            tachado = f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{_mon(inflado)}</span>"
-            precio_html = f"{tachado}<strong style='font-size:20px'>{_mon(precio_promocional)}</strong> {_chip_desc(descuento_pct)}"
-            # nota diaria sólo para Batido 5%
-            if titulo.strip().lower() in ("batido nutricional", "batido") and descuento_pct == 5:
-                if cc == "PE":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>(S/7.9 al dia)</span>"
-                elif cc == "CL":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>($1.744 al dia)</span>"
-                elif cc == "CO":
-                    precio_html += " <span style='font-size:13px; opacity:.8'>($6.693 al dia)</span>"
-                elif cc in ("ES-PEN", "ES-CAN", "IT"):
-                    diario = round(precio_promocional / 22.0, 2)
-                    precio_html += f" <span style='font-size:13px; opacity:.8'>(€{diario:.2f} al dia)</span>"
-                elif cc == "US":
-                    diario = round(precio_promocional / 30.0, 2)
-                    precio_html += f" <span style='font-size:13px; opacity:.8'>(${diario:.2f} al dia)</span>"
-        else:
-            precio_html = f"<strong style='font-size:20px'>{_mon(precio_promocional)}</strong>"
-        precio_final = precio_promocional
-        precio_regular = int(round(precio_final / (1 - descuento_pct/100))) if descuento_pct else precio_final
-
-    payload = {
-        "titulo": titulo,
-        "items": items,
-        "precio_regular": precio_regular,
-        "descuento_pct": descuento_pct,
-        "precio_final": precio_final,
+def _estado_export() -> Dict:
+    """Copia de todo lo que entra en el Excel (y nada más)."""
+    ss = st.session_state
+    return {
+        "datos": dict(ss.get("datos", {})),
+        "estilo_vida": dict(ss.get("estilo_vida", {})),
+        "metas": dict(ss.get("metas", {})),
+        "flags": {k: bool(ss.get(k)) for k in P3_FLAGS},
+        "valoracion_contactos": list(ss.get("valoracion_contactos", []) or []),
+        "combo_elegido": ss.get("combo_elegido"),
+        "country_name": ss.get("country_name", "Perú"),
+        "currency_symbol": _pais().currency_symbol,
     }
-    return precio_html, payload, faltantes
 
-# ========= Tarjetas en columnas (lado a lado y centradas) =========
-def _tarjeta_programa(col, titulo: str, items: List[str], desc_pct: int, img_name: str, idx: int):
-    if not all(_producto_disponible(i) for i in items):
-        return
+_digest_estado = exportacion.digest_estado
 
-    with col:
-        st.markdown(
-            """
-            <style>
-              .rd-card-h {
-                background: var(--rd-card);
-                border: 1px solid var(--rd-border);
-                border-radius: 20px;
-                box-shadow: var(--rd-shadow);
-                overflow: hidden;
-              }
-              .rd-card-h .body { padding: 14px 16px 16px 16px; text-align:center; }
-              .rd-card-h .tit { font-weight:800; color:var(--rd-accent); font-size:18px; margin:0 0 6px 0; }
-              .rd-card-h .sub { font-size:13px; color:var(--rd-muted); margin-bottom:8px; }
-              .rd-card-h .price { margin:8px 0 12px 0; }
-              .rd-miss { color:#b00020; font-size:12px; margin-top:4px; }
-            </style>
-            """,
-            unsafe_allow_html=True
-        )
+@st.cache_data(max_entries=EXPORT_CACHE_MAX, show_spinner=False)
+def _excel_cacheado(digest: str, _estado: Dict) -> bytes:
+    # La clave es sólo el digest (``_estado`` no se hashea): si cambia cualquier
+    # dato cambia el digest y se construye un workbook nuevo; los viejos salen por LRU.
+    return _excel_bytes(_estado)
 
-        st.markdown("<div class='rd-card-h'>", unsafe_allow_html=True)
+def _solicitar_export():
+    st.session_state.export_solicitado = True
 
-        img = _carga_img_local(img_name)
-        if img:
-            st.image(img, use_container_width=True)
-        else:
-            st.markdown(
-                "<div style='height:210px;background:#eee;display:flex;align-items:center;justify-content:center;color:#888'>Imagen no disponible</div>",
-                unsafe_allow_html=True
-            )
+@tiempos.medido()
+def _excel_bytes(estado: Dict | None = None):
+    return exportacion.excel_bytes(estado if estado is not None else _estado_export())
 
-        precio_html, payload, faltantes = _precio_programa_html_y_payload(titulo, items, desc_pct)
-        items_txt = " + ".join(_display_name(i) for i in items)
-
-        st.markdown(
-            f"""
-            <div class='body'>
-              <div class='tit'>{titulo}</div>
-              <div class='sub'>{items_txt}</div>
-              <div class='price'>{precio_html}</div>
-              {'<div class=\"rd-miss\">Falta configurar precio: ' + ', '.join(faltantes) + '</div>' if faltantes else ''}
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-        st.markdown("</div>", unsafe_allow_html=True)
-
-        if st.button("Elegir este", key=f"elegir_prog_{idx}", use_container_width=True):
-            st.session_state.combo_elegido = payload
-            st.success(f"Elegiste: {payload['titulo']} — Total {_mon(payload['precio_final'])}")
-
-def pantalla6():
+# ——— El workbook se arma en un pool de procesos, fuera del hilo de la página ———
+EXPORT_PROCESOS = int(os.environ.get("EXPORT_PROCESOS", trabajos.PROCESOS))
+EXPORT_COLA_MAX = int(os.environ.get("EXPORT_COLA_MAX", trabajos.COLA_MAX))
+EXPORT_POLL_S = 0.5
 
-    st.header("A continuación")
+# st.fragment (Streamlit >= 1.37) permite re-ejecutar sólo la zona de descarga mientras se espera
+_fragmento = getattr(st, "fragment", None)
 
-    st.write("te presento la asesoría detallada de nuestro programa")
+@st.cache_resource(show_spinner=False)
+def _exportador():
+    # Uno por proceso. Sin pool (o sin st.fragment para el polling) se exporta en línea como antes.
+    if _fragmento is None:
+        return None
+    try:
+        return trabajos.Exportador(EXPORT_PROCESOS, EXPORT_COLA_MAX, EXPORT_CACHE_MAX)
+    except Exception:
+        return None
 
-    st.write(
-        "No hay mejor manera que empezar tu proceso de puesta en forma que en tribu "
-        "y en compañía de otras personas caminando en la misma dirección."
+def _boton_descarga(excel_bytes: bytes):
+    file_country = _pais().code
+    st.download_button(
+        label="Descargar información",
+        data=excel_bytes,
+        file_name=f"Evaluacion_{file_country}_{st.session_state.get('datos', {}).get('nombre', 'usuario')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        use_container_width=True,
     )
 
-    st.markdown("## ¿Qué incluye el plan personalizado?")
+def _esperar_excel(digest: str, estado: Dict):
+    """Pide el workbook al pool y vuelve a preguntar cada EXPORT_POLL_S hasta que esté."""
+    exp = _exportador()
+    situacion = exp.solicitar(digest, exportacion.excel_bytes, estado)
+    if situacion == trabajos.LISTO:
+        st.rerun()    # la página completa ya encuentra el archivo y muestra el botón
+    elif situacion == trabajos.LLENO:
+        st.info("⏳ Hay muchas descargas en preparación; la tuya entra en unos segundos…")
+    else:
+        st.info("⏳ Preparando tu archivo…")
 
-    beneficios = [
-        ("entrenamiento.png", "Plataforma de entrenamiento",
-         "Rutinas desde 15 minutos cardio hit, pilates y entrenamiento de fuerza"),
-        ("coachingcontinuo.png", "Asesoría Personalizada",
-         "Acompañamiento 1 a 1 en tiempo real y seguimiento de tu progreso"),
-        ("whatsapp.png", "Chat de Asesoria Grupal por Whatsapp",
-         "Información valiosa, soporte y guía en TRIBU"),
-        ("diariodecomidas.png", "Diario de Comidas",
-         "App para calcular diariamente tus proteinas, calorias e hidratacion"),
-        ("suplementacion.png", "Suplementos Nutricionales",
-         "Complementa tus comidas con vitaminas, minerales, fibra, proteína y más a diario"),
-        ("llamadaclientes.png", "Llamada Semanal en Tribu",
-         "Desarrollamos el tema de la semana y compartimos el proceso"),
-    ]
+if _fragmento is not None:
+    _esperar_excel = _fragmento(run_every=EXPORT_POLL_S)(_esperar_excel)
 
-    # Ruta robusta (Linux en Streamlit Cloud es case-sensitive)
-    icons_dir = APP_DIR / "icons"
-    if not icons_dir.exists():
-        alt = APP_DIR / "Icons"
-        if alt.exists():
-            icons_dir = alt
+@tiempos.medido()
+def _descarga_excel(estado: Dict):
+    digest = _digest_estado(estado)
+    exp = _exportador()
+    if exp is None:
+        _boton_descarga(_excel_cacheado(digest, estado))
+        return
+    listo = exp.resultado(digest)
+    if listo is not None:
+        _boton_descarga(listo)
+    elif exp.situacion(digest) == trabajos.ERROR:
+        st.error("No se pudo preparar el archivo.")
+        st.button("Reintentar", key="reintentar_export", on_click=exp.solicitar,
+                  args=(digest, exportacion.excel_bytes, estado))
+    else:
+        _esperar_excel(digest, estado)
 
-    st.markdown(
-        """
-        <style>
-          .svc-title{ font-weight:800; color:#29453A; font-size:16px; line-height:1.2; margin:0; }
-          .svc-desc{ color:#29453A; font-size:14px; opacity:.9; line-height:1.25; margin:0; }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+# =========================
+# Almacén de evaluaciones (SQLite)
+# =========================
+EVALUACIONES_DB = Path(os.environ.get("EVALUACIONES_DB", APP_DIR / "datos" / "evaluaciones.sqlite3"))
 
-    # ✅ FIX: render “a prueba de fallos” (si un ícono falla, NO corta la página)
-    with st.container():
-        for fname, titulo, desc in beneficios:
-            try:
-                c_icon, c_title, c_desc = st.columns([1, 3, 7])
+@st.cache_resource(show_spinner=False)
+def _almacen():
+    # Uno por proceso (pool de conexiones + hilo escritor). Si el disco no se
+    # puede escribir (p. ej. un despliegue de sólo lectura) la app sigue sin él.
+    try:
+        return almacen.Almacen(EVALUACIONES_DB)
+    except Exception:
+        return None
 
-                ruta = icons_dir / fname
+@tiempos.medido()
+def _guardar_evaluacion(estado: Dict | None = None):
+    """Encola la evaluación de esta sesión si cambió desde la última vez (no espera al disco)."""
+    alm = _almacen()
+    if alm is None:
+        return
+    estado = estado if estado is not None else _estado_export()
+    digest = _digest_estado(estado)
+    id_evaluacion = st.session_state.setdefault("evaluacion_id", uuid.uuid4().hex)
+    # el almacén sabe si ese digest ya llegó a disco o sigue en cola; si el lote
+    # falló no lo sabe y el próximo rerun lo vuelve a encolar
+    if not alm.al_dia(id_evaluacion, digest):
+        alm.guardar(id_evaluacion, estado, digest)
 
-                with c_icon:
-                    if ruta.exists():
-                        # ✅ FIX: evita PIL/Image.open (a veces revienta en Cloud con algunos PNG)
-                        st.image(str(ruta), width=56)
-                    else:
-                        st.write(f"(Falta: {fname})")
+# ========= util para cargar imágenes locales (APP_DIR o /mnt/data) =========
+# El índice de assets ya incluye /mnt/data, así que no se hace stat en cada rerun.
+def _datos_img_local(nombre: str, ancho: int = assets.ANCHO_TARJETA) -> bytes | None:
+    # Para mostrar conviene pasar bytes a st.image: un objeto PIL siempre se
+    # recodifica (JPEG q100), los bytes del cache se envían tal cual.
+    img = assets.imagen(nombre, ancho)
+    return img.datos if img else None
+
+# ========= fotos que sube el cliente (subidas.py) =========
+# La foto se procesa una sola vez, en el on_change del uploader. La sesión sólo
+# guarda el derivado (st.session_state._fotos: campo -> Subida) y el uploader
+# cambia de key, así Streamlit suelta el archivo original al terminar el rerun.
+def _al_subir(campo: str, clave: str):
+    ss = st.session_state
+    archivo = ss.get(clave)
+    if archivo is None:
+        return
+    ss[f"_{campo}_v"] = ss.get(f"_{campo}_v", 0) + 1
+    fotos = ss.setdefault("_fotos", {})
+    try:
+        nueva = subidas.ingerir(archivo.getvalue(), assets.ANCHO_COMPLETO)
+    except subidas.SubidaInvalida as e:
+        ss[f"_{campo}_error"] = str(e)
+        return
+    otras = subidas.bytes_sesion({c: f for c, f in fotos.items() if c != campo})
+    if otras + nueva.peso > subidas.SESION_MAX_BYTES:
+        ss[f"_{campo}_error"] = "Ya subiste demasiadas fotos en esta evaluación; quita alguna para subir otra."
+        return
+    fotos[campo] = nueva
+    ss._fotos_bytes = subidas.bytes_sesion(fotos)
 
-                with c_title:
-                    st.markdown(f"<div class='svc-title'>{titulo}</div>", unsafe_allow_html=True)
+def _quitar_foto(campo: str):
+    fotos = st.session_state.get("_fotos", {})
+    fotos.pop(campo, None)
+    st.session_state._fotos_bytes = subidas.bytes_sesion(fotos)
 
-                with c_desc:
-                    st.markdown(f"<div class='svc-desc'>{desc}</div>", unsafe_allow_html=True)
+def _foto_actual(campo: str) -> bytes | None:
+    foto = st.session_state.get("_fotos", {}).get(campo)
+    return foto.datos if foto else None
 
-            except Exception as e:
-                st.warning(f"No se pudo renderizar '{fname}': {e}")
+def _foto_subida(campo: str, etiqueta: str) -> bytes | None:
+    """Uploader + foto ya procesada de ``campo`` (bytes para st.image) o None."""
+    ss = st.session_state
+    clave = f"{campo}_{ss.get(f'_{campo}_v', 0)}"
+    st.file_uploader(etiqueta, type=["jpg", "jpeg", "png"], key=clave,
+                     on_change=_al_subir, args=(campo, clave))
+    error = ss.pop(f"_{campo}_error", None)
+    if error:
+        st.warning(error)
+    foto = ss.get("_fotos", {}).get(campo)
+    if foto is None:
+        return None
+    st.button("Quitar foto", key=f"quitar_{campo}", on_click=_quitar_foto, args=(campo,))
+    return foto.datos
 
-    # ==== Cuenta regresiva ====
-    st.markdown(
-        """
-        Por las próximas 48 horas tienes un beneficio exclusivo del 5% a 10% de descuento según la opción que elijas.  
-        Te muestro las opciones 
-        """
-    )
+# ========= calcula HTML de precio y payload coherente con tus reglas =========
+# Los programas de la pantalla 6 salen de la tabla precalculada (una por catálogo,
+# compartida por todas las sesiones); el resto se cotiza en el momento.
+cotizaciones.tabla()
 
-    _init_promo_deadline()
-    _render_countdown()
+def _precio_programa_html_y_payload(titulo: str, items: List[str], descuento_pct: int):
+    c = cotizaciones.buscar(st.session_state.get("country_name"), titulo, items, descuento_pct)
+    if c is None:
+        c = precios.cotizar(titulo, items, descuento_pct, _get_precios(), _pais().code, _mon)
+    return c.precio_html, c.payload(), list(c.faltantes)
 
+# =============================================================
+# Zonas que se re-ejecutan solas (st.fragment)
+# =============================================================
+# Elegir un programa, marcar el PDM o cambiar una cantidad sólo re-ejecuta su
+# zona (sin tema, logo, íconos, imágenes de tarjetas ni export). Lo que cruza
+# de una zona al resto de la página va por estas claves de session_state:
+#   combo_elegido / auto_added_items  programa elegido (pantalla 6 -> export, pantalla 7)
+#   checkbox_pdm / total_con_pdm       PDM y total con PDM (pantalla 6)
+#   promo_deadline                     fin de la promo (contador)
+#   personaliza_total                  totales de la grilla (pantalla 7)
+_zona = _fragmento or (lambda f: f)
+
+def _elegir_programa(payload: Dict):
+    st.session_state.combo_elegido = payload
+    st.session_state.step = 6
+    st.session_state.auto_added_items = {item: 1 for item in payload["items"]}
+    st.session_state.pop(CLAVE_GRILLA, None)
+    st.session_state._programa_recien_elegido = payload["titulo"]
+
+_zona_personaliza = _zona(_render_personaliza_programa)
+if _fragmento is not None and not COUNTDOWN_EN_NAVEGADOR:
+    _reloj_promo = _fragmento(run_every=1)(_reloj_promo)
+
+@_zona
+@tiempos.medido()
+def _zona_programas():
     st.markdown("### Opciones recomendadas")
 
     _, c1, c2, c3, _ = st.columns([0.3, 1, 1, 1, 0.3])
@@ -2119,8 +1031,7 @@ def pantalla6():
     # =============================================================
     st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
 
-    cur = st.session_state.get("currency_symbol", "S/")
-    precio_pdm = st.session_state.get("precios", {}).get("PDM", 0)
+    precio_pdm = _get_precios().get("PDM", 0)
 
     st.markdown(
         """
@@ -2133,7 +1044,7 @@ def pantalla6():
     )
 
     st.session_state["checkbox_pdm"] = st.checkbox(
-        f"Sí deseo ({cur}{precio_pdm})",
+        f"Sí deseo ({_mon(precio_pdm)})",
         key="checkbox_pdm_key"
     )
 
@@ -2143,6 +1054,7 @@ def pantalla6():
     combo = st.session_state.get("combo_elegido")
     precio_combo = combo["precio_final"] if combo else 0
     precio_total = precio_combo + (precio_pdm if st.session_state["checkbox_pdm"] else 0)
+    st.session_state.total_con_pdm = precio_total
 
     st.markdown("<div style='height:15px'></div>", unsafe_allow_html=True)
 
@@ -2151,7 +1063,7 @@ def pantalla6():
         <div style="background:#FFFFFF; border:1px solid #E2E2E2;
         padding:14px; border-radius:14px; font-size:16px; font-weight:600;
         text-align:center; box-shadow:0 2px 6px rgba(0,0,0,0.06);">
-        El total de tu programa sería <strong>{cur}{precio_total}</strong>  
+        El total de tu programa sería <strong>{_mon(precio_total)}</strong>  
         <br><br>¿Cómo te gustaría pagarlo?
         </div>
         """,
@@ -2163,19 +1075,20 @@ def pantalla6():
     # =============================================================
     # TARJETAS DE PROGRAMAS
     # =============================================================
+    @tiempos.medido()
     def _render_programa(col, titulo, items, desc_pct, img_name, key_suffix):
 
         if not all(_producto_disponible(i) for i in items):
             return
 
         with col:
-            img = _carga_img_local(img_name)
+            img = _datos_img_local(img_name)
             if img:
                 st.image(img, use_container_width=True)
             else:
                 st.write(f"(Falta imagen: {img_name})")
 
-            items_txt = " + ".join(_display_name(i) for i in items)
+            items_txt = _nombres().texto(items)
 
             precio_html, payload, faltantes = _precio_programa_html_y_payload(titulo, items, desc_pct)
 
@@ -2230,14 +1143,9 @@ def pantalla6():
                     unsafe_allow_html=True
                 )
 
-            if st.button("Elegir este", key=f"program_{key_suffix}", use_container_width=True):
-
-                st.session_state.combo_elegido = payload
-                st.session_state.step = 6
-
-                st.session_state.auto_added_items = {item: 1 for item in payload["items"]}
-                st.session_state.custom_qty_version += 1
-
+            st.button("Elegir este", key=f"program_{key_suffix}", use_container_width=True,
+                      on_click=_elegir_programa, args=(payload,))
+            if st.session_state.get("_programa_recien_elegido") == payload["titulo"]:
                 st.success(f"Elegiste: {payload['titulo']} — Total {_mon(payload['precio_final'])}")
 
     _render_programa(c1, "Batido", ["Batido"], 5, "Batido.jpg", "batido")
@@ -2258,18 +1166,100 @@ def pantalla6():
             f"({e['descuento_pct']}% dscto)"
         )
 
+    elegido = st.session_state.pop("_programa_recien_elegido", None)
+    if elegido:
+        # lo que está fuera de la zona no se redibuja: la evaluación guardada se
+        # actualiza acá y, si ya hay un archivo a la vista, hace falta la página
+        # completa (una vez; el aviso "Elegiste" se vuelve a mostrar en ella)
+        _guardar_evaluacion()
+        if (_fragmento is not None and st.session_state.get("export_solicitado")
+                and not st.session_state.pop("_zona_programas_completa", False)):
+            st.session_state._programa_recien_elegido = elegido
+            st.session_state._zona_programas_completa = True
+            st.rerun()
+
+def pantalla6():
+
+    st.header("A continuación")
+
+    st.write("te presento la asesoría detallada de nuestro programa")
+
+    st.write(
+        "No hay mejor manera que empezar tu proceso de puesta en forma que en tribu "
+        "y en compañía de otras personas caminando en la misma dirección."
+    )
+
+    st.markdown("## ¿Qué incluye el plan personalizado?")
+
+    beneficios = [
+        ("entrenamiento.png", "Plataforma de entrenamiento",
+         "Rutinas desde 15 minutos cardio hit, pilates y entrenamiento de fuerza"),
+        ("coachingcontinuo.png", "Asesoría Personalizada",
+         "Acompañamiento 1 a 1 en tiempo real y seguimiento de tu progreso"),
+        ("whatsapp.png", "Chat de Asesoria Grupal por Whatsapp",
+         "Información valiosa, soporte y guía en TRIBU"),
+        ("diariodecomidas.png", "Diario de Comidas",
+         "App para calcular diariamente tus proteinas, calorias e hidratacion"),
+        ("suplementacion.png", "Suplementos Nutricionales",
+         "Complementa tus comidas con vitaminas, minerales, fibra, proteína y más a diario"),
+        ("llamadaclientes.png", "Llamada Semanal en Tribu",
+         "Desarrollamos el tema de la semana y compartimos el proceso"),
+    ]
+
+    # "icons/" o "Icons/" (Linux en Streamlit Cloud es case-sensitive): lo
+    # resuelve el índice de assets.
+
+    # ✅ FIX: render “a prueba de fallos” (si un ícono falla, NO corta la página)
+    with st.container():
+        for fname, titulo, desc in beneficios:
+            try:
+                c_icon, c_title, c_desc = st.columns([1, 3, 7])
+
+                icono = assets.imagen(f"icons/{fname}", assets.ANCHO_ICONO)
+                # si PIL no puede con el PNG (pasa en Cloud), se manda la ruta tal cual
+                fuente = icono.datos if icono else assets.ruta(f"icons/{fname}", assets.ANCHO_ICONO)
+
+                with c_icon:
+                    if fuente:
+                        st.image(fuente if isinstance(fuente, bytes) else str(fuente), width=56)
+                    else:
+                        st.write(f"(Falta: {fname})")
+
+                with c_title:
+                    st.markdown(f"<div class='svc-title'>{titulo}</div>", unsafe_allow_html=True)
+
+                with c_desc:
+                    st.markdown(f"<div class='svc-desc'>{desc}</div>", unsafe_allow_html=True)
+
+            except Exception as e:
+                st.warning(f"No se pudo renderizar '{fname}': {e}")
+
+    # ==== Cuenta regresiva ====
+    st.markdown(
+        """
+        Por las próximas 48 horas tienes un beneficio exclusivo del 5% a 10% de descuento según la opción que elijas.  
+        Te muestro las opciones 
+        """
+    )
+
+    _init_promo_deadline()
+    _render_countdown()
+
+    _zona_programas()
+
     st.divider()
     st.markdown("### 📥 Descargar Evaluación")
-    excel_bytes = _excel_bytes()
-    file_country = st.session_state.get("country_code", "PE")
+    # El workbook sólo se construye cuando lo piden; después se reutiliza
+    # mientras el digest del estado no cambie.
+    if not st.session_state.get("export_solicitado"):
+        st.button("Preparar descarga", key="preparar_export", on_click=_solicitar_export, use_container_width=True)
 
-    st.download_button(
-        label="Descargar información",
-        data=excel_bytes,
-        file_name=f"Evaluacion_{file_country}_{st.session_state.get('datos', {}).get('nombre', 'usuario')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True,
-    )
+    # Llegar aquí es terminar la evaluación: queda guardada aunque no la descarguen
+    estado = _estado_export()
+    _guardar_evaluacion(estado)
+
+    if st.session_state.get("export_solicitado"):
+        _descarga_excel(estado)
 
 # -------------------------------------------------------------
 # STEP 7 - Personaliza tu Programa (personalización completa)
@@ -2282,17 +1272,19 @@ def pantalla7():
         "y ver el total con los descuentos correspondientes."
     )
 
-    _render_personaliza_programa()
+    _zona_personaliza()
+    _guardar_evaluacion()
 
     bton_nav()
 
 # -------------------------------------------------------------
 # Side Nav
 # -------------------------------------------------------------
+@tiempos.medido()
 def sidebar_nav():
     with st.sidebar:
         st.title("Evaluación de Bienestar")
-        st.caption(f"País: {st.session_state.get('country_name','Perú')}  ·  Moneda: {st.session_state.get('currency_symbol','S/')}")
+        st.caption(f"País: {st.session_state.get('country_name','Perú')}  ·  Moneda: {_pais().currency_symbol}")
         for i, titulo in [
             (1, "Perfil de Bienestar"),
             (2, "Estilo de Vida"),
@@ -2308,6 +1300,62 @@ def sidebar_nav():
         st.markdown("---")
         st.markdown("**Selección actual (debug):**")
         st.write(st.session_state.get("combo_elegido"))
+        hoja, etiqueta = _tema()
+        st.caption(f"Tema {hoja.hash}: {hoja.bytes_fuente:,} → {len(etiqueta.encode()):,} bytes por rerun")
+        c = assets.CACHE.estadisticas()
+        st.caption(f"Cache de imágenes: {c['hits']} hits · {c['misses']} misses · "
+                   f"{c['entradas']} imgs · {c['bytes'] / 1e6:.1f}/{c['max_bytes'] / 1e6:.0f} MB")
+        f = subidas.ALMACEN.estadisticas()
+        st.caption(f"Fotos subidas: {st.session_state.get('_fotos_bytes', 0) / subidas.MB:.1f}/"
+                   f"{subidas.SESION_MAX_BYTES / subidas.MB:.0f} MB en esta sesión · {f['entradas']} en cache "
+                   f"({f['bytes'] / subidas.MB:.1f}/{f['max_bytes'] / subidas.MB:.0f} MB) · "
+                   f"{f['rechazadas']} rechazadas")
+        alm = _almacen()
+        if alm is not None:
+            a = alm.estadisticas()
+            st.caption(f"Evaluaciones: {a['escritas']} escritas en {a['lotes']} lotes · "
+                       f"{a['pendientes']} pendientes · {a['rechazadas'] + a['errores']} fallidas")
+        # sólo si ya hubo una exportación en este proceso: mirar no crea el pool
+        exp = _exportador()
+        if exp is not None and exp.activo:
+            x = exp.estadisticas()
+            st.caption(f"Exportaciones: {x['pendientes']}/{x['cola_max']} en cola · {x['terminados']} listas · "
+                       f"{x['rechazados']} rechazadas · {x['fallidos']} fallidas · "
+                       f"p50 {x['total_p50_ms']:.0f} ms · p95 {x['total_p95_ms']:.0f} ms")
+        if MOSTRAR_TIEMPOS:
+            _tabla_tiempos()
+        if MEDIR_PESO:
+            _tabla_peso()
+
+def _tabla_peso():
+    ultimo = st.session_state.get("_peso_ultimo")
+    if ultimo:
+        st.caption(f"Rerun anterior ({ultimo['pantalla']}): {ultimo['bytes'] / 1024:.1f} KB "
+                   f"en {ultimo['mensajes']} mensajes")
+    r = _medidor_peso().resumen()
+    if not r["pantallas"]:
+        return
+    with st.expander("Peso por pantalla (KB por rerun)"):
+        tabla = ["| pantalla | reruns | prom. | máx. | presupuesto |", "|---|---:|---:|---:|---:|"]
+        for nombre, p in r["pantallas"].items():
+            limite = PESO_PRESUPUESTO_KB.get(nombre)
+            tabla.append(f"| {nombre} | {p['reruns']} | {p['promedio'] / 1024:.1f} | {p['max'] / 1024:.1f} | "
+                         f"{'' if limite is None else f'{limite:.0f}'} |")
+        tabla += ["", "| pantalla | sitio | mensajes | KB |", "|---|---|---:|---:|"]
+        for pantalla, sitio, m, b in r["sitios"][:10]:
+            tabla.append(f"| {pantalla} | `{sitio}` | {m} | {b / 1024:.1f} |")
+        st.markdown("\n".join(tabla))
+
+def _tabla_tiempos():
+    filas = tiempos.REGISTRO.resumen()
+    if not filas:
+        return
+    with st.expander("Latencias (ms, este proceso)"):
+        tabla = ["| tramo | n | p50 | p95 | p99 | total s |", "|---|---:|---:|---:|---:|---:|"]
+        for nombre, r in filas.items():
+            tabla.append(f"| {nombre} | {r['n']} | {r['p50_ms']:.1f} | {r['p95_ms']:.1f} | "
+                         f"{r['p99_ms']:.1f} | {r['total_ms'] / 1000:.1f} |")
+        st.markdown("\n".join(tabla))
 
 # -------------------------------------------------------------
 # Main
@@ -2323,33 +1371,38 @@ def scroll_to_top():
     )
 
 def main():
-    init_state()
-    inject_theme()
-
-    # Sidebar
-    sidebar_nav()
-
-    if st.session_state.get("_scroll_top"):
-        scroll_to_top()
-        st.session_state._scroll_top = False
-
-
-    # Router de pantallas
-    s = st.session_state.step
-    if s == 1:
-        pantalla1()
-    elif s == 2:
-        pantalla2()
-    elif s == 3:
-        pantalla3()
-    elif s == 4:
-        pantalla4()
-    elif s == 5:
-        pantalla5()
-    elif s == 6:
-        pantalla6()
-    elif s == 7:
-        pantalla7()
+    _escritor_tiempos()
+    medidor = _medidor_peso() if MEDIR_PESO else None
+    if medidor is not None:
+        medidor.instalar(get_script_run_ctx())
+        medidor.empezar(f"pantalla{st.session_state.get('step', 1)}")
+    try:
+        _rerun()
+    finally:
+        if medidor is not None:
+            st.session_state._peso_ultimo = medidor.terminar()
+
+def _rerun():
+    with tiempos.tramo("rerun"):
+        init_state()
+        inject_theme()
+
+        # Sidebar
+        sidebar_nav()
+
+        if st.session_state.get("_scroll_top"):
+            scroll_to_top()
+            st.session_state._scroll_top = False
+
+
+        # Router de pantallas
+        s = st.session_state.step
+        pantalla = PANTALLAS.get(s)
+        if pantalla is not None:
+            with tiempos.tramo(f"pantalla{s}"):
+                pantalla()
+
+PANTALLAS = {1: pantalla1, 2: pantalla2, 3: pantalla3, 4: pantalla4, 5: pantalla5, 6: pantalla6, 7: pantalla7}
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Resolución y cache de las imágenes de la app.
+
+``optimizar_assets.py`` genera en ``derivados/`` versiones redimensionadas de
+cada imagen al ancho con que realmente se muestran, más un ``manifest.json``
+con los hashes. Aquí se busca, para un archivo y un ancho, el derivado más
+pequeño que alcanza; si no hay manifest o el original cambió desde que se
+generó, se usa el original.
+
+``imagen()`` además guarda, una vez por proceso y para todas las sesiones, la
+imagen decodificada y lista para st.image (LRU limitado en bytes).
+"""
+import fnmatch
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent.resolve()
+MNT_DATA_DIR = Path("/mnt/data")
+DERIVADOS_DIR = APP_DIR / "derivados"
+MANIFEST_PATH = DERIVADOS_DIR / "manifest.json"
+
+# Anchos (px) con que cada pantalla muestra las imágenes. st.image no reescala
+# ni recodifica un JPEG/PNG que ya cabe en su ancho, así que el derivado se
+# envía tal cual al navegador.
+ANCHO_ICONO = 56         # pantalla6: íconos de beneficios (st.image width=56)
+ANCHO_TARJETA = 720      # pantalla6: foto de cada programa (3 columnas)
+ANCHO_COMPLETO = 1200    # pantalla3/4: imágenes a todo el ancho del contenedor
+
+# Patrón (relativo a APP_DIR) -> anchos a generar. Gana el primero que coincida;
+# lo que no aparece aquí no se muestra con st.image (p. ej. el logo o las copias
+# de los íconos en la raíz) y no lleva derivados.
+ANCHOS_POR_ARCHIVO = [
+    ("icons/logo.png", ()),           # el logo va por branding.logo_reducido
+    ("icons/eventostribu.png", ()),   # no está entre los beneficios de pantalla 6
+    ("icons/*", (ANCHO_ICONO,)),
+    ("Batido*.jpg", (ANCHO_TARJETA,)),
+    ("*.jpg", (ANCHO_COMPLETO,)),
+    ("*grasa*.png", (ANCHO_COMPLETO,)),
+]
+
+EXTENSIONES = (".png", ".jpg", ".jpeg")
+
+
+def anchos_para(relativo: str) -> tuple:
+    for patron, anchos in ANCHOS_POR_ARCHIVO:
+        if fnmatch.fnmatch(relativo, patron):
+            return anchos
+    return ()
+
+
+def sha256_archivo(p: Path) -> str:
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+# manifest ya validado, recargado sólo si cambia el mtime del archivo
+_manifest_cache = {"mtime": None, "assets": {}}
+
+
+def _manifest() -> dict:
+    try:
+        mtime = MANIFEST_PATH.stat().st_mtime_ns
+    except OSError:
+        return {}
+    if _manifest_cache["mtime"] != mtime:
+        try:
+            datos = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            datos = {}
+        vigentes = {}
+        for relativo, info in datos.get("assets", {}).items():
+            original = APP_DIR / relativo
+            # un original editado después del build invalida sus derivados
+            if original.exists() and sha256_archivo(original) == info.get("sha256"):
+                vigentes[relativo] = info
+        _manifest_cache.update(mtime=mtime, assets=vigentes)
+    return _manifest_cache["assets"]
+
+
+def ruta_derivado(relativo: str, ancho: int) -> Path | None:
+    """El derivado más chico con ancho >= ``ancho`` (o el más grande que haya)."""
+    info = _manifest().get(relativo)
+    if not info or not info.get("derivados"):
+        return None
+    derivados = sorted(info["derivados"], key=lambda d: d["ancho"])
+    elegido = next((d for d in derivados if d["ancho"] >= ancho), derivados[-1])
+    p = APP_DIR / elegido["archivo"]
+    return p if p.exists() else None
+
+
+def resolver(relativo: str, ancho: int) -> Path:
+    """Ruta a mostrar para ``relativo``: el derivado si existe, si no el original."""
+    return ruta_derivado(relativo, ancho) or (APP_DIR / relativo)
+
+
+# =========================
+# Índice nombre -> ruta (una vez por proceso)
+# =========================
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def _construir_indice() -> dict:
+    indice = {}
+    # /mnt/data primero para que APP_DIR lo pise: sólo es un respaldo
+    for base, carpetas in ((MNT_DATA_DIR, ("",)), (APP_DIR, ("", "icons", "Icons"))):
+        for sub in carpetas:
+            carpeta = base / sub if sub else base
+            if not carpeta.is_dir():
+                continue
+            for p in carpeta.iterdir():
+                if p.is_file() and p.suffix.lower() in EXTENSIONES:
+                    rel = f"{sub.lower()}/{p.name}" if sub else p.name
+                    indice[rel] = p
+    return indice
+
+
+def indice() -> dict:
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = _construir_indice()
+    return _indice
+
+
+def reconstruir_indice():
+    """Para cuando se agregan imágenes con la app corriendo."""
+    global _indice
+    with _indice_lock:
+        _indice = _construir_indice()
+
+
+def ruta(relativo: str, ancho: int) -> Path | None:
+    """Derivado si lo hay; si no, el original de APP_DIR (o /mnt/data)."""
+    return ruta_derivado(relativo, ancho) or indice().get(relativo)
+
+
+# =========================
+# Cache LRU de imágenes listas para mostrar
+# =========================
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImagenLista:
+    imagen: object       # PIL.Image ya decodificada y al ancho de pantalla
+    datos: bytes         # JPEG/PNG que st.image envía sin recodificar
+    ruta: Path
+    mtime_ns: int
+
+    @property
+    def peso(self) -> int:
+        w, h = self.imagen.size
+        return w * h * len(self.imagen.getbands()) + len(self.datos)
+
+
+def _preparar(p: Path, ancho: int) -> tuple:
+    from PIL import Image, ImageOps
+
+    crudo = p.read_bytes()
+    with Image.open(io.BytesIO(crudo)) as im:
+        formato = im.format
+        girada = im.getexif().get(0x0112, 1) != 1   # orientación EXIF
+        img = ImageOps.exif_transpose(im) if girada else im.copy()
+    if img.width > ancho:
+        alto = max(1, round(img.height * ancho / img.width))
+        img = img.resize((ancho, alto), Image.LANCZOS)
+    elif formato in ("JPEG", "PNG") and not girada:
+        return img, crudo   # ya sirve tal cual (p. ej. un derivado)
+    buf = io.BytesIO()
+    if img.mode in ("RGBA", "LA", "P"):
+        img.save(buf, format="PNG", optimize=True)
+    else:
+        img.convert("RGB").save(buf, format="JPEG", quality=85, optimize=True)
+    return img, buf.getvalue()
+
+
+class CacheImagenes:
+    """LRU por (archivo, ancho), limitado en bytes e invalidado por mtime."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expulsiones = 0
+
+    def obtener(self, relativo: str, ancho: int) -> ImagenLista | None:
+        p = ruta(relativo, ancho)
+        if p is None:
+            return None
+        try:
+            mtime = p.stat().st_mtime_ns
+        except OSError:
+            return None
+        clave = (relativo, ancho)
+        with self._lock:
+            e = self._entradas.get(clave)
+            if e is not None and e.ruta == p and e.mtime_ns == mtime:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return e
+            self.misses += 1
+        try:
+            img, datos = _preparar(p, ancho)
+        except Exception:
+            return None
+        nueva = ImagenLista(img, datos, p, mtime)
+        with self._lock:
+            vieja = self._entradas.pop(clave, None)
+            if vieja is not None:
+                self._bytes -= vieja.peso
+            if nueva.peso <= self.max_bytes:
+                self._entradas[clave] = nueva
+                self._bytes += nueva.peso
+                while self._bytes > self.max_bytes:
+                    _, fuera = self._entradas.popitem(last=False)
+                    self._bytes -= fuera.peso
+                    self.expulsiones += 1
+        return nueva
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expulsiones": self.expulsiones,
+            }
+
+
+# compartido por todas las sesiones del proceso
+CACHE = CacheImagenes()
+
+
+def imagen(relativo: str, ancho: int) -> ImagenLista | None:
+    return CACHE.obtener(relativo, ancho)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Logo fijo superior derecho (membrete).
+
+El ``logo.png`` original pesa ~1.4 MB (1.9 MB en base64) y se mostraba a 160 px.
+Aquí se genera una sola vez un derivado reducido; el script lo cachea por
+proceso y en cada rerun sólo envía la etiqueta ``<img>`` con su URL.
+"""
+import base64
+import io
+from pathlib import Path
+
+from estaticos import publicar
+
+LOGO_ANCHO_PX = 160          # ancho con que se muestra en pantalla (.logo-fixed)
+LOGO_ESCALA = 2              # densidad para pantallas retina
+
+def logo_reducido(origen: Path, ancho: int = LOGO_ANCHO_PX * LOGO_ESCALA) -> bytes:
+    """PNG del logo reducido a ``ancho`` px (conserva transparencia)."""
+    from PIL import Image
+
+    with Image.open(origen) as im:
+        im = im.convert("RGBA")
+        if im.width > ancho:
+            alto = max(1, round(im.height * ancho / im.width))
+            im = im.resize((ancho, alto), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def src_logo(origen: Path, static_habilitado: bool) -> str:
+    """URL estática del derivado o, si no hay static serving, un data URI pequeño."""
+    png = logo_reducido(origen)
+    if static_habilitado:
+        try:
+            return publicar("logo", png, "png")
+        except OSError:
+            pass  # carpeta de sólo lectura: seguimos con el data URI
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def html_logo(src: str) -> str:
+    # la clase .logo-fixed está en tema.css
+    return f'<img src="{src}" class="logo-fixed">'
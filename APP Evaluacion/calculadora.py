@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Calculadora de composición corporal de la pantalla 3, en el navegador.
+
+Altura, peso (kg/lb) y % de grasa se mueven dentro de un componente
+(``componentes/composicion/``) que recalcula IMC, hidratación, proteína, BMR y
+los textos con ``formulas.js``, la misma cuenta que ``evaluacion_core.composicion``.
+Mientras el cliente ajusta no hay reruns: el componente va dentro del
+``st.form`` de la pantalla y Streamlit retiene lo que manda hasta que se envía
+el formulario ("Calcular presupuesto diario", "Anterior" o "Siguiente").
+
+Lo que no cambia en la pantalla (género, edades, metas, rango de grasa de
+referencia y la tabla de categorías de IMC) se calcula en el servidor y va en
+los argumentos.
+"""
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+from evaluacion_core import composicion
+
+COMPONENTE_DIR = Path(__file__).parent.resolve() / "componentes" / "composicion"
+
+_componente = components.declare_component("calculadora_composicion", path=str(COMPONENTE_DIR))
+
+# límites de los inputs (los mismos que tenían los number_input/slider)
+ALTURA_CM = (50, 250)
+PESO_KG = (0.0, 400.0)
+PESO_LB = (0.0, 900.0)
+GRASA_PCT = (8, 45)
+
+
+def _acotar(v, limites, tipo, defecto):
+    try:
+        v = tipo(v)
+    except (TypeError, ValueError):
+        return defecto
+    if v != v:      # NaN
+        return defecto
+    return max(limites[0], min(limites[1], v))
+
+
+def valores_finales(envio: dict | None, actuales: dict) -> dict:
+    """Valores que mandó el navegador, validados; lo que falte o no sirva queda como estaba."""
+    envio = envio if isinstance(envio, dict) else {}
+    return {
+        "altura_cm": _acotar(envio.get("altura_cm"), ALTURA_CM, int, actuales["altura_cm"]),
+        "peso_kg": _acotar(envio.get("peso_kg"), PESO_KG, float, actuales["peso_kg"]),
+        "peso_lb": _acotar(envio.get("peso_lb"), PESO_LB, float, actuales["peso_lb"]),
+        "grasa_pct": _acotar(envio.get("grasa_pct"), GRASA_PCT, int, actuales["grasa_pct"]),
+    }
+
+
+def mostrar(valores: dict, genero: str, edad: int, edad_ref: int, rango_grasa: tuple,
+           metas: dict, key: str):
+    """Dibuja la calculadora (dentro de un st.form); el valor llega con el envío del formulario."""
+    rmin, rmax = rango_grasa
+    return _componente(
+        valores=valores,
+        genero=genero,
+        edad=edad,
+        edad_ref=edad_ref,
+        rmin=rmin,
+        rmax=rmax,
+        metas={"masa_muscular": bool(metas.get("masa_muscular")), "rendimiento": bool(metas.get("rendimiento"))},
+        categorias_imc=[list(c) for c in composicion.CATEGORIAS_IMC],
+        intro=composicion.INTRO_RESULTADOS,
+        cierre=composicion.CIERRE_RESULTADOS,
+        key=key,
+        default=None,
+    )
@@ -0,0 +1,137 @@
+// Fórmulas de la pantalla 3 en el navegador: las mismas de
+// evaluacion_core/composicion.py y metricas.py, con el mismo redondeo que
+// Python (round() lleva los empates exactos al par). La paridad se revisa con
+// benchmarks/paridad_calculadora.py; si cambias una fórmula allá, cámbiala acá.
+(function (raiz) {
+  "use strict";
+
+  // round(x, n) de Python. toFixed ya redondea el valor exacto del double;
+  // sólo difiere en los empates exactos (x.25, x.125, ...), que Python lleva al par.
+  function redondear(x, n) {
+    // 30 decimales más: el double exacto (un empate de verdad termina en 5 y ceros;
+    // 0.45 no es empate, es 0.4500000000000000111...)
+    const s = x.toFixed(n + 30);
+    const corte = s.length - 29;
+    if (s[corte - 1] === "5" && /^0+$/.test(s.slice(corte))) {
+      let base = s.slice(0, corte - 1);
+      if (base.endsWith(".")) base = base.slice(0, -1);
+      if (Number(base[base.length - 1]) % 2 === 0) return Number(base) + 0;   // + 0: sin -0
+    }
+    return Number(x.toFixed(n)) + 0;
+  }
+
+  // int(round(x))
+  function entero(x) {
+    return redondear(x, 0);
+  }
+
+  // ``x or 0`` para lo que llega de los inputs
+  function num(x) {
+    const v = Number(x);
+    return Number.isFinite(v) ? v : 0;
+  }
+
+  function imc(pesoKg, alturaCm) {
+    const peso = num(pesoKg), altura = num(alturaCm);
+    if (peso === 0 || altura === 0) return 0;
+    const h = altura / 100.0;
+    return redondear(peso / (h * h), 1);
+  }
+
+  function reqHidratacionMl(pesoKg) {
+    return entero((num(pesoKg) / 7.0) * 250);
+  }
+
+  // sólo el valor exacto "HOMBRE" cuenta como hombre (igual que metricas._es_hombre)
+  function reqProteina(genero, alta, pesoKg) {
+    const hombre = genero === "HOMBRE";
+    const mult = hombre ? (alta ? 2.0 : 1.6) : (alta ? 1.8 : 1.4);
+    return entero(num(pesoKg) * mult);
+  }
+
+  function bmrMifflin(genero, pesoKg, alturaCm, edad) {
+    const base = (10 * num(pesoKg)) + (6.25 * num(alturaCm)) - (5 * num(edad));
+    return entero(genero === "HOMBRE" ? base + 5 : base - 161);
+  }
+
+  // categorias: CATEGORIAS_IMC de composicion.py ([límite o null, categoría, síntomas])
+  function categoriaImc(valor, categorias) {
+    for (const [limite, cat, sintomas] of categorias) {
+      if (limite === null || valor < limite) return [cat, sintomas];
+    }
+    return [null, ""];
+  }
+
+  // composicion.resultados
+  function resultados(pesoKg, alturaCm, genero, edad, metas) {
+    const alta = Boolean(metas.masa_muscular || metas.rendimiento);
+    const proteinaG = reqProteina(genero, alta, pesoKg);
+    const bmr = bmrMifflin(genero, pesoKg, alturaCm, edad);
+    return {
+      imc: imc(pesoKg, alturaCm),
+      agua_ml: reqHidratacionMl(pesoKg),
+      proteina_g: proteinaG,
+      bmr: bmr,
+      objetivo_kcal: metas.masa_muscular ? bmr + 250 : bmr - 250,
+      pollo_g: entero((proteinaG / 22.5) * 100),
+      huevos_n: entero(proteinaG / 5.5),
+    };
+  }
+
+  // f"{n:,}"
+  function miles(n) {
+    return String(n).replace(/\B(?=(\d{3})+(?!\d))/g, ",");
+  }
+
+  // composicion.narrativa: párrafos en markdown, mismo texto
+  function narrativa(r, grasaPct, genero, edadRef, rmin, rmax, categorias) {
+    const imcVal = r.imc;
+    let textoImc;
+    if (18.6 <= imcVal && imcVal <= 24.9) {
+      textoImc = `📌 Tu Índice de Masa Corporal (IMC) es de ${imcVal.toFixed(1)}, eso indica que tienes PESO NORMAL lo que significa que deberías tener buena condición física, `
+        + `vitalidad y buen nivel de energía, ¿Te sientes así? . Si la respuesta es “no”, entonces el IMC solo te está diciendo que estás “dentro del rango”, pero tu cuerpo ya te está pidiendo ajustes.`;
+    } else {
+      const [cat, sintomas] = categoriaImc(imcVal, categorias);
+      textoImc = `📌 Tu Índice de Masa Corporal (IMC) es de **${imcVal.toFixed(1)}**, eso indica que tienes **${cat}** `
+        + `y eres propenso a **${sintomas || "—"}**. `
+        + `Como referencia, el IMC ideal es de 18.6 a 24.9.`;
+    }
+
+    const generoPal = String(genero).trim().toUpperCase().startsWith("M") ? "mujer" : "hombre";
+    const articulo = generoPal === "mujer" ? "Una" : "Un";
+    const textoGrasa = `📌 ${articulo} ${generoPal} de ${edadRef} años como tú tiene `
+      + `**${rmin.toFixed(1)} % de grasa en el mejor de los casos y ${rmax.toFixed(1)} % en el peor de los casos. `
+      + ` Tú tienes ${grasaPct}%**. La grasa corporal es un indicador clave: cuanto más cerca te encuentres al mejor de los casos, tu energía, tu sueño, tu digestión y tu estado emocional mejoran.`;
+
+    const textoAgua = `📌 Tu requerimiento diario y mínimo de hidratación es de **${miles(r.agua_ml)} ml/día.** `
+      + `Tu cuerpo lo necesita para limpiar toxinas, optimizar la función cerebral, transportar nutrientes y estabilizar el apetito. `
+      + `Cuando no llegas a este nivel, tu cuerpo funciona a “media máquina”. Hidratarte correctamente es uno de los cambios más poderosos que puedes hacer.`;
+
+    let textoKcal;
+    if (r.objetivo_kcal < 1200) {
+      textoKcal = `📌 Tu metabolismo en reposo es de ${miles(r.bmr)} y para alcanzar tu objetivo `
+        + `se recomienda una ingesta diaria de 1,200 calorías. `
+        + `Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal.`;
+    } else {
+      textoKcal = `📌 Tu metabolismo en resposo es de ${miles(r.bmr)} calorías y para alcanzar tu objetivo `
+        + `**se recomienda una ingesta diaria de ${miles(r.objetivo_kcal)} calorías.** `
+        + `Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal.`;
+    }
+
+    const textoProteina = `📌 Tu **requerimiento de proteína** según el objetivo que te has propuesto es de **${r.proteina_g} gramos al día.** `
+      + `Esto es lo que realmente define tu composición corporal. `
+      + `Como referencia, si solo comieras pollo o huevo durante el dia, esto equivale a ${r.pollo_g} g de pechuga de pollo o ${r.huevos_n} huevos. `
+      + `Alcanzar tu requerimiento de proteína diario te permite preservar y aumentar músculo, evitar la flacidez en la pérdida de peso, controlar el apetito, mejorar tu metabolismo y mantener tu energía estable. `
+      + `La proteína no es un suplemento exclusivo para deportistas, es un pilar de la nutrición diaria.`;
+
+    return [textoImc, textoGrasa, textoAgua, textoKcal, textoProteina];
+  }
+
+  const api = { redondear, entero, imc, reqHidratacionMl, reqProteina, bmrMifflin, categoriaImc,
+                resultados, narrativa, miles };
+  if (typeof module !== "undefined" && module.exports) {
+    module.exports = api;      // node (paridad)
+  } else {
+    raiz.Composicion = api;    // navegador
+  }
+})(this);
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Publicación de archivos en la carpeta ``static/`` que sirve Streamlit.
+
+Con ``server.enableStaticServing = true`` todo lo que esté en ``static/`` (junto
+al script) se sirve en ``app/static/<archivo>``. Los nombres llevan el hash del
+contenido, así que el navegador puede cachearlos para siempre y un cambio de
+contenido genera una URL nueva.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).parent.resolve() / "static"
+STATIC_URL = "app/static"
+
+
+def nombre_con_hash(base: str, contenido: bytes, ext: str) -> str:
+    h = hashlib.sha256(contenido).hexdigest()[:12]
+    return f"{base}-{h}.{ext}"
+
+
+def publicar(base: str, contenido: bytes, ext: str) -> str:
+    """Escribe ``contenido`` en ``static/`` (si no existe ya) y devuelve su URL."""
+    nombre = nombre_con_hash(base, contenido, ext)
+    destino = STATIC_DIR / nombre
+    if not destino.exists():
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        # escritura atómica con un temporal propio: varios procesos (o hilos)
+        # pueden estar publicando el mismo archivo a la vez
+        with tempfile.NamedTemporaryFile(dir=STATIC_DIR, prefix=f".{nombre}.", suffix=".tmp",
+                                         delete=False) as f:
+            f.write(contenido)
+        try:
+            os.chmod(f.name, 0o644)    # mkstemp lo crea 0600
+            os.replace(f.name, destino)
+        except OSError:
+            os.unlink(f.name)
+            raise
+    return f"{STATIC_URL}/{nombre}"
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Lógica de la evaluación que no depende de Streamlit.
+
+Se puede importar desde procesos batch o workers sin levantar la app:
+
+- ``catalogo``: precios, moneda, productos y nombres mostrados por país (de
+  ``catalogo.json``, con recarga).
+- ``precios``: formato de montos y cotización de programas.
+- ``cotizaciones``: tabla precalculada programa × país × descuento.
+- ``combos``: condiciones de la pantalla 3 y combos sugeridos.
+- ``composicion`` / ``metricas``: IMC, BMR, proteína, hidratación, edad
+  (por cliente y por lotes).
+- ``exportacion``: workbook de una evaluación.
+- ``almacen``: evaluaciones terminadas en SQLite.
+- ``exportacion_masiva``: todas las evaluaciones del almacén en xlsx, csv o parquet.
+- ``trabajos``: pool de procesos para armar workbooks sin frenar la página.
+- ``tiempos``: histogramas de latencia por tramo y su volcado a archivo.
+
+pandas y PIL no se importan al cargar el paquete, sólo donde se usan.
+"""
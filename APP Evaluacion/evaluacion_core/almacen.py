@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Almacén local de evaluaciones terminadas (SQLite en modo WAL).
+
+Cada evaluación se guarda con el mismo contenido que el Excel (las hojas de
+``exportacion.hojas``) más la foto del estado de la que sale, una fila por
+evaluación (``id`` de la sesión): si el cliente vuelve y cambia algo, la fila
+se actualiza.
+
+``guardar()`` no toca el disco: encola y vuelve. Un hilo escritor junta lo
+encolado y lo escribe en lotes, una transacción por lote. Las lecturas usan
+un pool chico de conexiones; con WAL no se bloquean con el escritor.
+
+``al_dia(id, digest)`` dice si ese contenido ya está en disco o en la cola; si
+un lote falla deja de estarlo, así que la app lo vuelve a encolar.
+"""
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator
+
+from .exportacion import digest_estado, hojas
+
+LOTE_MAX = 200          # evaluaciones por transacción
+ESPERA_LOTE_S = 0.25    # cuánto espera el escritor a que se junte un lote
+COLA_MAX = 10_000       # pendientes antes de rechazar (la UI nunca espera)
+POOL_LECTURA = 4
+CONFIRMADOS_MAX = 10_000   # digests en disco que se recuerdan (por id, LRU)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS evaluaciones (
+    id          TEXT PRIMARY KEY,
+    creada      TEXT NOT NULL,      -- ISO 8601 UTC
+    actualizada TEXT NOT NULL,
+    pais        TEXT,
+    email       TEXT,               -- en minúsculas y sin espacios
+    nombre      TEXT,
+    digest      TEXT NOT NULL,      -- exportacion.digest_estado(estado)
+    hojas       TEXT NOT NULL,      -- JSON {hoja: {"columnas": [...], "filas": [[...], ...]}}
+    estado      TEXT NOT NULL       -- JSON del estado exportado
+);
+CREATE INDEX IF NOT EXISTS ix_evaluaciones_pais_creada ON evaluaciones (pais, creada);
+CREATE INDEX IF NOT EXISTS ix_evaluaciones_creada ON evaluaciones (creada);
+CREATE INDEX IF NOT EXISTS ix_evaluaciones_email ON evaluaciones (email);
+"""
+
+# si la fila ya existe sólo se reescribe cuando cambió el contenido
+_UPSERT = """
+INSERT INTO evaluaciones (id, creada, actualizada, pais, email, nombre, digest, hojas, estado)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    actualizada = excluded.actualizada,
+    pais = excluded.pais,
+    email = excluded.email,
+    nombre = excluded.nombre,
+    digest = excluded.digest,
+    hojas = excluded.hojas,
+    estado = excluded.estado
+WHERE evaluaciones.digest <> excluded.digest
+"""
+
+_FIN = object()
+
+
+def _json(x) -> str:
+    return json.dumps(x, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def fila(id_evaluacion: str, estado: Dict, digest: str | None = None, cuando: datetime | None = None) -> tuple:
+    """Parámetros de _UPSERT para una evaluación."""
+    d = estado.get("datos", {})
+    ts = (cuando or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+    contenido = {nombre: {"columnas": cols, "filas": filas} for nombre, cols, filas in hojas(estado)}
+    return (
+        id_evaluacion, ts, ts,
+        estado.get("country_name"),
+        (d.get("email") or "").strip().lower() or None,
+        d.get("nombre") or None,
+        digest or digest_estado(estado),
+        _json(contenido),
+        _json(estado),
+    )
+
+
+class Almacen:
+    def __init__(self, ruta: str | Path, pool: int = POOL_LECTURA, lote_max: int = LOTE_MAX,
+                 espera_lote_s: float = ESPERA_LOTE_S, cola_max: int = COLA_MAX):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.lote_max = lote_max
+        self.espera_lote_s = espera_lote_s
+
+        escritor = self._conectar()
+        escritor.executescript(_ESQUEMA)
+        self._pool = queue.LifoQueue()
+        for _ in range(pool):
+            self._pool.put(self._conectar())
+
+        self._cola = queue.Queue(maxsize=cola_max)
+        self._lock = threading.Lock()
+        self.escritas = self.sin_cambios = self.lotes = self.rechazadas = self.errores = 0
+        self._en_cola = {}                # id -> digest encolado, hasta que su lote termina
+        self._confirmados = OrderedDict()  # id -> digest del último lote que llegó a disco
+        self.ms_ultimo_lote = 0.0
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._escribir, args=(escritor,), name="almacen-escritor", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _conectar(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")   # con WAL no se corrompe; a lo sumo se pierde el último lote
+        con.execute("PRAGMA busy_timeout=30000")
+        return con
+
+    # ---------- escritura ----------
+    def guardar(self, id_evaluacion: str, estado: Dict, digest: str | None = None,
+                cuando: datetime | None = None) -> bool:
+        """Encola la evaluación. Devuelve False si la cola está llena (no bloquea)."""
+        if digest is not None:
+            with self._lock:
+                self._en_cola[id_evaluacion] = digest
+        try:
+            self._cola.put_nowait((id_evaluacion, estado, digest, cuando or datetime.now(timezone.utc)))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.rechazadas += 1
+                if digest is not None and self._en_cola.get(id_evaluacion) == digest:
+                    del self._en_cola[id_evaluacion]
+            return False
+
+    def al_dia(self, id_evaluacion: str, digest: str) -> bool:
+        """True si ese contenido ya está en disco o esperando en la cola."""
+        with self._lock:
+            return digest in (self._en_cola.get(id_evaluacion), self._confirmados.get(id_evaluacion))
+
+    def _escribir(self, con: sqlite3.Connection):
+        fin = False
+        while not fin:
+            item = self._cola.get()
+            lote = [] if item is _FIN else [item]
+            fin = item is _FIN
+            limite = time.monotonic() + self.espera_lote_s
+            while not fin and len(lote) < self.lote_max:
+                try:
+                    item = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _FIN:
+                    fin = True
+                else:
+                    lote.append(item)
+            if lote:
+                self._escribir_lote(con, lote)
+            for _ in range(len(lote) + (1 if fin else 0)):
+                self._cola.task_done()
+        con.close()
+
+    def _escribir_lote(self, con: sqlite3.Connection, lote: list):
+        t = time.perf_counter()
+        filas = []
+        for i, estado, digest, cuando in lote:
+            try:
+                filas.append(fila(i, estado, digest, cuando))
+            except Exception:
+                with self._lock:
+                    self.errores += 1
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            # el WHERE del upsert salta las filas sin cambios: rowcount sólo cuenta las escritas
+            escritas = con.executemany(_UPSERT, filas).rowcount
+            con.execute("COMMIT")
+        except Exception:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            with self._lock:
+                self.errores += len(filas)
+                self._sacar_de_cola(lote)
+            return
+        with self._lock:
+            for f in filas:
+                self._confirmados[f[0]] = f[6]
+                self._confirmados.move_to_end(f[0])
+            while len(self._confirmados) > CONFIRMADOS_MAX:
+                self._confirmados.popitem(last=False)
+            self._sacar_de_cola(lote)
+            self.escritas += escritas
+            self.sin_cambios += len(filas) - escritas
+            self.lotes += 1
+            self.ms_ultimo_lote = (time.perf_counter() - t) * 1000
+
+    def _sacar_de_cola(self, lote: list):
+        # con el lock tomado; si mientras tanto se encoló otro digest, queda ese
+        for i, _, digest, _ in lote:
+            if digest is not None and self._en_cola.get(i) == digest:
+                del self._en_cola[i]
+
+    def vaciar(self):
+        """Espera a que todo lo encolado esté en disco."""
+        self._cola.join()
+
+    def cerrar(self):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._cola.put(_FIN)
+        self._hilo.join()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # ---------- lectura ----------
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        con = self._pool.get()
+        try:
+            yield con
+        finally:
+            self._pool.put(con)
+
+    def obtener(self, id_evaluacion: str) -> Dict | None:
+        with self.conexion() as con:
+            r = con.execute("SELECT estado FROM evaluaciones WHERE id = ?", (id_evaluacion,)).fetchone()
+        return json.loads(r[0]) if r else None
+
+    def contar(self, pais: str | None = None) -> int:
+        with self.conexion() as con:
+            if pais is None:
+                return con.execute("SELECT COUNT(*) FROM evaluaciones").fetchone()[0]
+            return con.execute("SELECT COUNT(*) FROM evaluaciones WHERE pais = ?", (pais,)).fetchone()[0]
+
+    def iterar(self, pais: str | None = None, desde: str | None = None, hasta: str | None = None,
+               email: str | None = None, bloque: int = 500) -> Iterator[Dict]:
+        """Evaluaciones (id, creada, pais, email, nombre, hojas) por fecha de creación, de a ``bloque``."""
+        filtros, params = [], []
+        if pais is not None:
+            filtros.append("pais = ?"); params.append(pais)
+        if desde is not None:
+            filtros.append("creada >= ?"); params.append(desde)
+        if hasta is not None:
+            filtros.append("creada < ?"); params.append(hasta)
+        if email is not None:
+            filtros.append("email = ?"); params.append(email.strip().lower())
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        sql = f"SELECT id, creada, pais, email, nombre, hojas FROM evaluaciones {where} ORDER BY creada, id"
+        with self.conexion() as con:
+            cur = con.execute(sql, params)
+            while True:
+                filas = cur.fetchmany(bloque)
+                if not filas:
+                    break
+                for id_, creada, pais_, email_, nombre, contenido in filas:
+                    yield {"id": id_, "creada": creada, "pais": pais_, "email": email_,
+                           "nombre": nombre, "hojas": json.loads(contenido)}
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "pendientes": self._cola.qsize(),
+                "escritas": self.escritas,
+                "sin_cambios": self.sin_cambios,
+                "lotes": self.lotes,
+                "rechazadas": self.rechazadas,
+                "errores": self.errores,
+                "ms_ultimo_lote": self.ms_ultimo_lote,
+            }
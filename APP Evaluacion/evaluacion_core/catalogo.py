@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""Catálogo por país: moneda, separador de miles, precios y productos disponibles.
+
+Los datos viven en ``catalogo.json`` (junto a este módulo, o en la ruta de
+``CATALOGO_ARCHIVO``). Se cargan una vez por proceso en un ``Catalogo``
+inmutable que comparten todas las sesiones:
+
+- los productos se internan una sola vez y cada uno tiene un índice;
+- los precios de todos los países van en un solo ``array('d')`` plano
+  (país × producto, NaN = sin precio);
+- la disponibilidad de cada país es un bitset (un int);
+- los nombres mostrados ("Golden Beverage" en Canadá es "Collagen Beauty
+  Drink") son reglas por código de país, opcionalmente condicionadas a una
+  condición de la pantalla 3; el mapa de cada (país, condiciones) se arma la
+  primera vez que se pide y queda en el catálogo.
+
+``actual()`` revisa el mtime del archivo (como mucho una vez por
+``REVISAR_CADA_S``) y, si cambió, arma un ``Catalogo`` nuevo: cambiar un
+precio no requiere reiniciar. Si el archivo nuevo no es válido se sigue con el
+anterior. Quien necesite saber si el catálogo cambió compara identidad
+(``cotizaciones`` arma su tabla una vez por objeto).
+"""
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Mapping, Set
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger("evaluacion.catalogo")
+
+ARCHIVO = Path(os.environ.get("CATALOGO_ARCHIVO") or Path(__file__).with_name("catalogo.json"))
+PAIS_POR_DEFECTO = "Perú"
+REVISAR_CADA_S = 1.0
+
+
+class CatalogoInvalido(ValueError):
+    pass
+
+
+# =========================
+# Vistas de sólo lectura sobre el array y los bitsets
+# =========================
+class _Precios(Mapping):
+    """Precios de un país como dict de sólo lectura (en el orden del archivo)."""
+    __slots__ = ("_cat", "_base", "_orden", "_enteros")
+
+    def __init__(self, cat: "Catalogo", base: int, orden: Tuple[int, ...], enteros: int):
+        self._cat = cat
+        self._base = base
+        self._orden = orden
+        self._enteros = enteros
+
+    def get(self, producto, default=None):
+        i = self._cat.indice.get(producto)
+        if i is None:
+            return default
+        v = self._cat.precios[self._base + i]
+        if v != v:      # NaN: el país no tiene precio para ese producto
+            return default
+        # los precios enteros del archivo se devuelven como int ("S/238", no "S/238.0")
+        return int(v) if self._enteros >> i & 1 else v
+
+    def __getitem__(self, producto):
+        v = self.get(producto)
+        if v is None:
+            raise KeyError(producto)
+        return v
+
+    def __contains__(self, producto):
+        return self.get(producto) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        productos = self._cat.productos
+        return (productos[i] for i in self._orden)
+
+    def __len__(self):
+        return len(self._orden)
+
+    def __repr__(self):
+        return f"_Precios({dict(self)!r})"
+
+
+class _Disponibles(Set):
+    """Productos disponibles de un país (bitset sobre los índices del catálogo)."""
+    __slots__ = ("_cat", "_bits")
+
+    def __init__(self, cat: "Catalogo", bits: int):
+        self._cat = cat
+        self._bits = bits
+
+    def __contains__(self, producto):
+        i = self._cat.indice.get(producto)
+        return i is not None and bool(self._bits >> i & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        return (p for i, p in enumerate(self._cat.productos) if self._bits >> i & 1)
+
+    def __len__(self):
+        return bin(self._bits).count("1")
+
+    def __repr__(self):
+        return f"_Disponibles({set(self)!r})"
+
+
+class NombresMostrados:
+    """Nombre que se muestra de cada producto en un país (sin afectar precios)."""
+    __slots__ = ("_alias",)
+
+    def __init__(self, alias: Dict[str, str]):
+        self._alias = alias
+
+    def __call__(self, producto: str) -> str:
+        return self._alias.get(producto, producto)
+
+    def lista(self, productos: Iterable[str]) -> List[str]:
+        alias = self._alias
+        return [alias.get(p, p) for p in productos]
+
+    def texto(self, productos: Iterable[str], sep: str = " + ") -> str:
+        return sep.join(self.lista(productos))
+
+
+class Pais:
+    __slots__ = ("nombre", "code", "currency_symbol", "thousands_sep", "precios", "disponibles")
+
+    def __init__(self, nombre, code, currency_symbol, thousands_sep, precios: _Precios, disponibles: _Disponibles):
+        self.nombre = nombre
+        self.code = code
+        self.currency_symbol = currency_symbol
+        self.thousands_sep = thousands_sep
+        self.precios = precios
+        self.disponibles = disponibles
+
+    def __repr__(self):
+        return f"Pais({self.nombre!r}, {self.code!r})"
+
+
+# =========================
+# Carga
+# =========================
+def _sin_duplicados(pares):
+    d = {}
+    for k, v in pares:
+        if k in d:
+            raise CatalogoInvalido(f"clave repetida: {k!r}")
+        d[k] = v
+    return d
+
+
+class Catalogo:
+    """Catálogo compilado; no se modifica después de armarlo (salvo el cache de nombres mostrados)."""
+
+    def __init__(self, datos: Dict, ruta: Path | None = None, mtime_ns: int = 0):
+        self.ruta = ruta
+        self.mtime_ns = mtime_ns
+        paises = datos.get("paises")
+        if not isinstance(paises, dict) or not paises:
+            raise CatalogoInvalido("falta 'paises'")
+
+        # productos internados, en orden de primera aparición
+        indice: Dict[str, int] = {}
+        for cfg in paises.values():
+            for p in list(cfg.get("prices", {})) + list(cfg.get("available_products", [])):
+                if p not in indice:
+                    indice[sys.intern(p)] = len(indice)
+        self.productos: Tuple[str, ...] = tuple(indice)
+        self.indice = MappingProxyType(indice)
+
+        n = len(indice)
+        self.precios = array("d", [math.nan]) * (n * len(paises))
+        por_nombre = {}
+        for k, (nombre, cfg) in enumerate(paises.items()):
+            try:
+                code, simbolo, sep, precios = cfg["code"], cfg["currency_symbol"], cfg["thousands_sep"], cfg["prices"]
+            except KeyError as e:
+                raise CatalogoInvalido(f"{nombre}: falta {e.args[0]!r}") from None
+            base, enteros, orden = k * n, 0, []
+            for p, v in precios.items():
+                if isinstance(v, bool) or not isinstance(v, (int, float)) or v < 0:
+                    raise CatalogoInvalido(f"{nombre}: precio inválido para {p!r}: {v!r}")
+                i = indice[p]
+                self.precios[base + i] = v
+                orden.append(i)
+                if isinstance(v, int):
+                    enteros |= 1 << i
+            bits = 0
+            for p in cfg.get("available_products", precios):    # sin la lista: todo lo que tiene precio
+                bits |= 1 << indice[p]
+            por_nombre[sys.intern(nombre)] = Pais(
+                nombre, code, simbolo, sep,
+                _Precios(self, base, tuple(orden), enteros), _Disponibles(self, bits))
+
+        self.paises: Mapping[str, Pais] = MappingProxyType(por_nombre)
+        self.nombres: Tuple[str, ...] = tuple(sorted(por_nombre))
+        self.por_defecto = datos.get("pais_por_defecto", PAIS_POR_DEFECTO)
+        if self.por_defecto not in por_nombre:
+            raise CatalogoInvalido(f"país por defecto desconocido: {self.por_defecto!r}")
+
+        # código de país -> [(condición o None, {producto: nombre})], en el orden del archivo
+        self._reglas: Dict[str, List[Tuple[str | None, Dict[str, str]]]] = {}
+        for regla in datos.get("nombres_mostrados", []):
+            nombres, si = regla.get("nombres"), regla.get("si")
+            if not isinstance(nombres, dict) or not isinstance(regla.get("paises"), list):
+                raise CatalogoInvalido(f"regla de nombres inválida: {regla!r}")
+            for code in regla["paises"]:
+                self._reglas.setdefault(code, []).append((si, {sys.intern(k): v for k, v in nombres.items()}))
+        self.condiciones_nombres: Tuple[str, ...] = tuple(sorted(
+            {si for reglas in self._reglas.values() for si, _ in reglas if si}))
+        self._nombres: Dict[Tuple[str | None, tuple], NombresMostrados] = {}
+
+    @classmethod
+    def desde_archivo(cls, ruta: str | Path) -> "Catalogo":
+        ruta = Path(ruta)
+        mtime_ns = ruta.stat().st_mtime_ns
+        try:
+            datos = json.loads(ruta.read_text(encoding="utf-8"), object_pairs_hook=_sin_duplicados)
+        except json.JSONDecodeError as e:
+            raise CatalogoInvalido(f"{ruta.name}: {e}") from None
+        return cls(datos, ruta, mtime_ns)
+
+    def pais(self, nombre: str | None) -> Pais:
+        """País ``nombre``; si no existe, el país por defecto."""
+        return self.paises.get(nombre) or self.paises[self.por_defecto]
+
+    def nombres_mostrados(self, code: str | None, condiciones: Iterable[str] = ()) -> NombresMostrados:
+        """Nombres del país ``code`` con esas condiciones marcadas (las que no usa ninguna regla no cuentan)."""
+        clave = (code, condiciones if isinstance(condiciones, tuple) else tuple(condiciones))
+        n = self._nombres.get(clave)
+        if n is None:
+            reglas = self._reglas.get(code, ())
+            activas = {si for si, _ in reglas if si in clave[1]}
+            alias = {}
+            for si, nombres in reglas:
+                if si is None or si in activas:
+                    alias.update(nombres)
+            n = self._nombres.setdefault(clave, NombresMostrados(alias))
+        return n
+
+
+# =========================
+# Catálogo del proceso (con recarga por mtime)
+# =========================
+_lock = threading.Lock()
+_actual: Catalogo | None = None
+_revisado = 0.0
+_fallido_ns = 0         # mtime del último archivo que no se pudo cargar
+
+
+def actual() -> Catalogo:
+    """Catálogo vigente; lo vuelve a leer de ARCHIVO si cambió."""
+    global _actual, _revisado, _fallido_ns
+    cat = _actual
+    ahora = time.monotonic()
+    if cat is not None and ahora - _revisado < REVISAR_CADA_S:
+        return cat
+    with _lock:
+        _revisado = ahora
+        cat = _actual
+        try:
+            mtime_ns = ARCHIVO.stat().st_mtime_ns
+        except OSError:
+            if cat is None:
+                raise
+            return cat      # archivo reemplazado mientras se edita: sigue el que había
+        if cat is None or cat.ruta != ARCHIVO or (cat.mtime_ns != mtime_ns and _fallido_ns != mtime_ns):
+            try:
+                nuevo = Catalogo.desde_archivo(ARCHIVO)
+            except (ValueError, OSError, KeyError, TypeError, AttributeError) as e:
+                if cat is None:
+                    raise
+                logger.warning("catálogo %s no se recargó (%s): sigue el anterior", ARCHIVO, e)
+                _fallido_ns = mtime_ns      # no reintentar hasta el próximo cambio
+                return cat
+            if cat is not None:
+                logger.info("catálogo %s recargado (%d países)", ARCHIVO, len(nuevo.paises))
+            _actual = cat = nuevo
+    return cat
+
+
+def config_pais(nombre: str | None) -> Pais:
+    """Configuración de ``nombre``; si no existe, la del país por defecto."""
+    return actual().pais(nombre)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Condiciones de la pantalla 3 y los combos que sugiere cada una."""
+from typing import Callable, Dict, List
+
+P3_FLAGS = [
+    "p3_estrenimiento",
+    "p3_colesterol_alto",
+    "p3_baja_energia",
+    "p3_dolor_muscular",
+    "p3_gastritis",
+    "p3_hemorroides",
+    "p3_hipertension",
+    "p3_dolor_articular",
+    "p3_ansiedad_por_comer",
+    "p3_jaquecas_migranas",
+    "p3_diabetes_antecedentes_familiares",
+]
+
+# flag -> (producto que acompaña al Batido, título fijo o None para "Batido + <nombre mostrado>")
+COMBO_POR_FLAG = {
+    "p3_estrenimiento": ("Fibra Activa", None),
+    "p3_colesterol_alto": ("Herbalifeline", None),
+    "p3_baja_energia": ("Té de Hierbas", None),
+    "p3_dolor_muscular": ("Beverage Mix", None),
+    "p3_gastritis": ("Aloe Concentrado", None),
+    "p3_hemorroides": ("Aloe Concentrado", "Batido + Aloe"),
+    "p3_hipertension": ("Fibra Activa", None),
+    "p3_dolor_articular": ("Golden Beverage", None),
+    "p3_ansiedad_por_comer": ("PDM", None),
+    "p3_jaquecas_migranas": ("NRG", None),
+    "p3_diabetes_antecedentes_familiares": ("Fibra Activa", None),
+}
+
+
+def combos_por_flags(flags: Dict[str, bool], nombre: Callable[[str], str]) -> List:
+    """[(título, items)] en el orden de P3_FLAGS; ``nombre`` da el nombre mostrado del producto."""
+    combos = []
+    for flag in P3_FLAGS:
+        if flags.get(flag):
+            producto, titulo = COMBO_POR_FLAG[flag]
+            combos.append((titulo or f"Batido + {nombre(producto)}", ["Batido", producto]))
+    return combos
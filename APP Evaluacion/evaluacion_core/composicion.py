@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Composición corporal de un cliente: IMC, edad, grasa de referencia,
+hidratación, proteína y metabolismo en reposo.
+
+Las fórmulas viven en ``metricas`` (versión por lotes); estas son las
+versiones de un solo cliente que usan la UI y la exportación.
+"""
+from datetime import date, datetime
+
+from . import metricas
+
+
+# =========================
+# Utilidades IMC
+# =========================
+# (límite superior exclusivo o None, categoría, síntomas); la calculadora del
+# navegador recibe esta misma tabla
+CATEGORIAS_IMC = (
+    (18.5, "BAJO PESO", "Fatiga, fragilidad, baja masa muscular"),
+    (25, "PESO NORMAL", ""),
+    (30, "SOBREPESO", "Enfermedades digestivas, problemas de circulación en piernas, varices"),
+    (35, "OBESIDAD I", "Apnea del sueño, hipertensión, resistencia a la insulina"),
+    (40, "OBESIDAD II", "Dolor articular, hígado graso, riesgo cardiovascular"),
+    (None, "OBESIDAD III", "Riesgo cardiovascular elevado, diabetes tipo 2, problemas respiratorios"),
+)
+
+def imc_categoria_y_sintomas(imc: float):
+    if imc is None:
+        return None, ""
+    for limite, cat, sintomas in CATEGORIAS_IMC:
+        if limite is None or imc < limite:
+            return cat, sintomas
+
+def imc_texto_narrativo(imc: float):
+    cat, sintomas = imc_categoria_y_sintomas(imc)
+    imc_str = f"{imc:.1f}" if imc is not None else "0"
+    if cat == "PESO NORMAL":
+        return (f"Tu Índice de Masa Corporal (IMC) es de {imc_str}, eso indica que tienes PESO NORMAL y deberías sentirte con buen nivel de energía, "
+                f"vitalidad y buena condición física. ¿Te sientes así?")
+    else:
+        return (f"Tu Índice de Masa Corporal (IMC) es de {imc_str}, eso indica que tienes {cat} y eres propenso a {sintomas}.")
+
+def imc(peso_kg: float, altura_cm: float) -> float:
+    return float(metricas.imc(peso_kg, altura_cm))
+
+def rango_imc_texto(imc_val: float) -> str:
+    if imc_val < 5.0:
+        return "Delgadez III: Postración, Astenia, Adinamia, Enfermedades Degenerativas."
+    if 5.0 <= imc_val <= 9.9:
+        return "Delgadez II: Anorexia, Bulimia, Osteoporosis, Autoconsumo de Masa Muscular."
+    if 10.0 <= imc_val <= 18.5:
+        return "Delgadez I: Transtornos Digestivos, Debilidad, Fatiga Crónica, Ansiedad, Disfunción Hormonal."
+    if 18.6 <= imc_val <= 24.9:
+        return "PESO NORMAL: Estado Normal, Buen nivel de Energía, Vitalidad y Buena Condición Física."
+    if 25.0 <= imc_val <= 29.9:
+        return "Sobrepeso: Fatiga, Enfermedades Digestivas, Problemas de Circulación en Piernas, Varices."
+    if 30.0 <= imc_val <= 34.0:
+        return "Obesidad I: Diabetes, Hipertensión, Enfermedades Cardiovascular, Problemas Articulares."
+    if 35.0 <= imc_val <= 39.9:
+        return "Obesidad II: Cáncer, Angina de Pecho, Trombeflebitis, Arteriosclerosis, Embolias."
+    return "Obesidad III: Falta de Aire, Apnea, Somnolencia, Trombosis Pulmonar, Úlceras."
+
+
+# =========================
+# Edad
+# =========================
+def edad_desde_fecha(fecha_nac):
+    if not fecha_nac:
+        return None
+    try:
+        if isinstance(fecha_nac, str):
+            fecha_nac = datetime.fromisoformat(fecha_nac).date()
+        elif not hasattr(fecha_nac, "year"):
+            return None
+        return int(metricas.edad_cumplida(fecha_nac.year, fecha_nac.month, fecha_nac.day, date.today()))
+    except Exception:
+        return None
+
+def edad_aproximada(fecha_iso: str) -> int:
+    """Sólo por el año de nacimiento, acotada a 16-79 (la usa el BMR de la pantalla 3)."""
+    try:
+        anio = int(str(fecha_iso).split("-")[0])
+    except Exception:
+        return 30
+    return max(16, min(79, date.today().year - anio))
+
+
+# =========================
+# Grasa de referencia
+# =========================
+def rango_grasa_tabla(genero: str, edad: int):
+    # edad no numérica -> 30; fuera de la tabla -> primera fila
+    rmin, rmax = metricas.rango_grasa_ref(genero, edad)
+    return float(rmin), float(rmax)
+
+def rango_grasa_referencia(genero: str, edad: int) -> str:
+    if genero == "MUJER":
+        if 16 <= edad <= 39: return "21% – 32.9%"
+        if 40 <= edad <= 59: return "23% – 33.9%"
+        if 60 <= edad <= 79: return "21% – 32.9%"
+    else:
+        if 16 <= edad <= 39: return "8.0% – 19.9%"
+        if 40 <= edad <= 59: return "11% – 21.9%"
+        if 60 <= edad <= 79: return "13% – 24.9%"
+    return "—"
+
+
+# =========================
+# Requerimientos
+# =========================
+def req_hidratacion_ml(peso_kg: float) -> int:
+    return int(metricas.req_hidratacion_ml(peso_kg))
+
+def req_proteina(genero:str, metas:dict, peso_kg:float) -> int:
+    alta = bool(metas.get("masa_muscular") or metas.get("rendimiento"))
+    return int(metricas.req_proteina(genero, alta, peso_kg))
+
+def bmr_mifflin(genero:str, peso_kg:float, altura_cm:float, edad:int) -> int:
+    return int(metricas.bmr_mifflin(genero, peso_kg, altura_cm, edad))
+
+# =========================
+# Resultados de la pantalla 3
+# =========================
+# Lo mismo calcula componentes/composicion/formulas.js en el navegador
+# (benchmarks/paridad_calculadora.py compara las dos versiones).
+INTRO_RESULTADOS = (
+    "Lo que estás a punto de escuchar no es “un dato más”. Es tu mapa personal de bienestar."
+    " Son números que explican cómo está respondiendo tu cuerpo hoy… y hacia dónde puede ir, tomando buenas decisiones. ")
+CIERRE_RESULTADOS = "Hasta aqui, ¿Qué te parece la información que has recibido en esta evaluación?"
+
+def resultados(peso_kg: float, altura_cm: float, genero: str, edad: int, metas: dict) -> dict:
+    """IMC, requerimientos y equivalencias de proteína de la pantalla 3."""
+    prote_g = req_proteina(genero, metas, peso_kg)
+    bmr = bmr_mifflin(genero, peso_kg, altura_cm, edad)
+    return {
+        "imc": imc(peso_kg, altura_cm),
+        "agua_ml": req_hidratacion_ml(peso_kg),
+        "proteina_g": prote_g,
+        "bmr": bmr,
+        "objetivo_kcal": bmr + 250 if metas.get("masa_muscular", False) else bmr - 250,
+        "pollo_g": int(round((prote_g / 22.5) * 100)),
+        "huevos_n": int(round(prote_g / 5.5)),
+    }
+
+def narrativa(r: dict, grasa_pct: int, genero: str, edad_ref: int, rmin: float, rmax: float) -> list:
+    """Párrafos (markdown) de resultados de la pantalla 3, en orden."""
+    imc_val = r["imc"]
+    if 18.6 <= imc_val <= 24.9:
+        texto_imc = (
+            f"📌 Tu Índice de Masa Corporal (IMC) es de {imc_val:.1f}, eso indica que tienes PESO NORMAL lo que significa que deberías tener buena condición física, "
+            f"vitalidad y buen nivel de energía, ¿Te sientes así? . Si la respuesta es “no”, entonces el IMC solo te está diciendo que estás “dentro del rango”, pero tu cuerpo ya te está pidiendo ajustes.")
+    else:
+        cat, sintomas = imc_categoria_y_sintomas(imc_val)
+        texto_imc = (
+            f"📌 Tu Índice de Masa Corporal (IMC) es de **{imc_val:.1f}**, eso indica que tienes **{cat}** "
+            f"y eres propenso a **{sintomas or '—'}**. "
+            f"Como referencia, el IMC ideal es de 18.6 a 24.9.")
+
+    genero_pal = "mujer" if str(genero).strip().upper().startswith("M") else "hombre"
+    articulo = "Una" if genero_pal == "mujer" else "Un"
+    texto_grasa = (
+        f"📌 {articulo} {genero_pal} de {edad_ref} años como tú tiene "
+        f"**{rmin:.1f} % de grasa en el mejor de los casos y {rmax:.1f} % en el peor de los casos. "
+        f" Tú tienes {grasa_pct}%**. La grasa corporal es un indicador clave: cuanto más cerca te encuentres al mejor de los casos, tu energía, tu sueño, tu digestión y tu estado emocional mejoran.")
+
+    texto_agua = (
+        f"📌 Tu requerimiento diario y mínimo de hidratación es de **{r['agua_ml']:,} ml/día.** "
+        f"Tu cuerpo lo necesita para limpiar toxinas, optimizar la función cerebral, transportar nutrientes y estabilizar el apetito. "
+        f"Cuando no llegas a este nivel, tu cuerpo funciona a “media máquina”. Hidratarte correctamente es uno de los cambios más poderosos que puedes hacer.")
+
+    if r["objetivo_kcal"] < 1200:
+        texto_kcal = (
+            f"📌 Tu metabolismo en reposo es de {r['bmr']:,} y para alcanzar tu objetivo "
+            f"se recomienda una ingesta diaria de 1,200 calorías. "
+            f"Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal.")
+    else:
+        texto_kcal = (
+            f"📌 Tu metabolismo en resposo es de {r['bmr']:,} calorías y para alcanzar tu objetivo "
+            f"**se recomienda una ingesta diaria de {r['objetivo_kcal']:,} calorías.** "
+            f"Cuidar este número es cuidar tu futuro cuerpo: tu energía, tu forma física y tu salud hormonal.")
+
+    texto_proteina = (
+        f"📌 Tu **requerimiento de proteína** según el objetivo que te has propuesto es de **{r['proteina_g']} gramos al día.** "
+        f"Esto es lo que realmente define tu composición corporal. "
+        f"Como referencia, si solo comieras pollo o huevo durante el dia, esto equivale a {r['pollo_g']} g de pechuga de pollo o {r['huevos_n']} huevos. "
+        f"Alcanzar tu requerimiento de proteína diario te permite preservar y aumentar músculo, evitar la flacidez en la pérdida de peso, controlar el apetito, mejorar tu metabolismo y mantener tu energía estable. "
+        f"La proteína no es un suplemento exclusivo para deportistas, es un pilar de la nutrición diaria.")
+
+    return [texto_imc, texto_grasa, texto_agua, texto_kcal, texto_proteina]
+
+
+def comparativos_proteina(gramos:int) -> str:
+    porciones_pollo_100g = gramos / 22.5
+    huevos = gramos / 5.5
+    return (f"{gramos} g ≈ {round(porciones_pollo_100g*100)} g de pechuga de pollo "
+            f"o ≈ {huevos:.0f} huevos.")
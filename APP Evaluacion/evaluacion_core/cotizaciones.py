@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Tabla precalculada de cotizaciones: programa × país × descuento.
+
+Las tarjetas de la pantalla 6 muestran siempre los mismos programas con los
+mismos descuentos; en vez de cotizar en cada rerun, la tabla se arma una vez
+por catálogo con ``precios.cotizar`` (mismas reglas: recargo de Canadá,
+regular inflado, nota diaria, HTML del precio) y las pantallas sólo buscan en
+un dict.
+
+La tabla es inmutable (``MappingProxyType`` de ``Cotizacion``) y la comparten
+todas las sesiones del proceso. Se vuelve a armar cuando cambia el catálogo
+(``catalogo.actual()`` devuelve otro objeto después de recargar el archivo);
+lo que no está en la tabla (combos de la pantalla 3, países que no están en el
+catálogo) se cotiza como antes.
+"""
+import threading
+from types import MappingProxyType
+from typing import Iterable, Mapping, Tuple
+
+from . import catalogo as _catalogo
+from . import precios
+
+# (título, items) de las tarjetas de programa de la pantalla 6
+PROGRAMAS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("Batido", ("Batido",)),
+    ("Batido + Te", ("Batido", "Té de Hierbas")),
+    ("Batido + Chupapanza", ("Batido", "Té de Hierbas", "Fibra Activa", "Aloe Concentrado")),
+)
+# sin descuento, Batido solo y combos (precios.descuento_por_cantidad)
+DESCUENTOS: Tuple[int, ...] = (0, 5, 10)
+
+Clave = Tuple[str, str, Tuple[str, ...], int]       # (país, título, items, descuento)
+
+_lock = threading.Lock()
+_actual: Tuple[_catalogo.Catalogo, Mapping[Clave, precios.Cotizacion]] | None = None
+
+
+def armar(catalogo: _catalogo.Catalogo) -> Mapping[Clave, precios.Cotizacion]:
+    """Todas las cotizaciones de PROGRAMAS × países de ``catalogo`` × DESCUENTOS."""
+    tabla = {}
+    for nombre, pais in catalogo.paises.items():
+        fmt = precios.formateador(pais.currency_symbol, pais.thousands_sep)
+        for titulo, items in PROGRAMAS:
+            for descuento in DESCUENTOS:
+                tabla[(nombre, titulo, items, descuento)] = precios.cotizar(
+                    titulo, items, descuento, pais.precios, pais.code, fmt)
+    return MappingProxyType(tabla)
+
+
+def tabla(catalogo: _catalogo.Catalogo | None = None) -> Mapping[Clave, precios.Cotizacion]:
+    """Tabla del catálogo (por defecto el vigente); se arma sólo si el catálogo cambió."""
+    global _actual
+    catalogo = _catalogo.actual() if catalogo is None else catalogo
+    actual = _actual
+    if actual is None or actual[0] is not catalogo:
+        with _lock:
+            if _actual is None or _actual[0] is not catalogo:
+                _actual = (catalogo, armar(catalogo))
+            actual = _actual
+    return actual[1]
+
+
+def buscar(pais: str | None, titulo: str, items: Iterable[str], descuento_pct: int,
+           catalogo: _catalogo.Catalogo | None = None) -> precios.Cotizacion | None:
+    """Cotización precalculada, o None si ese programa/país/descuento no está en la tabla."""
+    return tabla(catalogo).get((pais, titulo, tuple(items), descuento_pct))
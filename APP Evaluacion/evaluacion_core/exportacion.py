@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Exportación de una evaluación a Excel.
+
+``estado`` es la foto de la evaluación que arma la app: datos, estilo_vida,
+metas, flags (P3_FLAGS), valoracion_contactos, combo_elegido, country_name y
+currency_symbol. El workbook se escribe directo con xlsxwriter (sin pandas).
+"""
+import datetime
+import hashlib
+import io
+import json
+import math
+import numbers
+from typing import Dict, List, Tuple
+
+from .composicion import bmr_mifflin, edad_desde_fecha, imc, req_hidratacion_ml, req_proteina
+
+
+# Hojas del workbook, en orden (Referidos y Selección sólo si hay datos)
+HOJAS = ("Perfil", "Estilo de Vida", "Metas", "Composición", "Condiciones", "Referidos", "Selección")
+
+# lo que carga la pantalla 5 por cada referido
+COLUMNAS_REFERIDOS = ["nombre", "telefono", "distrito", "relacion"]
+
+
+def digest_estado(estado: Dict) -> str:
+    crudo = json.dumps(estado, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def hojas(estado: Dict) -> List[Tuple[str, List[str], List[tuple]]]:
+    """[(hoja, columnas, filas)] con el contenido del workbook, en orden.
+
+    Referidos y Selección sólo aparecen si hay datos.
+    """
+    d = estado.get("datos", {})
+    e = estado.get("estilo_vida", {})
+    m = estado.get("metas", {})
+    flags = estado.get("flags", {})
+    refs = estado.get("valoracion_contactos", []) or []
+    combo = estado.get("combo_elegido")
+
+    altura_cm = d.get("altura_cm")
+    peso_kg   = d.get("peso_kg")
+    grasa_pct = d.get("grasa_pct")
+    edad_calc = edad_desde_fecha(d.get("fecha_nac")) or 0
+    genero    = d.get("genero") or "HOMBRE"
+    imc_val   = imc(peso_kg or 0, altura_cm or 0)
+    agua_ml   = req_hidratacion_ml(peso_kg or 0)
+    prote_g   = req_proteina(genero, m, peso_kg or 0)
+    bmr_val   = bmr_mifflin(genero, peso_kg or 0, altura_cm or 0, max(edad_calc, 16))
+    objetivo_kcal = m.get("masa_muscular") and (bmr_val + 250) or (bmr_val - 250)
+
+    cur = estado.get("currency_symbol", "S/")
+    perfil = [
+        ("¿Cuál es tu nombre completo?", d.get("nombre","")),
+        ("¿Cuál es tu correo electrónico?", d.get("email","")),
+        ("¿Cuál es su número de teléfono?", d.get("movil","")),
+        ("¿En que ciudad vives?", d.get("ciudad","")),
+        ("¿Cuál es tu fecha de nacimiento?", d.get("fecha_nac","")),
+        ("¿Cuál es tu género?", d.get("genero","")),
+        ("País seleccionado", estado.get("country_name","Perú")),
+        ("Altura (cm)", altura_cm),
+        ("Peso (kg)", peso_kg),
+        ("% de grasa estimado", grasa_pct),
+    ]
+    estilo = [
+        ("¿Tomas desayuno todos los días? ¿A qué hora?", e.get("desayuno_h","")),
+        ("¿Qué sueles desayunar?", e.get("que_desayunas","")),
+        ("¿Comes entre comidas? ¿Qué sueles comer?", e.get("meriendas","")),
+        ("Tiendes a comer de más por las noches?", e.get("comer_noche","")),
+        ("Cuál es tu mayor reto respecto a la comida?", e.get("reto","")),
+        ("¿Tomas por lo menos 8 vasos de agua al dia?", e.get("agua8_p1","")),
+        ("¿En qué momento del día sientes menos energía?", e.get("ev_menos_energia","")),
+        ("¿Practicas actividad física al menos 3 veces/semana?", e.get("ev_actividad","")),
+        ("¿Has intentado algo antes para verte/estar mejor? (Gym, Dieta, App, Otros)", e.get("ev_intentos","")),
+        ("¿Qué es lo que más se te complica? (Constancia, Alimentación, Motivación, Otros)", e.get("ev_complica","")),
+        ("¿Consideras que cuidar de ti es una prioridad?", e.get("ev_prioridad_personal","")),
+        ("¿Consideras valioso optimizar tu presupuesto y darle prioridad a comidas y bebidas que aporten a tu bienestar y objetivos?",
+         e.get("ev_valora_optimizar","")),
+    ]
+    metas = [
+        ("Perder Peso", bool(m.get("perder_peso"))),
+        ("Tonificar / Bajar Grasa", bool(m.get("tonificar"))),
+        ("Aumentar Masa Muscular", bool(m.get("masa_muscular"))),
+        ("Aumentar Energía", bool(m.get("energia"))),
+        ("Mejorar Rendimiento Físico", bool(m.get("rendimiento"))),
+        ("Mejorar Salud", bool(m.get("salud"))),
+        ("Otros", m.get("otros","")),
+        ("¿Qué talla te gustaría ser?", m.get("obj_talla","")),
+        ("¿Qué partes del cuerpo te gustaría mejorar?", m.get("obj_partes","")),
+        ("¿Qué tienes en tu ropero que podamos usar como meta?", m.get("obj_ropero","")),
+        ("¿Cómo te beneficia alcanzar tu meta?", m.get("obj_beneficio","")),
+        ("¿Qué eventos tienes en los próximos 3 o 6 meses?", m.get("obj_eventos","")),
+        ("Nivel de compromiso (1-10)", m.get("obj_compromiso","")),
+        (f"Gasto diario en comida ({cur}.)", e.get("presu_comida","")),
+        (f"Gasto diario en postres/snacks/dulces ({cur}.)", e.get("presu_cafe","")),
+        (f"Gasto semanal en bebidas ({cur}.)", e.get("presu_alcohol","")),
+        (f"Gasto semanal en deliveries/salidas a comer ({cur}.)", e.get("presu_deliveries","")),
+    ]
+    composicion = [
+        ("IMC", imc_val),
+        ("Requerimiento de hidratación (ml/día)", agua_ml),
+        ("Requerimiento de proteína (g/día)", prote_g),
+        ("Metabolismo en reposo (kcal/día)", bmr_val),
+        ("Objetivo calórico (kcal/día)", objetivo_kcal),
+    ]
+    condiciones = [
+        ("¿Estreñimiento?", bool(flags.get("p3_estrenimiento"))),
+        ("¿Colesterol Alto?", bool(flags.get("p3_colesterol_alto"))),
+        ("¿Baja Energía?", bool(flags.get("p3_baja_energia"))),
+        ("¿Dolor Muscular?", bool(flags.get("p3_dolor_muscular"))),
+        ("¿Gastritis?", bool(flags.get("p3_gastritis"))),
+        ("¿Hemorroides?", bool(flags.get("p3_hemorroides"))),
+        ("¿Hipertensión?", bool(flags.get("p3_hipertension"))),
+        ("¿Dolor Articular?", bool(flags.get("p3_dolor_articular"))),
+        ("¿Ansiedad por comer?", bool(flags.get("p3_ansiedad_por_comer"))),
+        ("¿Jaquecas / Migrañas?", bool(flags.get("p3_jaquecas_migranas"))),
+        ("Diabetes (antecedentes familiares)", bool(flags.get("p3_diabetes_antecedentes_familiares"))),
+    ]
+    seleccion = []
+    if combo:
+        seleccion = [
+            ("Programa elegido", combo.get("titulo","")),
+            ("Items", " + ".join(combo.get("items",[]))),
+            ("Precio regular", combo.get("precio_regular","")),
+            ("Descuento (%)", combo.get("descuento_pct","")),
+            ("Precio final", combo.get("precio_final","")),
+            ("Moneda", estado.get("currency_symbol","S/")),
+        ]
+
+    resultado = [
+        ("Perfil", ["Pregunta", "Respuesta"], perfil),
+        ("Estilo de Vida", ["Pregunta", "Respuesta"], estilo),
+        ("Metas", ["Pregunta", "Respuesta"], metas),
+        ("Composición", ["Indicador", "Valor"], composicion),
+        ("Condiciones", ["Condición", "Sí/No"], condiciones),
+    ]
+    if refs:
+        # columnas en el orden en que aparecen (como pd.DataFrame(refs))
+        columnas = list(dict.fromkeys(k for r in refs for k in r))
+        resultado.append(("Referidos", columnas, [tuple(r.get(c) for c in columnas) for r in refs]))
+    if seleccion:
+        resultado.append(("Selección", ["Detalle", "Valor"], seleccion))
+    return resultado
+
+
+# mismos formatos que usa pandas.to_excel para fechas (por si llega alguna como objeto)
+FORMATO_FECHA = "YYYY-MM-DD"
+FORMATO_FECHA_HORA = "YYYY-MM-DD HH:MM:SS"
+
+
+class _Formatos:
+    """Formatos del workbook, creados una sola vez y sólo si hacen falta."""
+
+    def __init__(self, libro):
+        self.libro = libro
+        self._cache = {}
+
+    def __call__(self, num_format: str):
+        f = self._cache.get(num_format)
+        if f is None:
+            f = self._cache[num_format] = self.libro.add_format({"num_format": num_format})
+        return f
+
+
+def _escribir_celda(ws, fila: int, col: int, v, formatos: _Formatos):
+    # Igual que pandas.to_excel: vacío para None/NaN, bool y números tal cual,
+    # fechas con formato y el resto como texto (ws.write: URLs y "=" como en pandas).
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return
+    if isinstance(v, bool):
+        ws.write_boolean(fila, col, v)
+    elif isinstance(v, numbers.Real):     # también los escalares de numpy
+        if math.isinf(v):
+            ws.write_string(fila, col, "inf" if v > 0 else "-inf")
+        else:
+            ws.write_number(fila, col, v)
+    elif isinstance(v, datetime.datetime):
+        ws.write_datetime(fila, col, v, formatos(FORMATO_FECHA_HORA))
+    elif isinstance(v, datetime.date):
+        ws.write_datetime(fila, col, v, formatos(FORMATO_FECHA))
+    else:
+        ws.write(fila, col, str(v))
+
+
+def excel_bytes(estado: Dict) -> bytes:
+    """Workbook .xlsx de una evaluación (ver ``_estado_export`` en la app).
+
+    Se escribe directo con xlsxwriter, celda por celda; el contenido es el
+    mismo (XML idéntico) que daba ``pd.DataFrame(filas, columns=columnas).to_excel(...)``.
+    """
+    import xlsxwriter
+
+    buf = io.BytesIO()
+    libro = xlsxwriter.Workbook(buf, {"in_memory": True})
+    formatos = _Formatos(libro)
+    for nombre, columnas, filas in hojas(estado):
+        ws = libro.add_worksheet(nombre)
+        for c, titulo in enumerate(columnas):
+            _escribir_celda(ws, 0, c, titulo, formatos)
+        # por columnas, como pandas: así la tabla de textos compartidos queda en el mismo orden
+        for c in range(len(columnas)):
+            for r, fila in enumerate(filas, start=1):
+                _escribir_celda(ws, r, c, fila[c], formatos)
+    libro.close()
+    return buf.getvalue()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Exportación de muchas evaluaciones a la vez (cierre de mes), en memoria constante.
+
+Mismas hojas que el Excel de un cliente (``exportacion.hojas``), pero con una
+fila por evaluación: las preguntas de cada hoja pasan a ser columnas, antecedidas
+por ID, fecha, país, email y nombre. En Referidos va una fila por referido.
+
+Las evaluaciones se leen del almacén de a bloques y cada fila se escribe apenas
+se lee, así que la memoria no crece con la cantidad:
+
+- ``xlsx``: xlsxwriter en modo ``constant_memory`` (una hoja nueva "Perfil (2)"
+  si se pasa del máximo de filas de Excel).
+- ``csv``: un archivo por hoja dentro de la carpeta de salida.
+- ``parquet``: un archivo por hoja, escrito por grupos de ``bloque`` filas
+  (necesita pyarrow).
+
+Uso (desde ``APP Evaluacion/``):
+    python -m evaluacion_core.exportacion_masiva --formato xlsx -o cierre.xlsx
+    python -m evaluacion_core.exportacion_masiva --formato parquet --desde 2026-01-01 --hasta 2026-02-01 -o cierre/
+"""
+import argparse
+import csv
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from .exportacion import COLUMNAS_REFERIDOS, HOJAS, hojas
+
+COLUMNAS_EVALUACION = ["ID", "Fecha", "País", "Email", "Nombre"]
+MAX_FILAS_XLSX = 1_048_576
+BLOQUE = 10_000
+FORMATOS = ("xlsx", "csv", "parquet")
+
+_MONEDA = "¤"
+
+# estado de ejemplo sólo para sacar las preguntas de cada hoja
+_MUESTRA = {
+    "combo_elegido": {"titulo": "", "items": []},
+    "valoracion_contactos": [{}],
+    "currency_symbol": _MONEDA,
+}
+
+
+def encabezados() -> Dict[str, List[str]]:
+    """Columnas de cada hoja en la exportación masiva."""
+    resultado = {}
+    for nombre, _, filas in hojas(_MUESTRA):
+        if nombre == "Referidos":
+            resultado[nombre] = COLUMNAS_EVALUACION[:3] + COLUMNAS_REFERIDOS
+        else:
+            # "Gasto diario en comida (S/.)" -> "... (moneda local)": cada país usa su símbolo
+            preguntas = [re.sub(rf"\({re.escape(_MONEDA)}\.\)", "(moneda local)", str(f[0])) for f in filas]
+            resultado[nombre] = COLUMNAS_EVALUACION + preguntas
+    return {h: resultado[h] for h in HOJAS}
+
+
+def _tipo(muestra) -> str:
+    if isinstance(muestra, bool):
+        return "bool"
+    if isinstance(muestra, (int, float)):
+        return "numero"
+    return "texto"
+
+
+def tipos() -> Dict[str, List[str]]:
+    """Tipo fijo ("bool", "numero" o "texto") de cada columna de ``encabezados()``.
+
+    Sale de la plantilla (``exportacion.hojas``): sólo es bool o número lo que
+    ella siempre produce así (los ``bool(...)`` de Metas/Condiciones y los
+    indicadores calculados de Composición). Lo que escribe el cliente es texto.
+    """
+    resultado = {}
+    for nombre, _, filas in hojas(_MUESTRA):
+        if nombre == "Referidos":
+            resultado[nombre] = ["texto"] * (3 + len(COLUMNAS_REFERIDOS))
+        else:
+            resultado[nombre] = ["texto"] * len(COLUMNAS_EVALUACION) + [_tipo(f[1]) for f in filas]
+    return {h: resultado[h] for h in HOJAS}
+
+
+def filas_de(evaluacion: Dict, columnas: Dict[str, List[str]]):
+    """(hoja, fila) de una evaluación tal como la devuelve ``Almacen.iterar``."""
+    meta = [evaluacion.get("id"), evaluacion.get("creada"), evaluacion.get("pais"),
+            evaluacion.get("email"), evaluacion.get("nombre")]
+    contenido = evaluacion.get("hojas") or {}
+    for hoja in HOJAS:
+        datos = contenido.get(hoja)
+        if not datos:
+            continue
+        if hoja == "Referidos":
+            pos = {c: i for i, c in enumerate(datos["columnas"])}
+            for f in datos["filas"]:
+                yield hoja, meta[:3] + [f[pos[c]] if c in pos else None for c in COLUMNAS_REFERIDOS]
+        else:
+            # la pregunta i es la misma en todas las evaluaciones; se rellena si faltan
+            n = len(columnas[hoja]) - len(meta)
+            valores = [f[1] for f in datos["filas"][:n]]
+            yield hoja, meta + valores + [None] * (n - len(valores))
+
+
+# =========================
+# Escritores
+# =========================
+class _Xlsx:
+    def __init__(self, salida: Path, columnas: Dict[str, List[str]]):
+        import xlsxwriter
+
+        self.libro = xlsxwriter.Workbook(str(salida), {"constant_memory": True})
+        self.negrita = self.libro.add_format({"bold": True})
+        self.columnas = columnas
+        self.hojas = {}    # hoja -> [worksheet, fila_actual, partes]
+        for h in columnas:
+            self._nueva(h, 1)
+
+    def _nueva(self, hoja: str, parte: int):
+        ws = self.libro.add_worksheet(hoja if parte == 1 else f"{hoja} ({parte})")
+        ws.write_row(0, 0, self.columnas[hoja], self.negrita)
+        self.hojas[hoja] = [ws, 1, parte]
+
+    def escribir(self, hoja: str, fila: list):
+        ws, r, parte = self.hojas[hoja]
+        if r >= MAX_FILAS_XLSX:
+            self._nueva(hoja, parte + 1)
+            ws, r, parte = self.hojas[hoja]
+        ws.write_row(r, 0, fila)
+        self.hojas[hoja][1] = r + 1
+
+    def cerrar(self):
+        self.libro.close()
+
+
+class _Csv:
+    def __init__(self, salida: Path, columnas: Dict[str, List[str]]):
+        salida.mkdir(parents=True, exist_ok=True)
+        self.archivos = {}
+        self.escritores = {}
+        for h, cols in columnas.items():
+            f = open(salida / f"{h}.csv", "w", newline="", encoding="utf-8-sig")   # BOM: Excel abre bien los acentos
+            self.archivos[h] = f
+            self.escritores[h] = csv.writer(f)
+            self.escritores[h].writerow(cols)
+
+    def escribir(self, hoja: str, fila: list):
+        self.escritores[hoja].writerow(fila)
+
+    def cerrar(self):
+        for f in self.archivos.values():
+            f.close()
+
+
+class _Parquet:
+    """Un .parquet por hoja, con el tipo de cada columna fijado por ``tipos()``.
+    En texto todo se convierte; un valor que no encaja en una columna bool o
+    numérica corta la exportación en vez de quedar vacío."""
+
+    def __init__(self, salida: Path, columnas: Dict[str, List[str]], bloque: int = BLOQUE):
+        import pyarrow  # noqa: F401  (falla acá y no a mitad de la exportación)
+
+        salida.mkdir(parents=True, exist_ok=True)
+        self.salida = salida
+        self.columnas = columnas
+        self.bloque = bloque
+        self.buffers = {h: [] for h in columnas}
+        self.escritores = {}
+        fijos = tipos()
+        self.esquemas = {h: self._esquema(columnas[h], fijos[h]) for h in columnas}
+
+    def escribir(self, hoja: str, fila: list):
+        buf = self.buffers[hoja]
+        buf.append(fila)
+        if len(buf) >= self.bloque:
+            self._vaciar(hoja)
+
+    @staticmethod
+    def _esquema(nombres: List[str], tipos_hoja: List[str]):
+        import pyarrow as pa
+
+        arrow = {"bool": pa.bool_(), "numero": pa.float64(), "texto": pa.string()}
+        return pa.schema([pa.field(n, arrow[t]) for n, t in zip(nombres, tipos_hoja)])
+
+    @staticmethod
+    def _convertir(v, campo):
+        import pyarrow as pa
+
+        if v is None:
+            return None
+        if campo.type == pa.string():
+            return v if isinstance(v, str) else str(v)
+        if campo.type == pa.bool_() and isinstance(v, bool):
+            return v
+        if campo.type == pa.float64() and isinstance(v, (int, float)) and not isinstance(v, bool):
+            return float(v)
+        if v == "":
+            return None
+        raise ValueError(f"columna {campo.name!r} ({campo.type}): no se puede guardar {v!r}")
+
+    def _vaciar(self, hoja: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        filas = self.buffers[hoja]
+        if not filas:
+            return
+        esquema = self.esquemas[hoja]
+        if hoja not in self.escritores:
+            self.escritores[hoja] = pq.ParquetWriter(self.salida / f"{hoja}.parquet", esquema)
+        columnas = [
+            pa.array([self._convertir(f[i], campo) for f in filas], type=campo.type)
+            for i, campo in enumerate(esquema)
+        ]
+        self.escritores[hoja].write_table(pa.Table.from_arrays(columnas, schema=esquema))
+        self.buffers[hoja] = []
+
+    def cerrar(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for hoja in self.columnas:
+            self._vaciar(hoja)
+            if hoja not in self.escritores:
+                # hoja sin filas: archivo con las columnas y nada más
+                pq.write_table(self.esquemas[hoja].empty_table(), self.salida / f"{hoja}.parquet")
+            else:
+                self.escritores[hoja].close()
+
+
+def exportar(evaluaciones: Iterable[Dict], salida: str | Path, formato: str = "xlsx",
+             bloque: int = BLOQUE) -> Dict[str, int]:
+    """Escribe todas las evaluaciones en ``salida``. Devuelve filas escritas por hoja."""
+    if formato not in FORMATOS:
+        raise ValueError(f"formato desconocido: {formato!r} (use {', '.join(FORMATOS)})")
+    salida = Path(salida)
+    columnas = encabezados()
+    if formato == "xlsx":
+        escritor = _Xlsx(salida, columnas)
+    elif formato == "csv":
+        escritor = _Csv(salida, columnas)
+    else:
+        escritor = _Parquet(salida, columnas, bloque)
+
+    conteo = dict.fromkeys(columnas, 0)
+    try:
+        for ev in evaluaciones:
+            for hoja, fila in filas_de(ev, columnas):
+                escritor.escribir(hoja, fila)
+                conteo[hoja] += 1
+    finally:
+        escritor.cerrar()
+    return conteo
+
+
+def main(argv=None):
+    from .almacen import Almacen
+
+    ap = argparse.ArgumentParser(description="Exporta las evaluaciones guardadas (xlsx, csv o parquet).")
+    ap.add_argument("--db", type=Path, default=Path(__file__).resolve().parents[1] / "datos" / "evaluaciones.sqlite3")
+    ap.add_argument("--formato", choices=FORMATOS, default="xlsx")
+    ap.add_argument("-o", "--salida", type=Path, required=True,
+                    help="archivo .xlsx, o carpeta para csv/parquet (un archivo por hoja)")
+    ap.add_argument("--pais", default=None)
+    ap.add_argument("--desde", default=None, help="fecha ISO (incluida)")
+    ap.add_argument("--hasta", default=None, help="fecha ISO (excluida)")
+    args = ap.parse_args(argv)
+    if not args.db.is_file():
+        # Almacen crearía una base vacía y la exportación saldría vacía sin avisar
+        ap.error(f"no existe la base de datos {args.db}")
+
+    alm = Almacen(args.db, pool=1)
+    try:
+        conteo = exportar(alm.iterar(pais=args.pais, desde=args.desde, hasta=args.hasta), args.salida, args.formato)
+    finally:
+        alm.cerrar()
+    for hoja, n in conteo.items():
+        print(f"{hoja:<16} {n:>10,} filas")
+    print(f"-> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
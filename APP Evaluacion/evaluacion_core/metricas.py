@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Métricas corporales vectorizadas (NumPy/pandas).
+
+Las mismas fórmulas que ve el cliente en la pantalla 3 y que se exportan en la
+hoja "Composición", pero sobre columnas enteras: una lista de miles de clientes
+se procesa en una sola pasada. Las funciones escalares de la app (``imc``,
+``bmr_mifflin``, ...) llaman a estas con un solo valor, así que los números son
+exactamente los mismos.
+
+Uso por línea de comandos (desde ``APP Evaluacion/``):
+    python -m evaluacion_core.metricas clientes.csv -o metricas.parquet
+
+Columnas de entrada: peso_kg, altura_cm, fecha_nac, genero y, opcionalmente,
+edad y las metas (masa_muscular, rendimiento, ...). Las que falten se toman
+como vacías.
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+# (edad_min, edad_max, %grasa_min, %grasa_max)
+TABLA_GRASA_MUJER = ((20, 39, 21.0, 32.9), (40, 59, 23.0, 33.9), (60, 79, 24.0, 35.9))
+TABLA_GRASA_HOMBRE = ((20, 39, 8.0, 19.9), (40, 59, 11.0, 21.9), (60, 79, 13.0, 24.9))
+
+EDAD_POR_DEFECTO = 30   # cuando no hay fecha ni edad
+EDAD_MIN_BMR = 16       # la exportación nunca calcula el BMR con menos de 16 años
+
+METAS = ("perder_peso", "tonificar", "masa_muscular", "energia", "rendimiento", "salud")
+
+_VERDADEROS = {"1", "true", "si", "sí", "x", "yes", "y", "verdadero"}
+
+
+# =========================
+# Helpers
+# =========================
+def _num_o(x, defecto: float) -> np.ndarray:
+    """float64; None, texto no numérico, NaN e inf quedan como ``defecto``."""
+    a = np.asarray(x)
+    if a.dtype.kind not in "biuf":
+        import pandas as pd
+        a = pd.to_numeric(pd.Series(a.ravel(), dtype=object), errors="coerce").to_numpy().reshape(a.shape)
+    a = a.astype(np.float64, copy=False)
+    return np.where(np.isfinite(a), a, defecto)
+
+
+def _num(x) -> np.ndarray:
+    return _num_o(x, 0.0)   # igual que ``x or 0``
+
+
+def _por_valor(valores, fn) -> np.ndarray:
+    """Aplica ``fn`` a cada valor distinto (hay pocos géneros) y expande el resultado."""
+    import pandas as pd
+
+    if isinstance(valores, pd.Series):
+        # columnas de texto (arrow) se factorizan sin pasar a objetos Python
+        codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+        return np.asarray([fn(None if pd.isna(u) else u) for u in unicos])[codigos]
+    a = np.asarray(valores, dtype=object)
+    if a.ndim == 0:
+        return np.asarray(fn(a.item()))
+    codigos, unicos = pd.factorize(a.ravel(), use_na_sentinel=False)
+    return np.asarray([fn(u) for u in unicos])[codigos].reshape(a.shape)
+
+
+def _es_hombre(genero) -> np.ndarray:
+    # la app sólo distingue el valor exacto "HOMBRE" para proteína y BMR
+    return _por_valor(genero, lambda g: g == "HOMBRE").astype(bool)
+
+
+def _es_mujer_ref(genero) -> np.ndarray:
+    # la tabla de grasa acepta "Mujer", "MUJER", " mujer ", ...
+    return _por_valor(genero, lambda g: isinstance(g, str) and g.strip().lower().startswith("muj")).astype(bool)
+
+
+def verdad(x) -> np.ndarray:
+    """Columna de metas -> bool (True/1/"sí"/"x"; vacío o NaN es False)."""
+    a = np.asarray(x)
+    if a.dtype.kind == "b":
+        return a
+    if a.dtype.kind in "iuf":
+        return np.nan_to_num(a.astype(np.float64), nan=0.0) != 0
+    return _por_valor(a, lambda v: v is True or (isinstance(v, (int, float)) and v == v and v != 0)
+                      or (isinstance(v, str) and v.strip().lower() in _VERDADEROS)).astype(bool)
+
+
+def _redondear_1(x: np.ndarray) -> np.ndarray:
+    """``round(x, 1)`` de Python, elemento a elemento.
+
+    np.round escala por 10 y en los empates (…x5) puede caer del otro lado que
+    el redondeo exacto de Python; esos pocos casos se recalculan con ``round``.
+    """
+    # asarray: con un solo valor np.round devuelve un escalar y la corrección no se vería
+    r = np.asarray(np.round(x, 1))
+    y = x * 10.0
+    dudosos = np.flatnonzero(np.abs(y - np.floor(y) - 0.5) < 1e-6)
+    if dudosos.size:
+        plano = r.reshape(-1)
+        xs = x.reshape(-1)
+        plano[dudosos] = [round(float(v), 1) for v in xs[dudosos]]
+    return r
+
+
+def _entero(x: np.ndarray) -> np.ndarray:
+    # int(round(v)): np.rint redondea medio-a-par exactamente como round()
+    return np.rint(x).astype(np.int64)
+
+
+# =========================
+# Fórmulas
+# =========================
+def imc(peso_kg, altura_cm) -> np.ndarray:
+    peso = _num(peso_kg)
+    altura = _num(altura_cm)
+    validos = (peso != 0) & (altura != 0)
+    h = np.where(validos, altura, 100.0) / 100.0
+    return np.where(validos, _redondear_1(peso / (h * h)), 0.0)
+
+
+def req_hidratacion_ml(peso_kg) -> np.ndarray:
+    return _entero((_num(peso_kg) / 7.0) * 250)
+
+
+def req_proteina(genero, masa_o_rendimiento, peso_kg) -> np.ndarray:
+    """g/día. ``masa_o_rendimiento``: metas "masa_muscular" o "rendimiento" marcadas."""
+    hombre = _es_hombre(genero)
+    alta = verdad(masa_o_rendimiento)
+    mult = np.where(hombre, np.where(alta, 2.0, 1.6), np.where(alta, 1.8, 1.4))
+    return _entero(_num(peso_kg) * mult)
+
+
+def bmr_mifflin(genero, peso_kg, altura_cm, edad) -> np.ndarray:
+    base = (10 * _num(peso_kg)) + (6.25 * _num(altura_cm)) - (5 * _num(edad))
+    return _entero(np.where(_es_hombre(genero), base + 5, base - 161))
+
+
+def rango_grasa_ref(genero, edad) -> tuple:
+    """(min, max) de % de grasa de referencia por género y edad."""
+    e = np.asarray(edad)
+    if e.dtype.kind not in "iu":
+        e = np.trunc(_num_o(e, EDAD_POR_DEFECTO)).astype(np.int64)   # int(edad), o 30 si no se puede
+    mujer = _es_mujer_ref(genero)
+    rmin = np.empty(e.shape, dtype=np.float64)
+    rmax = np.empty(e.shape, dtype=np.float64)
+    for tabla, mascara in ((TABLA_GRASA_MUJER, mujer), (TABLA_GRASA_HOMBRE, ~mujer)):
+        # fuera de la tabla: primera fila
+        condiciones = [(lo <= e) & (e <= hi) for lo, hi, _, _ in tabla]
+        lo_v = np.select(condiciones, [f[2] for f in tabla], tabla[0][2])
+        hi_v = np.select(condiciones, [f[3] for f in tabla], tabla[0][3])
+        np.copyto(rmin, lo_v, where=mascara)
+        np.copyto(rmax, hi_v, where=mascara)
+    return rmin, rmax
+
+
+def edad_desde_fecha(fechas, hoy: date | None = None):
+    """Edad cumplida a ``hoy``, como arreglo ``Int64`` de pandas (NA si la fecha no es válida)."""
+    import pandas as pd
+
+    hoy = hoy or date.today()
+    if not isinstance(fechas, pd.Series):
+        fechas = pd.Series(np.asarray(fechas, dtype=object).ravel())
+    f = pd.to_datetime(fechas, errors="coerce", format="ISO8601")
+    if isinstance(f.dtype, pd.DatetimeTZDtype):
+        f = f.dt.tz_localize(None)   # la fecha tal como se escribió, sin pasar a UTC
+    d = f.to_numpy(dtype="datetime64[D]")
+    nula = np.isnat(d)
+    anio = d.astype("datetime64[Y]")
+    mes = d.astype("datetime64[M]")
+    m = (mes - anio).astype(np.int64) + 1
+    dia = (d - mes).astype(np.int64) + 1
+    edad = edad_cumplida(anio.astype(np.int64) + 1970, m, dia, hoy)
+    return pd.arrays.IntegerArray(np.where(nula, 0, edad), nula)
+
+
+def edad_cumplida(anio, mes, dia, hoy: date) -> np.ndarray:
+    """Años cumplidos a ``hoy`` para una fecha de nacimiento ya separada en año/mes/día."""
+    mes = np.asarray(mes)
+    dia = np.asarray(dia)
+    # (hoy.month, hoy.day) < (mes, día): todavía no cumple años este año
+    antes = (mes > hoy.month) | ((mes == hoy.month) & (dia > hoy.day))
+    return hoy.year - np.asarray(anio) - antes
+
+
+# =========================
+# Tabla completa
+# =========================
+COLUMNAS_SALIDA = (
+    "edad", "imc", "agua_ml", "proteina_g", "bmr_kcal", "objetivo_kcal",
+    "grasa_ref_min", "grasa_ref_max",
+)
+
+
+def calcular(clientes, hoy: date | None = None):
+    """Agrega a ``clientes`` (DataFrame) todas las métricas derivadas como columnas.
+
+    Replica la hoja "Composición" de la exportación: edad desde fecha_nac (o la
+    columna ``edad``), BMR con un mínimo de 16 años, objetivo ±250 kcal según
+    la meta de masa muscular y el rango de grasa de referencia.
+    """
+    import pandas as pd
+
+    df = clientes.copy()
+    n = len(df)
+
+    def col(nombre, defecto=None):
+        return df[nombre] if nombre in df.columns else pd.Series(defecto, index=df.index, dtype=object)
+
+    genero_ref = col("genero")
+    # la exportación usa ``genero or "HOMBRE"``
+    genero = genero_ref.fillna("").astype(str).replace("", "HOMBRE")
+    peso = col("peso_kg", 0.0).to_numpy()
+    altura = col("altura_cm", 0.0).to_numpy()
+
+    if "fecha_nac" in df.columns:
+        edad = edad_desde_fecha(df["fecha_nac"], hoy)
+    else:
+        edad = pd.array([pd.NA] * n, dtype="Int64")
+    e = edad.to_numpy(dtype=np.int64, na_value=0)
+    # como en la app: una edad de 0 cuenta igual que "sin fecha" (``edad or ...``)
+    edad_col = np.trunc(_num_o(df["edad"].to_numpy(), EDAD_POR_DEFECTO)).astype(np.int64) if "edad" in df.columns else EDAD_POR_DEFECTO
+    edad_ref = np.where(e != 0, e, edad_col)
+    edad_bmr = np.maximum(e, EDAD_MIN_BMR)
+
+    masa = verdad(col("masa_muscular", False).to_numpy())
+    alta = masa | verdad(col("rendimiento", False).to_numpy())
+
+    df["edad"] = edad
+    df["imc"] = imc(peso, altura)
+    df["agua_ml"] = req_hidratacion_ml(peso)
+    df["proteina_g"] = req_proteina(genero, alta, peso)
+    bmr = bmr_mifflin(genero, peso, altura, edad_bmr)
+    df["bmr_kcal"] = bmr
+    # mismo ``masa and (bmr + 250) or (bmr - 250)`` de la exportación
+    df["objetivo_kcal"] = np.where(masa & (bmr + 250 != 0), bmr + 250, bmr - 250)
+    df["grasa_ref_min"], df["grasa_ref_max"] = rango_grasa_ref(genero_ref, edad_ref)
+    return df
+
+
+# =========================
+# CLI
+# =========================
+def _leer(p: Path):
+    import pandas as pd
+    if p.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(p)
+    return pd.read_csv(p, dtype={"fecha_nac": str, "genero": str})
+
+
+def _escribir(df, p: Path):
+    if p.suffix.lower() in (".parquet", ".pq"):
+        df.to_parquet(p, index=False)
+    else:
+        df.to_csv(p, index=False)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Calcula las métricas corporales de una lista de clientes.")
+    ap.add_argument("entrada", type=Path, help="CSV o Parquet de clientes")
+    ap.add_argument("-o", "--salida", type=Path, default=None,
+                    help="CSV o Parquet de salida (por defecto <entrada>_metricas.<ext>)")
+    ap.add_argument("--hoy", type=date.fromisoformat, default=None,
+                    help="fecha de referencia para la edad (AAAA-MM-DD); por defecto hoy")
+    args = ap.parse_args(argv)
+
+    salida = args.salida or args.entrada.with_name(f"{args.entrada.stem}_metricas{args.entrada.suffix}")
+    try:
+        df = calcular(_leer(args.entrada), args.hoy)
+        _escribir(df, salida)
+    except ImportError as e:
+        # Parquet necesita pyarrow (o fastparquet)
+        sys.exit(f"No se pudo leer/escribir Parquet: {e}")
+    print(f"{len(df):,} clientes -> {salida}")
+
+
+if __name__ == "__main__":
+    main()
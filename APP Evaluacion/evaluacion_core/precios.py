@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Precios y cotizaciones de los programas.
+
+Todo recibe el país y los precios como argumentos (nada de session_state), así
+que sirve igual para la UI, la exportación o un proceso batch.
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+# Recargo fijo de Canadá por paquete (no aplica a "Batido + Chupapanza")
+RECARGO_CA = 15
+
+# Nota "(... al dia)" bajo el Batido con 5% de descuento
+NOTA_DIARIA_FIJA = {"PE": "S/7.9", "CL": "$1.744", "CO": "$6.693"}
+NOTA_DIARIA_DIAS = {"ES-PEN": ("€", 22.0), "ES-CAN": ("€", 22.0), "IT": ("€", 22.0), "US": ("$", 30.0)}
+
+
+def formatear_monto(v: float | int, symbol: str = "S/", sep: str = ".") -> str:
+    return formateador(symbol, sep)(v)
+
+
+# ——— Formato de montos por moneda ———
+class Formateador:
+    """Formato de una moneda (símbolo + separador de miles), armado una sola vez.
+
+    ``f(v)`` da el monto redondeado al entero ("S/1.234"), ``f.decimales(v)``
+    con centavos ("S/12,50": el separador decimal es el otro) y ``f.lote(vs)``
+    una columna entera de una vez.
+    """
+    __slots__ = ("simbolo", "sep", "decimal")
+
+    def __init__(self, simbolo: str, sep: str):
+        self.simbolo = simbolo
+        self.sep = sep
+        self.decimal = "," if sep == "." else "."
+
+    def __call__(self, v: float | int) -> str:
+        if self.sep == ",":
+            return f"{self.simbolo}{int(round(v)):,}"
+        return self.simbolo + f"{int(round(v)):,}".replace(",", self.sep)
+
+    def decimales(self, v: float | int, n: int = 2) -> str:
+        return self.simbolo + f"{v:_.{n}f}".replace(".", self.decimal).replace("_", self.sep)
+
+    def lote(self, valores: Iterable[float | int]) -> List[str]:
+        # un solo replace/split para toda la columna
+        texto = "\n".join([f"{int(round(v)):,}" for v in valores])
+        if not texto:
+            return []
+        if self.sep != ",":
+            texto = texto.replace(",", self.sep)
+        return (self.simbolo + texto.replace("\n", "\n" + self.simbolo)).split("\n")
+
+    def __repr__(self):
+        return f"Formateador({self.simbolo!r}, {self.sep!r})"
+
+
+_FORMATEADORES: Dict[Tuple[str, str], Formateador] = {}
+
+
+def formateador(simbolo: str = "S/", sep: str = ".") -> Formateador:
+    """Formateador compartido de (símbolo, separador); se arma la primera vez que se pide."""
+    f = _FORMATEADORES.get((simbolo, sep))
+    if f is None:
+        f = _FORMATEADORES.setdefault((simbolo, sep), Formateador(simbolo, sep))
+    return f
+
+
+def precio_sumado(items: List[str], precios: Dict[str, int]):
+    total = 0
+    faltantes = []
+    for it in items:
+        precio = precios.get(it)
+        if precio is None:
+            faltantes.append(it)
+        else:
+            total += precio
+    return total, faltantes
+
+
+def chip_desc(pct:int):
+    # Colores ajustados a la nueva paleta (no cambia el texto)
+    return f"<span class='rd-pill'>-{pct}%</span>"
+
+
+def producto_disponible(nombre: str, disponibles: Iterable[str] | None) -> bool:
+    return True if not disponibles else (nombre in disponibles)
+
+
+def regular_inflado(precio_final: int, descuento_pct: int) -> int:
+    """Precio "regular" que se muestra tachado: el real / (1 - d%)."""
+    return int(round(precio_final / (1 - descuento_pct/100))) if descuento_pct else precio_final
+
+
+def html_precio(precio_final: int, descuento_pct: int, fmt: Callable[[float], str]) -> str:
+    if not descuento_pct:
+        return f"<strong style='font-size:20px'>{fmt(precio_final)}</strong>"
+    tachado = f"<span style='text-decoration:line-through; opacity:.6; margin-right:8px'>{fmt(regular_inflado(precio_final, descuento_pct))}</span>"
+    return f"{tachado}<strong style='font-size:20px'>{fmt(precio_final)}</strong> {chip_desc(descuento_pct)}"
+
+
+def _por_dia(cc: str | None, precio_final: int) -> str:
+    if cc in NOTA_DIARIA_FIJA:
+        return NOTA_DIARIA_FIJA[cc]
+    if cc in NOTA_DIARIA_DIAS:
+        simbolo, dias = NOTA_DIARIA_DIAS[cc]
+        return f"{simbolo}{round(precio_final / dias, 2):.2f}"
+    return ""
+
+
+class Cotizacion(NamedTuple):
+    """Precio de una tarjeta de programa, listo para mostrar."""
+    titulo: str
+    items: Tuple[str, ...]
+    descuento_pct: int
+    precio_final: int
+    precio_regular: int
+    por_dia: str                # "S/7.9", "€2.99" o "" (sólo Batido 5% fuera de Canadá)
+    precio_html: str
+    faltantes: Tuple[str, ...]
+
+    def payload(self) -> Dict:
+        # dict nuevo en cada llamada: la sesión lo guarda como combo_elegido
+        return {
+            "titulo": self.titulo,
+            "items": list(self.items),
+            "precio_regular": self.precio_regular,
+            "descuento_pct": self.descuento_pct,
+            "precio_final": self.precio_final,
+        }
+
+
+def cotizar(titulo: str, items: Iterable[str], descuento_pct: int,
+            precios: Dict[str, int], cc: str | None, fmt: Callable[[float], str]) -> Cotizacion:
+    """Cotización de una tarjeta de programa.
+
+    El precio real es la suma de los productos (+15 en Canadá salvo Chupapanza);
+    con descuento se muestra además un "regular" inflado tachado.
+    """
+    items = tuple(items)
+    total, faltantes = precio_sumado(items, precios)
+    canada = cc == "CA" and titulo.strip() != "Batido + Chupapanza"
+
+    precio_final = int(round(total + RECARGO_CA)) if canada else int(round(total))
+    precio_html = html_precio(precio_final, descuento_pct, fmt)
+    # nota diaria sólo para Batido 5% (fuera de Canadá)
+    por_dia = ""
+    if not canada and descuento_pct == 5 and titulo.strip().lower() in ("batido nutricional", "batido"):
+        por_dia = _por_dia(cc, precio_final)
+        if por_dia:
+            precio_html += f" <span style='font-size:13px; opacity:.8'>({por_dia} al dia)</span>"
+
+    return Cotizacion(titulo, items, descuento_pct, precio_final, regular_inflado(precio_final, descuento_pct),
+                      por_dia, precio_html, tuple(faltantes))
+
+
+def cotizar_programa(titulo: str, items: List[str], descuento_pct: int,
+                     precios: Dict[str, int], cc: str | None, fmt: Callable[[float], str]):
+    """(precio_html, payload, faltantes) de una tarjeta de programa (ver ``cotizar``)."""
+    c = cotizar(titulo, items, descuento_pct, precios, cc, fmt)
+    return c.precio_html, c.payload(), list(c.faltantes)
+
+
+def descuento_por_cantidad(total_items: int) -> int:
+    if total_items <= 0:
+        return 0
+    return 5 if total_items == 1 else 10
+
+
+def total_personalizado(cantidades: Dict[str, int], precios: Dict[str, int], cc: str | None) -> Dict:
+    """Totales del programa armado a mano (pantalla 7)."""
+    total_items = sum(int(q) for q in cantidades.values())
+    total_base = 0
+    for prod, q in cantidades.items():
+        precio_u = precios.get(prod, 0)
+        total_base += int(q) * (precio_u if isinstance(precio_u, (int, float)) else 0)
+
+    descuento_pct = descuento_por_cantidad(total_items)
+    # Recargo Canadá: +15 si hay al menos 1 ítem
+    recargo_ca = RECARGO_CA if (cc == "CA" and total_items > 0) else 0
+    precio_final = int(round(total_base + recargo_ca))
+    return {
+        "total_items": total_items,
+        "descuento_pct": descuento_pct,
+        "precio_final": precio_final,
+        "precio_regular": regular_inflado(precio_final, descuento_pct),
+    }
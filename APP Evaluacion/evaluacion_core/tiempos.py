@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Latencias por tramo (rerun, pantalla, helpers) en histogramas del proceso.
+
+Cada tramo tiene un histograma de buckets logarítmicos fijos (4 por cada
+duplicación, de 10 µs a ~100 s): registrar es un bisect y dos sumas, sin
+guardar muestras, así que la memoria no crece con el tráfico. Los percentiles
+salen de los buckets (error < 19 %).
+
+    @tiempos.medido("inject_theme")
+    def inject_theme(): ...
+
+    with tiempos.tramo("pantalla3"):
+        pantalla3()
+
+``Escritor`` vuelca una foto cada tantos segundos a un archivo: formato de
+texto de Prometheus si termina en ``.prom`` (para el textfile collector de
+node_exporter), JSON en otro caso.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List
+
+# límites superiores de los buckets, en ms
+LIMITES_MS: List[float] = [0.01 * 2 ** (i / 4) for i in range(94)]
+ESCRITURA_CADA_S = 30.0
+
+
+class Histograma:
+    __slots__ = ("conteos", "n", "suma_ms", "max_ms")
+
+    def __init__(self):
+        self.conteos = [0] * (len(LIMITES_MS) + 1)    # el último: más que el mayor límite
+        self.n = 0
+        self.suma_ms = 0.0
+        self.max_ms = 0.0
+
+    def registrar(self, ms: float):
+        self.conteos[bisect_left(LIMITES_MS, ms)] += 1
+        self.n += 1
+        self.suma_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentil(self, p: float) -> float:
+        if not self.n:
+            return 0.0
+        objetivo = p * self.n
+        acumulado = 0
+        for i, c in enumerate(self.conteos):
+            acumulado += c
+            if acumulado >= objetivo:
+                return min(LIMITES_MS[i], self.max_ms) if i < len(LIMITES_MS) else self.max_ms
+        return self.max_ms
+
+    def resumen(self) -> Dict:
+        return {
+            "n": self.n,
+            "media_ms": self.suma_ms / self.n if self.n else 0.0,
+            "p50_ms": self.percentil(.50),
+            "p95_ms": self.percentil(.95),
+            "p99_ms": self.percentil(.99),
+            "max_ms": self.max_ms,
+            "total_ms": self.suma_ms,
+        }
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist: Dict[str, Histograma] = {}
+        self.desde = time.time()
+
+    def registrar(self, nombre: str, ms: float):
+        with self._lock:
+            h = self._hist.get(nombre)
+            if h is None:
+                h = self._hist[nombre] = Histograma()
+            h.registrar(ms)
+
+    def resumen(self) -> Dict[str, Dict]:
+        """{tramo: {n, media_ms, p50_ms, p95_ms, p99_ms, max_ms, total_ms}}, el que más tiempo suma primero."""
+        with self._lock:
+            filas = {k: h.resumen() for k, h in self._hist.items()}
+        return dict(sorted(filas.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+    def json(self) -> str:
+        return json.dumps({"pid": os.getpid(), "desde": self.desde, "ahora": time.time(),
+                           "tramos": self.resumen()}, ensure_ascii=False, indent=1)
+
+    def prometheus(self) -> str:
+        nombre = "evaluacion_tramo_segundos"
+        lineas = [f"# HELP {nombre} Latencia por tramo (rerun, pantalla, helper).",
+                  f"# TYPE {nombre} histogram"]
+        with self._lock:
+            copia = {k: (list(h.conteos), h.n, h.suma_ms) for k, h in self._hist.items()}
+        for tramo, (conteos, n, suma_ms) in sorted(copia.items()):
+            etiqueta = f'tramo="{tramo}",pid="{os.getpid()}"'
+            acumulado = 0
+            for limite, c in zip(LIMITES_MS, conteos):
+                acumulado += c
+                if c:   # sólo los buckets que cambian; Prometheus no necesita los demás
+                    lineas.append(f'{nombre}_bucket{{{etiqueta},le="{limite / 1000:.6g}"}} {acumulado}')
+            lineas.append(f'{nombre}_bucket{{{etiqueta},le="+Inf"}} {n}')
+            lineas.append(f"{nombre}_sum{{{etiqueta}}} {suma_ms / 1000:.6f}")
+            lineas.append(f"{nombre}_count{{{etiqueta}}} {n}")
+        return "\n".join(lineas) + "\n"
+
+    def escribir(self, ruta: str | Path):
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        texto = self.prometheus() if ruta.suffix == ".prom" else self.json()
+        tmp = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+        tmp.write_text(texto, encoding="utf-8")
+        os.replace(tmp, ruta)     # quien lo lea nunca ve un archivo a medias
+
+    def limpiar(self):
+        with self._lock:
+            self._hist.clear()
+            self.desde = time.time()
+
+
+REGISTRO = Registro()
+
+
+class tramo:
+    """``with tramo("pantalla3"): ...`` (clase y no @contextmanager: ~3 µs en vez de ~5)."""
+    __slots__ = ("nombre", "registro", "t")
+
+    def __init__(self, nombre: str, registro: Registro = REGISTRO):
+        self.nombre = nombre
+        self.registro = registro
+
+    def __enter__(self):
+        self.t = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.registro.registrar(self.nombre, (time.perf_counter_ns() - self.t) / 1e6)
+        return False
+
+
+def medido(nombre: str | None = None, registro: Registro = REGISTRO):
+    """Decorador: registra cada llamada bajo ``nombre`` (por defecto, el de la función)."""
+    def decorar(f):
+        clave = nombre or f.__name__
+
+        @wraps(f)
+        def envuelta(*args, **kwargs):
+            t = time.perf_counter_ns()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                registro.registrar(clave, (time.perf_counter_ns() - t) / 1e6)
+        return envuelta
+    return decorar
+
+
+class Escritor:
+    """Hilo que escribe ``registro`` en ``ruta`` cada ``cada_s`` segundos (y al salir)."""
+
+    def __init__(self, ruta: str | Path, cada_s: float = ESCRITURA_CADA_S, registro: Registro = REGISTRO):
+        self.ruta = Path(ruta)
+        self.cada_s = cada_s
+        self.registro = registro
+        self.escrituras = self.errores = 0
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="tiempos-escritor", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _bucle(self):
+        while not self._fin.wait(self.cada_s):
+            self._escribir()
+
+    def _escribir(self):
+        try:
+            self.registro.escribir(self.ruta)
+            self.escrituras += 1
+        except OSError:
+            self.errores += 1
+
+    def cerrar(self):
+        if not self._fin.is_set():
+            self._fin.set()
+            self._escribir()
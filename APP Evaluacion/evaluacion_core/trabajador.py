@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Proceso de exportación que lanza ``trabajos.Exportador``.
+
+Se arranca como ``python -m evaluacion_core.trabajador`` (nunca importa la app
+ni Streamlit). Lee de stdin trabajos ``(función, args)`` con pickle, uno tras
+otro, y responde cada uno por stdout con ``(True, resultado)`` o
+``(False, excepción)``. Termina cuando se cierra stdin.
+"""
+import pickle
+import sys
+
+
+def _precargar():
+    # el primer trabajo no paga el import de xlsxwriter
+    from . import exportacion  # noqa: F401
+    import xlsxwriter  # noqa: F401
+
+
+def main():
+    entrada, salida = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr     # un print en un trabajo no se mezcla con las respuestas
+    _precargar()
+    while True:
+        try:
+            funcion, args = pickle.load(entrada)
+        except EOFError:
+            return
+        try:
+            respuesta = (True, funcion(*args))
+        except Exception as e:
+            respuesta = (False, e)
+        try:
+            datos = pickle.dumps(respuesta, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            datos = pickle.dumps((False, RuntimeError(f"resultado no serializable: {e!r}")))
+        salida.write(datos)
+        salida.flush()
+
+
+if __name__ == "__main__":
+    main()
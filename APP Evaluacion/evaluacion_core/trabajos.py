@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Trabajos pesados (workbooks, reportes) en un pool de procesos acotado.
+
+La UI nunca espera: ``solicitar()`` encola el trabajo y vuelve enseguida con
+su situación; la página vuelve a preguntar (polling) hasta que esté listo y
+entonces toma los bytes con ``resultado()``. Cada trabajo tiene una clave (el
+digest de lo que se exporta): pedir dos veces lo mismo no lo hace dos veces y
+los resultados quedan en un LRU chico para las próximas descargas.
+
+Si ya hay ``cola_max`` trabajos sin terminar, ``solicitar()`` devuelve LLENO
+sin encolar nada (contrapresión): la página lo vuelve a intentar en el
+siguiente poll en vez de apilar más trabajo.
+
+Los procesos son ``python -m evaluacion_core.trabajador`` y no multiprocessing:
+spawn importa en cada hijo el ``__main__`` del padre, que bajo Streamlit es el
+script de la app, y lo volvería a ejecutar entero. El trabajador sólo importa
+``evaluacion_core``. Las funciones que se envían tienen que poder importarse
+desde ahí (funciones de módulo, p. ej. ``exportacion.excel_bytes``).
+
+El pool se arma con el primer ``solicitar()``, no al crear el Exportador.
+"""
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Hashable
+
+PROCESOS = 2
+COLA_MAX = 32           # trabajos sin terminar (en cola + en curso) antes de rechazar
+RESULTADOS_MAX = 64     # resultados que se guardan para volver a descargar
+ERRORES_MAX = 64
+MUESTRAS = 500          # latencias que se guardan para los percentiles
+
+# situación de un trabajo
+LISTO = "listo"
+EN_CURSO = "en_curso"
+LLENO = "lleno"
+ERROR = "error"
+
+# carpeta desde la que se importa evaluacion_core en los trabajadores
+_RAIZ = Path(__file__).resolve().parents[1]
+
+
+class _Procesos:
+    """Un hilo por proceso trabajador; cada hilo le pasa los trabajos de la cola de a uno."""
+
+    def __init__(self, procesos: int):
+        self._cola = queue.Queue()
+        self._hilos = [threading.Thread(target=self._atender, name=f"exportador-{i}", daemon=True)
+                       for i in range(procesos)]
+        for h in self._hilos:
+            h.start()
+
+    def submit(self, funcion: Callable, *args) -> Future:
+        futuro = Future()
+        self._cola.put((futuro, funcion, args))
+        return futuro
+
+    @staticmethod
+    def _lanzar() -> subprocess.Popen:
+        return subprocess.Popen([sys.executable, "-m", f"{__package__}.trabajador"],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=_RAIZ)
+
+    def _atender(self):
+        proc = None
+        try:
+            proc = self._lanzar()     # levantarlo ya, no con la primera descarga (~0.3 s)
+        except OSError:
+            pass
+        while True:
+            item = self._cola.get()
+            if item is None:
+                break
+            futuro, funcion, args = item
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                trabajo = pickle.dumps((funcion, args), pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                futuro.set_exception(e)
+                continue
+            try:
+                if proc is None or proc.poll() is not None:
+                    proc = self._lanzar()
+                proc.stdin.write(trabajo)
+                proc.stdin.flush()
+                ok, valor = pickle.load(proc.stdout)
+            except Exception:
+                # el proceso murió (p. ej. sin memoria) o la respuesta no se pudo
+                # leer: se descarta y el próximo trabajo lanza otro
+                if proc is not None:
+                    proc.kill()
+                    proc.wait()
+                proc = None
+                futuro.set_exception(RuntimeError("el proceso de exportación terminó sin responder"))
+                continue
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+        if proc is not None:
+            proc.stdin.close()    # EOF: el trabajador termina solo
+            proc.wait()
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in self._hilos:
+            self._cola.put(None)
+        if wait:
+            for h in self._hilos:
+                h.join()
+
+
+def _ejecutar(funcion: Callable, args: tuple):
+    inicio = time.time()
+    resultado = funcion(*args)
+    return resultado, inicio, time.time()
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    orden = sorted(valores)
+    return orden[min(len(orden) - 1, int(len(orden) * p))]
+
+
+class Exportador:
+    def __init__(self, procesos: int = PROCESOS, cola_max: int = COLA_MAX,
+                 resultados_max: int = RESULTADOS_MAX):
+        self.procesos = procesos
+        self.cola_max = cola_max
+        self.resultados_max = resultados_max
+        self._lock = threading.Lock()
+        self._pool = None                                     # _Procesos, con el primer trabajo
+        self._trabajos: Dict[Hashable, float] = {}             # clave -> time.time() al encolar
+        self._resultados: OrderedDict = OrderedDict()         # clave -> bytes (LRU)
+        self._errores: OrderedDict = OrderedDict()            # clave -> mensaje
+        self._espera_ms = deque(maxlen=MUESTRAS)              # encolado -> empieza
+        self._total_ms = deque(maxlen=MUESTRAS)               # encolado -> listo
+        self.enviados = self.terminados = self.rechazados = self.fallidos = 0
+
+    @property
+    def activo(self) -> bool:
+        """True si ya se lanzaron los procesos (hubo al menos un trabajo)."""
+        return self._pool is not None
+
+    # ---------- API ----------
+    def solicitar(self, clave: Hashable, funcion: Callable, *args) -> str:
+        """Encola ``funcion(*args)`` si hace falta y devuelve la situación de ``clave``."""
+        with self._lock:
+            if clave in self._resultados:
+                self._resultados.move_to_end(clave)
+                return LISTO
+            if clave in self._trabajos:
+                return EN_CURSO
+            if len(self._trabajos) >= self.cola_max:
+                self.rechazados += 1
+                return LLENO
+            self._errores.pop(clave, None)    # volver a pedirlo es reintentar
+            if self._pool is None:
+                self._pool = _Procesos(self.procesos)
+            enviado = time.time()
+            futuro = self._pool.submit(_ejecutar, funcion, args)
+            self._trabajos[clave] = enviado
+            self.enviados += 1
+        # fuera del lock: si ya terminó, el callback corre acá mismo y toma el lock
+        futuro.add_done_callback(lambda f: self._terminado(clave, enviado, f))
+        return EN_CURSO
+
+    def situacion(self, clave: Hashable) -> str | None:
+        with self._lock:
+            if clave in self._resultados:
+                return LISTO
+            if clave in self._trabajos:
+                return EN_CURSO
+            if clave in self._errores:
+                return ERROR
+            return None
+
+    def resultado(self, clave: Hashable):
+        """Lo que devolvió el trabajo, o None si no está (todavía, o salió del LRU)."""
+        with self._lock:
+            if clave not in self._resultados:
+                return None
+            self._resultados.move_to_end(clave)
+            return self._resultados[clave]
+
+    def error(self, clave: Hashable) -> str | None:
+        with self._lock:
+            return self._errores.get(clave)
+
+    def _terminado(self, clave: Hashable, enviado: float, futuro):
+        try:
+            resultado, inicio, fin = futuro.result()
+        except Exception as e:
+            with self._lock:
+                self._trabajos.pop(clave, None)
+                self._errores[clave] = f"{type(e).__name__}: {e}"
+                while len(self._errores) > ERRORES_MAX:
+                    self._errores.popitem(last=False)
+                self.fallidos += 1
+            return
+        with self._lock:
+            self._trabajos.pop(clave, None)
+            self._resultados[clave] = resultado
+            while len(self._resultados) > self.resultados_max:
+                self._resultados.popitem(last=False)
+            self._espera_ms.append((inicio - enviado) * 1000)
+            self._total_ms.append((fin - enviado) * 1000)
+            self.terminados += 1
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "pendientes": len(self._trabajos),
+                "cola_max": self.cola_max,
+                "procesos": self.procesos,
+                "enviados": self.enviados,
+                "terminados": self.terminados,
+                "rechazados": self.rechazados,
+                "fallidos": self.fallidos,
+                "resultados": len(self._resultados),
+                "espera_p50_ms": _percentil(self._espera_ms, .50),
+                "espera_p95_ms": _percentil(self._espera_ms, .95),
+                "total_p50_ms": _percentil(self._total_ms, .50),
+                "total_p95_ms": _percentil(self._total_ms, .95),
+            }
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
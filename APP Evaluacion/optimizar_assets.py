@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Genera derivados redimensionados de las imágenes de la app (offline).
+
+Recorre APP_DIR e ``icons/``, escribe en ``derivados/`` una versión por cada
+ancho con que se muestra la imagen (ver ``assets.ANCHOS_POR_ARCHIVO``) y deja
+un ``manifest.json`` con el hash de cada original y de cada derivado. Dos
+imágenes que dan el mismo derivado (p. ej. una copia con otro nombre) comparten
+un solo archivo.
+
+Uso (desde esta carpeta, antes de desplegar):
+    python optimizar_assets.py
+    python optimizar_assets.py --formato webp --calidad 75
+"""
+import argparse
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+import assets
+
+
+def _originales(app_dir: Path):
+    for carpeta in (app_dir, app_dir / "icons"):
+        if not carpeta.is_dir():
+            continue
+        for p in sorted(carpeta.iterdir()):
+            if p.is_file() and p.suffix.lower() in assets.EXTENSIONES:
+                yield p
+
+
+def _tiene_alfa(im: Image.Image) -> bool:
+    if im.mode in ("RGBA", "LA"):
+        return im.getchannel("A").getextrema()[0] < 255
+    return im.mode == "P" and "transparency" in im.info
+
+
+def _codificar(im: Image.Image, formato: str, calidad: int) -> tuple:
+    """Devuelve (bytes, extensión)."""
+    buf = io.BytesIO()
+    alfa = _tiene_alfa(im)
+    if formato == "webp":
+        im.convert("RGBA" if alfa else "RGB").save(buf, format="WEBP", quality=calidad, method=6)
+        return buf.getvalue(), "webp"
+    # "auto": JPEG si es opaca, PNG si tiene transparencia. Son los formatos que
+    # st.image envía sin recodificar.
+    if alfa:
+        im.convert("RGBA").save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "png"
+    im.convert("RGB").save(buf, format="JPEG", quality=calidad, optimize=True, progressive=True)
+    return buf.getvalue(), "jpg"
+
+
+def _derivados_previos(app_dir: Path, salida: Path) -> set:
+    """Archivos que el manifest anterior de ``salida`` registró como derivados."""
+    try:
+        previo = json.loads((salida / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    archivos = set()
+    for info in previo.get("assets", {}).values():
+        for d in info.get("derivados", []):
+            p = (app_dir / d["archivo"]).resolve()
+            if p.is_relative_to(salida):
+                archivos.add(p)
+    return archivos
+
+
+def optimizar(app_dir: Path, salida: Path, formato: str = "auto", calidad: int = 80) -> dict:
+    manifest = {"version": 1, "formato": formato, "calidad": calidad, "assets": {}}
+    previos = _derivados_previos(app_dir, salida.resolve())
+    escritos = set()
+    por_hash = {}     # sha256 del derivado -> archivo ya escrito
+
+    for original in _originales(app_dir):
+        relativo = original.relative_to(app_dir).as_posix()
+        if not assets.anchos_para(relativo):
+            continue
+        crudo = original.read_bytes()
+        with Image.open(io.BytesIO(crudo)) as im:
+            im = ImageOps.exif_transpose(im)
+            im.load()
+            derivados = []
+            for ancho in assets.anchos_para(relativo):
+                ancho = min(ancho, im.width)
+                alto = max(1, round(im.height * ancho / im.width))
+                reducida = im if ancho == im.width else im.resize((ancho, alto), Image.LANCZOS)
+                datos, ext = _codificar(reducida, formato, calidad)
+                h = hashlib.sha256(datos).hexdigest()
+                destino = por_hash.get(h)
+                if destino is None:
+                    destino = salida / Path(relativo).parent / f"{original.stem}-{ancho}w-{h[:12]}.{ext}"
+                    destino.parent.mkdir(parents=True, exist_ok=True)
+                    if not destino.exists():
+                        destino.write_bytes(datos)
+                    por_hash[h] = destino
+                    escritos.add(destino.resolve())
+                derivados.append({
+                    "archivo": destino.relative_to(app_dir).as_posix(),
+                    "ancho": ancho,
+                    "alto": alto,
+                    "bytes": len(datos),
+                    "sha256": h,
+                })
+        manifest["assets"][relativo] = {
+            "sha256": hashlib.sha256(crudo).hexdigest(),
+            "bytes": len(crudo),
+            "derivados": derivados,
+        }
+
+    # derivados de builds anteriores que ya nadie referencia; sólo se borra lo
+    # que el manifest anterior lista (``salida`` puede tener otros archivos)
+    for viejo in previos - escritos:
+        viejo.unlink(missing_ok=True)
+
+    (salida / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return manifest
+
+
+def _resumen(manifest: dict):
+    total_orig = total_der = 0
+    for relativo, info in manifest["assets"].items():
+        der = min(d["bytes"] for d in info["derivados"])
+        total_orig += info["bytes"]
+        total_der += der
+        print(f"{relativo:<32} {info['bytes']:>10,} -> {der:>9,} bytes")
+    print(f"{'TOTAL':<32} {total_orig:>10,} -> {total_der:>9,} bytes")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--origen", type=Path, default=assets.APP_DIR, help="carpeta con las imágenes originales")
+    ap.add_argument("--salida", type=Path, default=None, help="carpeta de derivados (por defecto <origen>/derivados)")
+    ap.add_argument("--formato", choices=("auto", "webp"), default="auto",
+                    help="auto = JPEG/PNG (los que st.image no recodifica); webp para servir por URL")
+    ap.add_argument("--calidad", type=int, default=80)
+    args = ap.parse_args(argv)
+
+    origen = args.origen.resolve()
+    salida = (args.salida or origen / "derivados").resolve()
+    _resumen(optimizar(origen, salida, args.formato, args.calidad))
+
+
+if __name__ == "__main__":
+    main()
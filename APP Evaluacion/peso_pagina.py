@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Peso de cada rerun en el websocket, por pantalla y por línea del script.
+
+Modo de medición opcional (``MEDIR_PESO=1`` en la app): envuelve el
+``enqueue`` del ScriptRunContext de la sesión y suma el tamaño serializado
+(``ByteSize()``) de cada ForwardMsg que sale del rerun, tal como se manda (si
+Streamlit lo reemplaza por una referencia a su cache, cuenta la referencia).
+Cada mensaje se atribuye a la pantalla del rerun y a la línea de la app que lo
+generó: la llamada más interna que está en un archivo de la app (el script o
+assets/branding/tema), p. ej. ``_render_programa:1095``.
+
+Lo que no pasa por el websocket no se cuenta: las imágenes de ``st.image`` y
+los archivos de ``static/`` viajan por HTTP y acá sólo pesa su URL (el logo en
+base64 o el CSS inline sí se cuentan enteros, van dentro del mensaje).
+
+Al terminar cada rerun se loguea el total y los sitios que más pesaron, y un
+WARNING si la pantalla se pasó de su presupuesto.
+"""
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+logger = logging.getLogger("evaluacion.peso")
+
+APP_DIR = Path(__file__).parent.resolve()
+TOP_LOG = 5
+_ESTE = str(Path(__file__).resolve())
+
+_local = threading.local()
+
+
+class _Rerun:
+    __slots__ = ("pantalla", "bytes", "mensajes", "sitios")
+
+    def __init__(self, pantalla: str):
+        self.pantalla = pantalla
+        self.bytes = 0
+        self.mensajes = 0
+        self.sitios: Dict[str, list] = {}
+
+
+def _sitio(script: str) -> str:
+    """Función:línea de la llamada más interna hecha desde un archivo de la app."""
+    f = sys._getframe(2)
+    while f is not None:
+        archivo = f.f_code.co_filename
+        if archivo.startswith(str(APP_DIR)) and "evaluacion_core" not in archivo and archivo != _ESTE:
+            nombre = f.f_code.co_name
+            if archivo != script:
+                nombre = f"{Path(archivo).stem}.{nombre}"
+            return f"{nombre}:{f.f_lineno}"
+        f = f.f_back
+    return "streamlit"
+
+
+class Medidor:
+    def __init__(self, script: str | Path, presupuesto_kb: Dict[str, float] | None = None):
+        self.script = str(Path(script).resolve())
+        self.presupuesto_kb = presupuesto_kb or {}
+        self._lock = threading.Lock()
+        self.pantallas: Dict[str, Dict] = {}                 # pantalla -> reruns, bytes, max, ultimo
+        self.sitios: Dict[Tuple[str, str], list] = {}        # (pantalla, sitio) -> [mensajes, bytes]
+        self.excedidos = 0
+        if not logger.handlers:
+            h = logging.StreamHandler()
+            h.setFormatter(logging.Formatter("%(asctime)s %(levelname)s peso %(message)s"))
+            logger.addHandler(h)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def instalar(self, ctx):
+        """Envuelve (una sola vez por sesión) el enqueue del contexto del script."""
+        original = ctx._enqueue
+        if getattr(original, "_medidor", None) is self:
+            return
+
+        def enqueue(msg, _original=original):
+            r = getattr(_local, "rerun", None)
+            if r is not None:
+                n = msg.ByteSize()
+                r.bytes += n
+                r.mensajes += 1
+                s = r.sitios.setdefault(_sitio(self.script), [0, 0])
+                s[0] += 1
+                s[1] += n
+            _original(msg)
+
+        enqueue._medidor = self
+        ctx._enqueue = enqueue
+
+    def empezar(self, pantalla: str):
+        _local.rerun = _Rerun(pantalla)
+
+    def terminar(self) -> Dict | None:
+        """Cierra el rerun del hilo actual: acumula, loguea y devuelve su resumen."""
+        r = getattr(_local, "rerun", None)
+        _local.rerun = None
+        if r is None or not r.mensajes:
+            return None
+        top = sorted(r.sitios.items(), key=lambda kv: -kv[1][1])
+        with self._lock:
+            p = self.pantallas.setdefault(r.pantalla, {"reruns": 0, "bytes": 0, "max": 0, "ultimo": 0})
+            p["reruns"] += 1
+            p["bytes"] += r.bytes
+            p["max"] = max(p["max"], r.bytes)
+            p["ultimo"] = r.bytes
+            for sitio, (m, b) in r.sitios.items():
+                acc = self.sitios.setdefault((r.pantalla, sitio), [0, 0])
+                acc[0] += m
+                acc[1] += b
+
+        detalle = ", ".join(f"{s} {b / 1024:.1f} KB" for s, (_, b) in top[:TOP_LOG])
+        logger.info("%s: %.1f KB en %d mensajes · %s", r.pantalla, r.bytes / 1024, r.mensajes, detalle)
+        limite = self.presupuesto_kb.get(r.pantalla)
+        if limite is not None and r.bytes > limite * 1024:
+            with self._lock:
+                self.excedidos += 1
+            logger.warning("%s pesa %.1f KB, presupuesto %.0f KB (mayor: %s)",
+                           r.pantalla, r.bytes / 1024, limite, top[0][0])
+        return {"pantalla": r.pantalla, "bytes": r.bytes, "mensajes": r.mensajes,
+                "top": [(s, b) for s, (_, b) in top[:TOP_LOG]]}
+
+    def resumen(self) -> Dict:
+        with self._lock:
+            pantallas = {k: {**v, "promedio": v["bytes"] / v["reruns"]} for k, v in sorted(self.pantallas.items())}
+            sitios = sorted(((p, s, m, b) for (p, s), (m, b) in self.sitios.items()), key=lambda t: -t[3])
+        return {"pantallas": pantallas, "sitios": sitios, "excedidos": self.excedidos}
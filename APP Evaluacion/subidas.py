@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Fotos que suben los clientes (pantalla 3: referencia de grasa; pantalla 4: su resultado).
+
+Una foto de celular pesa 5–12 MB. Se procesa una sola vez, al subirla: se
+valida (JPEG/PNG de verdad, tope de MB y de megapíxeles), se endereza según el
+EXIF, se reduce al ancho con que se muestra y se recodifica sin metadatos. El
+derivado se guarda por SHA-256 del archivo subido: la misma foto subida otra
+vez, en esta sesión o en otra, no se vuelve a procesar, y en los reruns se
+envían los bytes ya listos (st.image no los recodifica).
+
+Topes configurables por variables de entorno:
+
+- ``SUBIDA_MAX_MB``: tamaño máximo del archivo subido (el mismo que
+  ``server.maxUploadSize`` en ``.streamlit/config.toml``);
+- ``SUBIDA_MAX_MPX``: megapíxeles máximos (antes de decodificar);
+- ``SUBIDAS_SESION_MAX_MB``: derivados que puede tener una sesión a la vez;
+- ``SUBIDAS_CACHE_MB``: derivados compartidos por todas las sesiones (LRU).
+"""
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+MB = 1024 * 1024
+SUBIDA_MAX_BYTES = int(float(os.environ.get("SUBIDA_MAX_MB", 15)) * MB)
+SUBIDA_MAX_PIXELES = int(float(os.environ.get("SUBIDA_MAX_MPX", 50)) * 1_000_000)
+SESION_MAX_BYTES = int(float(os.environ.get("SUBIDAS_SESION_MAX_MB", 4)) * MB)
+CACHE_MAX_BYTES = int(float(os.environ.get("SUBIDAS_CACHE_MB", 64)) * MB)
+
+FORMATOS = ("JPEG", "PNG")
+CALIDAD_JPEG = 85
+
+
+class SubidaInvalida(ValueError):
+    """La foto no se puede usar; el mensaje es para el cliente."""
+
+
+@dataclass(frozen=True)
+class Subida:
+    sha256: str          # del archivo tal como se subió
+    datos: bytes         # JPEG/PNG al ancho de pantalla, listo para st.image
+    ancho: int
+    alto: int
+    bytes_original: int
+
+    @property
+    def peso(self) -> int:
+        return len(self.datos)
+
+
+def _orientada(im):
+    """(ancho, alto) que tendrá la imagen después de aplicar el EXIF."""
+    orientacion = im.getexif().get(0x0112, 1)
+    w, h = im.size
+    return (h, w) if orientacion in (5, 6, 7, 8) else (w, h)
+
+
+def procesar(crudo: bytes, ancho: int) -> Subida:
+    """Valida, endereza, reduce a ``ancho`` y recodifica. Lanza SubidaInvalida."""
+    from PIL import Image, ImageOps
+
+    if len(crudo) > SUBIDA_MAX_BYTES:
+        raise SubidaInvalida(f"La foto pesa {len(crudo) / MB:.1f} MB; el máximo es "
+                             f"{SUBIDA_MAX_BYTES / MB:.0f} MB.")
+    try:
+        with Image.open(io.BytesIO(crudo)) as im:
+            if im.format not in FORMATOS:
+                raise SubidaInvalida("Sólo se aceptan fotos JPG o PNG.")
+            if im.width * im.height > SUBIDA_MAX_PIXELES:
+                raise SubidaInvalida(f"La foto tiene {im.width * im.height / 1e6:.0f} megapíxeles; "
+                                     f"el máximo es {SUBIDA_MAX_PIXELES / 1e6:.0f}.")
+            w, h = _orientada(im)
+            if im.format == "JPEG" and w > ancho:
+                # el JPEG se decodifica ya reducido (1/2, 1/4, 1/8), nunca por debajo de ``ancho``
+                escala = ancho / w
+                im.draft("RGB", (math.ceil(im.width * escala), math.ceil(im.height * escala)))
+            img = ImageOps.exif_transpose(im)
+            img.load()
+    except SubidaInvalida:
+        raise
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        # UnidentifiedImageError es un OSError; un archivo truncado también
+        raise SubidaInvalida("No se pudo abrir la imagen.") from None
+
+    if img.width > ancho:
+        img = img.resize((ancho, max(1, round(img.height * ancho / img.width))), Image.LANCZOS)
+    buf = io.BytesIO()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img.save(buf, format="PNG", optimize=True)
+    else:
+        img.convert("RGB").save(buf, format="JPEG", quality=CALIDAD_JPEG, optimize=True)
+    return Subida(hashlib.sha256(crudo).hexdigest(), buf.getvalue(), img.width, img.height, len(crudo))
+
+
+class AlmacenSubidas:
+    """LRU por (SHA-256, ancho), limitado en bytes y compartido por las sesiones.
+
+    Una sesión guarda su propia referencia a la Subida que está mostrando, así
+    que una expulsión de aquí no le borra la foto; sólo obliga a procesarla de
+    nuevo si alguien la vuelve a subir.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expulsiones = self.rechazadas = 0
+
+    def ingerir(self, crudo: bytes, ancho: int) -> Subida:
+        clave = (hashlib.sha256(crudo).hexdigest(), ancho)
+        with self._lock:
+            e = self._entradas.get(clave)
+            if e is not None:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return e
+            self.misses += 1
+        try:
+            nueva = procesar(crudo, ancho)
+        except SubidaInvalida:
+            with self._lock:
+                self.rechazadas += 1
+            raise
+        with self._lock:
+            if clave not in self._entradas and nueva.peso <= self.max_bytes:
+                self._entradas[clave] = nueva
+                self._bytes += nueva.peso
+                while self._bytes > self.max_bytes:
+                    _, fuera = self._entradas.popitem(last=False)
+                    self._bytes -= fuera.peso
+                    self.expulsiones += 1
+        return nueva
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expulsiones": self.expulsiones,
+                "rechazadas": self.rechazadas,
+            }
+
+
+# compartido por todas las sesiones del proceso
+ALMACEN = AlmacenSubidas()
+
+
+def ingerir(crudo: bytes, ancho: int) -> Subida:
+    return ALMACEN.ingerir(crudo, ancho)
+
+
+def bytes_sesion(fotos: dict) -> int:
+    """Lo que ocupan los derivados que tiene una sesión (campo -> Subida)."""
+    return sum(s.peso for s in fotos.values())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Hoja de estilos compilada de la app.
+
+``tema.css`` reúne todos los ``<style>`` que antes se mandaban por separado
+(logo, botón "Guardar y continuar", tema general y los estilos de los pasos 4
+y 6). Aquí se minifica y se le calcula el hash una vez por proceso; cada rerun
+envía una sola etiqueta: un ``<link>`` al archivo en ``static/`` o, si no hay
+static serving, el ``<style>`` ya minificado.
+"""
+import hashlib
+import importlib.util
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from estaticos import publicar
+
+TEMA_CSS = Path(__file__).parent.resolve() / "tema.css"
+
+# Cadenas y url(...) pasan tal cual; los comentarios se quitan. Se buscan en una
+# sola pasada para que un "/*" dentro de una cadena no se tome como comentario.
+_LITERAL_O_COMENTARIO = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\(\s*[^"')\s]*\s*\))|/\*.*?\*/""",
+    re.S | re.I,
+)
+_ESPACIOS = re.compile(r"\s+")
+_ALREDEDOR = re.compile(r"\s*([{};,>])\s*")
+_DOS_PUNTOS = re.compile(r":\s+")
+
+
+@dataclass(frozen=True)
+class Hoja:
+    css: str             # minificado
+    hash: str
+    bytes_fuente: int    # lo que se enviaba por rerun antes de compilar
+
+
+def _compactar(css: str) -> str:
+    css = _ESPACIOS.sub(" ", css)
+    css = _ALREDEDOR.sub(r"\1", css)
+    css = _DOS_PUNTOS.sub(":", css)
+    return css.replace(";}", "}")
+
+
+def minificar(css: str) -> str:
+    # Sólo se compacta el código entre literales (``content: "a , b"``,
+    # ``font-family: "Segoe UI"`` y las url() quedan como están).
+    salida, codigo, pos = [], [], 0
+    for m in _LITERAL_O_COMENTARIO.finditer(css):
+        codigo.append(css[pos:m.start()])
+        pos = m.end()
+        if m.group(1):
+            salida += [_compactar("".join(codigo)), m.group(1)]
+            codigo = []
+    codigo.append(css[pos:])
+    salida.append(_compactar("".join(codigo)))
+    return "".join(salida).strip()
+
+
+def compilar(ruta: Path = TEMA_CSS) -> Hoja:
+    fuente = ruta.read_text(encoding="utf-8")
+    css = minificar(fuente)
+    return Hoja(css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12], len(fuente.encode("utf-8")))
+
+
+def _static_sirve_css() -> bool:
+    # El servidor tornado de Streamlit (app_static_file_handler) servía todo lo
+    # que no fuera imagen como text/plain con nosniff: el navegador ignoraría el .css.
+    return importlib.util.find_spec("streamlit.web.server.app_static_file_handler") is None
+
+
+def etiqueta(hoja: Hoja, static_habilitado: bool) -> str:
+    if static_habilitado and _static_sirve_css():
+        try:
+            return f'<link rel="stylesheet" href="{publicar("tema", hoja.css.encode("utf-8"), "css")}">'
+        except OSError:
+            pass
+    return f"<style>{hoja.css}</style>"
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""Prueba de carga: N clientes simulados recorren las 7 pantallas a la vez.
+
+Cada cliente es un ``AppTest`` (la app real, sin navegador ni red) que hace lo
+que haría una persona: llena el formulario de perfil, marca condiciones, carga
+peso y presupuesto, agrega referidos, elige un programa y pide la descarga en
+la pantalla 6, y ajusta cantidades en la 7. Cada interacción es un rerun y se
+cronometra.
+
+Cada cliente corre en su propio proceso (spawn, un proceso nuevo por
+cliente), como si cada uno tuviera su servidor detrás de un balanceador; todos
+escriben en la misma base SQLite. AppTest no sirve para sesiones simultáneas
+en un mismo proceso: cada run instala y después borra el ``Runtime`` global
+de Streamlit, y dos clientes en hilos se pisan (widgets que no aparecen,
+``KeyError '$$ID-…'``). Por eso esta prueba no mide lo que comparten las
+sesiones de un mismo servidor (caches, GIL); sí la app completa bajo carga de
+CPU, disco y memoria. ``--procesos`` limita cuántos clientes corren a la vez
+(por defecto todos; con menos, el tiempo total incluye el calentamiento de los
+procesos que entran después); cada proceso usa un solo worker de exportación.
+
+Reporta throughput (clientes y reruns por segundo, del primer cliente que
+empieza al último que termina), percentiles de latencia de rerun por paso y
+memoria por sesión (cuánto crece el RSS de un proceso ya calentado con su
+sesión). Las latencias incluyen lo que agrega AppTest (armar y leer el árbol
+de elementos), así que sirven para comparar versiones de la app entre sí, no
+como tiempo absoluto de un navegador real.
+
+Uso:  python benchmarks/carga_sesiones.py [--clientes 20] [--procesos N] [--pausa-ms 0]
+                                          [--semilla 0] [--json resultado.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parents[1] / "APP Evaluacion" / "App evaluacion V134.py"
+
+NOMBRES = ["Ana", "Luis", "María", "Jorge", "Lucía", "Pedro", "Rosa", "Diego"]
+
+
+def _rss_mb() -> float:
+    # RSS actual (Linux); si no hay /proc, el pico
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _uno(lista, label: str):
+    for w in lista:
+        if w.label == label:
+            return w
+    raise LookupError(label)
+
+
+class Cliente:
+    def __init__(self, n: int, semilla: int, pausa_s: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = random.Random(semilla * 100_003 + n)
+        self.n = n
+        self.pausa_s = pausa_s
+        self.at = AppTest.from_file(str(APP), default_timeout=120)
+        self.tiempos = []     # (paso, ms)
+
+    def _rerun(self, paso: str, accion=None, correr=None):
+        if self.pausa_s:
+            time.sleep(self.rng.uniform(0, 2 * self.pausa_s))
+        t = time.perf_counter()
+        if correr is not None:
+            correr()
+        else:
+            (accion() if accion else self.at).run()
+        self.tiempos.append((paso, (time.perf_counter() - t) * 1000))
+        if self.at.exception:
+            raise RuntimeError(f"cliente {self.n}, {paso}: {self.at.exception[0].message}")
+
+    def _enviar_componente(self, clave: str, valor: dict, boton: str | None = None):
+        # AppTest no habla con el iframe: al rerun se le agrega el mismo
+        # WidgetState que manda el navegador cuando el componente envía su valor
+        # (dentro de un st.form, junto con el botón que envía el formulario)
+        if boton:
+            self.at.button(key=boton).click()
+        comp = next(c for c in self.at.get("component_instance") if c.key == clave)
+        estados = self.at._tree.get_widget_states()
+        w = estados.widgets.add()
+        w.id = comp.proto.id
+        w.json_value = json.dumps(valor)
+        self.at._run(estados)
+
+    def _siguiente(self, paso: int):
+        self._rerun(f"p{paso} siguiente", lambda: self.at.button(key=f"next_{paso}").click())
+
+    def recorrer(self):
+        at, rng = self.at, self.rng
+        self._rerun("inicio")
+
+        # 1) perfil (formulario)
+        nombre = f"{rng.choice(NOMBRES)} {self.n}"
+        _uno(at.text_input, "¿Cuál es tu nombre completo?").input(nombre)
+        _uno(at.text_input, "¿Cuál es tu correo electrónico?").input(f"cliente{self.n}@ejemplo.com")
+        _uno(at.text_input, "¿En que ciudad vives?").input("Lima")
+        _uno(at.selectbox, "¿Cuál es tu género?").set_value(rng.choice(["HOMBRE", "MUJER"]))
+        paises = _uno(at.selectbox, "Selecciona tu país").options
+        _uno(at.selectbox, "Selecciona tu país").set_value(rng.choice(paises))
+        for meta in rng.sample(["Perder Peso", "Aumentar Masa Muscular", "Mejorar Salud", "Aumentar Energía"], 2):
+            _uno(at.checkbox, meta).check()
+        self._rerun("p1 enviar", _uno(at.button, "Guardar y continuar ➡️").click)
+        # go() cambia el paso dentro del submit: la pantalla 2 aparece en el rerun siguiente
+        self._rerun("p1→p2")
+
+        # 2) estilo de vida (formulario): condiciones y objetivos, se envían con "Siguiente"
+        for cond in rng.sample(["¿Estreñimiento?", "¿Colesterol Alto?", "¿Baja Energía?", "¿Gastritis?",
+                                "¿Dolor Articular?", "¿Ansiedad por comer?"], 3):
+            _uno(at.checkbox, cond).check()
+        at.text_input(key="obj_compromiso").input(str(rng.randint(6, 10)))
+        self._siguiente(2)
+
+        # 3) presupuesto y composición (un formulario): los montos y lo que se
+        # ajustó en la calculadora del navegador llegan juntos con "Siguiente"
+        for k in ("presu_comida", "presu_snacks", "presu_bebidas"):
+            at.number_input(key=k).set_value(round(rng.uniform(5, 80), 1))
+        final = {"altura_cm": rng.randint(150, 195), "peso_kg": round(rng.uniform(50, 110), 1), "peso_lb": 0.0,
+                 "grasa_pct": rng.randint(12, 40)}
+        self._rerun("p3 siguiente", correr=lambda: self._enviar_componente("calculadora_composicion", final, "next_3"))
+
+        # 4) resultados
+        self._siguiente(4)
+
+        # 5) referidos (formulario)
+        for i in range(rng.randint(1, 3)):
+            _uno(at.text_input, "¿A quién te gustaría regalarle esta evaluación?").input(f"Referido {i}")
+            _uno(at.text_input, "¿Cuál es su número de teléfono?").input(f"9{rng.randint(10**7, 10**8 - 1)}")
+            self._rerun("p5 referido", _uno(at.button, "Agregar").click)
+        self._siguiente(5)
+
+        # 6) elegir programa y pedir la descarga
+        programa = rng.choice(["program_batido", "program_batido_te", "program_chupapanza"])
+        self._rerun("p6 elegir", at.button(key=programa).click)
+        self._rerun("p6 descarga", at.button(key="preparar_export").click)
+        # la pantalla 6 no tiene "Siguiente": se pasa a la 7 desde el menú lateral (también con un rerun extra)
+        self._rerun("p6 menú → p7", _uno(at.button, "7. Nutrición Específica").click)
+        self._rerun("p6→p7")
+
+        # 7) ajustar cantidades en la grilla: AppTest no edita celdas, así que se
+        # escribe el mismo estado que manda el navegador (sólo las filas cambiadas)
+        if not at.dataframe:
+            raise LookupError("pantalla 7 sin grilla de cantidades")
+        editadas = {}
+
+        def editar(fila):
+            editadas[fila] = {"Cantidad": rng.randint(1, 3)}
+            at.session_state["personaliza_cantidades"] = {
+                "edited_rows": dict(editadas), "added_rows": [], "deleted_rows": []}
+            return at
+
+        for fila in rng.sample(range(len(at.dataframe[0].value)), 3):
+            self._rerun("p7 cantidad", lambda fila=fila: editar(fila))
+
+
+def _calentar(semilla: int):
+    # inicializador de cada proceso: un recorrido completo antes de medir (imports,
+    # caches de imágenes y tema ya cargados), así el crecimiento del RSS es sólo
+    # lo que cuesta la sesión medida
+    os.environ.setdefault("METRICAS_ARCHIVO", "")
+    os.environ.setdefault("EXPORT_PROCESOS", "1")
+    import logging
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    Cliente(-1, semilla, 0).recorrer()
+
+
+def _cliente(args) -> dict:
+    n, semilla, pausa_s = args
+    rss_base = _rss_mb()
+    c = Cliente(n, semilla, pausa_s)
+    inicio = time.time()
+    error = None
+    try:
+        c.recorrer()
+    except Exception as e:   # un cliente que falla no frena a los demás
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "inicio": inicio,
+        "fin": time.time(),
+        "tiempos": c.tiempos,
+        "error": error,
+        "mb_por_sesion": _rss_mb() - rss_base,
+        "rss_mb": _rss_mb(),
+    }
+
+
+def _pct(v, p):
+    return v[min(len(v) - 1, int(len(v) * p))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clientes", type=int, default=20, help="clientes en total")
+    ap.add_argument("--procesos", type=int, default=None, help="clientes a la vez (por defecto todos)")
+    ap.add_argument("--pausa-ms", type=float, default=0, help="pausa media entre interacciones (tiempo de lectura)")
+    ap.add_argument("--semilla", type=int, default=0)
+    ap.add_argument("--json", type=Path, default=None)
+    args = ap.parse_args()
+
+    procesos = max(1, min(args.procesos or args.clientes, args.clientes))
+    # la misma base para todos, como varios servidores de la misma app
+    os.environ.setdefault("EVALUACIONES_DB", str(Path(tempfile.mkdtemp()) / "carga.sqlite3"))
+    # las funciones van al pool por el nombre del módulo: en el hijo, AppTest deja
+    # la app instalada como __main__ y "__main__._cliente" ya no existiría
+    import carga_sesiones as este
+    t = time.perf_counter()
+    # maxtasksperchild=1: cada cliente en un proceso nuevo, nunca dos AppTest juntos
+    with multiprocessing.get_context("spawn").Pool(procesos, initializer=este._calentar,
+                                                   initargs=(args.semilla,), maxtasksperchild=1) as pool:
+        resultados = pool.map(este._cliente, [(n, args.semilla, args.pausa_ms / 1000)
+                                              for n in range(args.clientes)], chunksize=1)
+    pared = time.perf_counter() - t
+
+    tiempos = [x for r in resultados for x in r["tiempos"]]
+    completos = sum(r["error"] is None for r in resultados)
+    segundos = max(r["fin"] for r in resultados) - min(r["inicio"] for r in resultados)
+    por_paso = {}
+    for paso, ms in tiempos:
+        por_paso.setdefault(paso, []).append(ms)
+    todos = sorted(ms for _, ms in tiempos)
+
+    resumen = {
+        "clientes": args.clientes, "procesos": procesos, "pausa_ms": args.pausa_ms,
+        "completos": completos,
+        "segundos": segundos,
+        "clientes_por_s": completos / segundos,
+        "reruns": len(todos),
+        "reruns_por_s": len(todos) / segundos,
+        "rerun_p50_ms": statistics.median(todos) if todos else 0,
+        "rerun_p95_ms": _pct(todos, .95) if todos else 0,
+        "rerun_p99_ms": _pct(todos, .99) if todos else 0,
+        "mb_por_sesion": statistics.mean(r["mb_por_sesion"] for r in resultados),
+        "rss_mb_por_proceso": max(r["rss_mb"] for r in resultados),
+        "pasos": {p: {"n": len(v), "p50_ms": statistics.median(v), "p95_ms": _pct(sorted(v), .95),
+                      "p99_ms": _pct(sorted(v), .99)} for p, v in por_paso.items()},
+        "errores": [r["error"] for r in resultados if r["error"]][:5],
+    }
+
+    print(f"{completos}/{args.clientes} clientes completaron las 7 pantallas en {resumen['segundos']:.1f} s "
+          f"({procesos} a la vez, un proceso por cliente; {pared:.1f} s con arranque)")
+    print(f"throughput: {resumen['clientes_por_s']:.2f} clientes/s · {resumen['reruns_por_s']:.1f} reruns/s")
+    print(f"rerun: p50 {resumen['rerun_p50_ms']:.0f} ms · p95 {resumen['rerun_p95_ms']:.0f} ms · "
+          f"p99 {resumen['rerun_p99_ms']:.0f} ms")
+    print(f"memoria: {resumen['mb_por_sesion']:.2f} MB por sesión · RSS {resumen['rss_mb_por_proceso']:.0f} MB por proceso")
+    print(f"\n{'paso':<16} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for p, r in resumen["pasos"].items():
+        print(f"{p:<16} {r['n']:>5} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f}")
+    for e in resumen["errores"]:
+        print("error:", e)
+    if args.json:
+        args.json.write_text(json.dumps(resumen, ensure_ascii=False, indent=1), encoding="utf-8")
+    sys.exit(1 if completos < args.clientes else 0)
+
+
+if __name__ == "__main__":
+    main()
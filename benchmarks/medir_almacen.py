@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Almacén de evaluaciones: costo de guardar() para la UI, escritura en lotes y consultas.
+
+Carga N evaluaciones sintéticas (100.000 por defecto) repartidas en un año y
+varios países, mide cuánto tarda cada guardar() (lo único que ve la UI), cuánto
+tarda el escritor en dejarlas en disco y el tiempo de las consultas por país,
+rango de fechas y email.
+
+Uso:  python benchmarks/medir_almacen.py [--evaluaciones 100000] [--db /tmp/evaluaciones.sqlite3]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+from evaluacion_core.almacen import Almacen  # noqa: E402
+from evaluacion_core import catalogo  # noqa: E402
+from evaluacion_core.combos import P3_FLAGS  # noqa: E402
+
+INICIO = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def estado(i: int, rng: random.Random) -> dict:
+    pais = rng.choice(list(catalogo.actual().paises))
+    return {
+        "datos": {"nombre": f"Cliente {i}", "email": f"cliente{i}@ejemplo.com", "movil": "999999999",
+                  "ciudad": "Lima", "fecha_nac": f"{rng.randint(1950, 2005)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                  "genero": rng.choice(["HOMBRE", "MUJER"]), "altura_cm": rng.randint(150, 195),
+                  "peso_kg": round(rng.uniform(50, 120), 1), "grasa_pct": rng.randint(10, 40)},
+        "estilo_vida": {"desayuno_h": "8am", "que_desayunas": "pan", "presu_comida": rng.randint(5, 50)},
+        "metas": {"perder_peso": True, "masa_muscular": rng.random() < .3, "otros": ""},
+        "flags": {k: rng.random() < .2 for k in P3_FLAGS},
+        "valoracion_contactos": [{"nombre": f"Ref {j}", "movil": "9"} for j in range(rng.randint(0, 3))],
+        "combo_elegido": {"titulo": "Batido", "items": ["Batido"], "precio_regular": 207,
+                          "descuento_pct": 5, "precio_final": 197},
+        "country_name": pais,
+        "currency_symbol": catalogo.config_pais(pais).currency_symbol,
+    }
+
+
+def _ms(f):
+    t = time.perf_counter()
+    r = f()
+    return (time.perf_counter() - t) * 1000, r
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--evaluaciones", type=int, default=100_000)
+    ap.add_argument("--db", type=Path, default=None)
+    args = ap.parse_args()
+
+    db = args.db or Path(tempfile.mkdtemp()) / "evaluaciones.sqlite3"
+    rng = random.Random(0)
+    estados = [estado(i, rng) for i in range(args.evaluaciones)]
+    paso = timedelta(days=365) / args.evaluaciones
+
+    alm = Almacen(db, cola_max=args.evaluaciones + 1)
+    latencias = []
+    t0 = time.perf_counter()
+    for i, e in enumerate(estados):
+        t = time.perf_counter_ns()
+        alm.guardar(f"ev{i}", e, cuando=INICIO + i * paso)
+        latencias.append((time.perf_counter_ns() - t) / 1000)
+    encolado = time.perf_counter() - t0
+    alm.vaciar()
+    total = time.perf_counter() - t0
+    est = alm.estadisticas()
+
+    latencias.sort()
+    print(f"{args.evaluaciones:,} evaluaciones -> {db} ({db.stat().st_size / 1e6:.0f} MB)")
+    print(f"guardar() (lo que espera la UI): p50 {statistics.median(latencias):.1f} µs · "
+          f"p99 {latencias[int(len(latencias) * .99)]:.1f} µs · máx {latencias[-1]:.0f} µs")
+    print(f"encolar todo {encolado:.2f} s · en disco {total:.2f} s · {args.evaluaciones / total:,.0f} evaluaciones/s "
+          f"· {est['lotes']} lotes · {est['errores']} errores")
+
+    pais = "Perú"
+    medio = (INICIO + timedelta(days=180)).isoformat()
+    dia_sig = (INICIO + timedelta(days=181)).isoformat()
+    consultas = [
+        ("contar(pais)", lambda: alm.contar(pais)),
+        ("iterar(pais, un día)", lambda: sum(1 for _ in alm.iterar(pais=pais, desde=medio, hasta=dia_sig))),
+        ("iterar(un día, todos)", lambda: sum(1 for _ in alm.iterar(desde=medio, hasta=dia_sig))),
+        ("iterar(email)", lambda: sum(1 for _ in alm.iterar(email=f"Cliente{args.evaluaciones // 2}@ejemplo.com"))),
+    ]
+    for nombre, f in consultas:
+        ms, n = _ms(f)
+        print(f"  {nombre:<24} {ms:8.2f} ms  ({n:,} filas)")
+    with alm.conexion() as con:
+        for sql in ("SELECT COUNT(*) FROM evaluaciones WHERE pais = ?",
+                    "SELECT id FROM evaluaciones WHERE email = ?",
+                    "SELECT id FROM evaluaciones WHERE creada >= ? AND creada < ?"):
+            plan = con.execute(f"EXPLAIN QUERY PLAN {sql}", ("x",) * sql.count("?")).fetchall()
+            print(f"  plan: {plan[0][-1]}")
+    alm.cerrar()
+
+
+if __name__ == "__main__":
+    main()
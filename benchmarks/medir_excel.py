@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Excel de una evaluación: xlsxwriter directo vs el camino anterior con pandas.
+
+Para cada variante mide la latencia por exportación (p50/p95, workbook completo
+en memoria), lo que asigna cada exportación (tracemalloc: pico y total de
+bloques) y el costo del primer import. Antes de medir compara el contenido de
+los dos workbooks parte por parte (todo el XML salvo docProps/core.xml, que
+lleva la hora de creación).
+
+Uso:  python benchmarks/medir_excel.py [--repeticiones 300]
+"""
+import argparse
+import io
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from evaluacion_core import exportacion  # noqa: E402
+from medir_almacen import estado  # noqa: E402
+
+
+def excel_pandas(e: dict) -> bytes:
+    """Lo que hacía exportacion.excel_bytes antes: un DataFrame por hoja."""
+    import pandas as pd
+
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+        for nombre, columnas, filas in exportacion.hojas(e):
+            pd.DataFrame(filas, columns=columnas).to_excel(writer, index=False, sheet_name=nombre)
+    return buf.getvalue()
+
+
+def _partes(xlsx: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(xlsx)) as z:
+        return {n: z.read(n) for n in z.namelist() if n != "docProps/core.xml"}
+
+
+def _estados(n: int):
+    rng = random.Random(0)
+    estados = [estado(i, rng) for i in range(n)]
+    # casos borde: sin combo ni referidos, vacíos, referidos con columnas distintas
+    estados.append({"datos": {}, "combo_elegido": None, "valoracion_contactos": []})
+    estados.append({**estados[0], "valoracion_contactos": [{"nombre": "A"}, {"telefono": "1", "relacion": None}]})
+    return estados
+
+
+def _import_ms(modulo: str) -> float:
+    cod = f"import time; t=time.perf_counter(); import {modulo}; print((time.perf_counter()-t)*1000)"
+    return float(subprocess.run([sys.executable, "-c", cod], capture_output=True, text=True, check=True).stdout)
+
+
+def _medir(f, estados, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        e = estados[i % len(estados)]
+        t = time.perf_counter()
+        f(e)
+        tiempos.append((time.perf_counter() - t) * 1000)
+    tiempos.sort()
+
+    tracemalloc.start()
+    picos, bloques = [], []
+    for e in estados[:50]:
+        tracemalloc.reset_peak()
+        antes = tracemalloc.take_snapshot()
+        f(e)
+        despues = tracemalloc.take_snapshot()
+        picos.append(tracemalloc.get_traced_memory()[1])
+        bloques.append(sum(s.count_diff for s in despues.compare_to(antes, "filename") if s.count_diff > 0))
+    tracemalloc.stop()
+    return (statistics.median(tiempos), tiempos[int(len(tiempos) * .95)],
+            statistics.median(picos) / 1024, statistics.median(bloques))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=300)
+    args = ap.parse_args()
+
+    estados = _estados(200)
+    distintos = [i for i, e in enumerate(estados)
+                 if _partes(exportacion.excel_bytes(e)) != _partes(excel_pandas(e))]
+    print(f"contenido: {len(estados) - len(distintos)}/{len(estados)} workbooks idénticos a los de pandas"
+          + (f" (distintos: {distintos[:10]})" if distintos else ""))
+
+    print(f"primer import: xlsxwriter {_import_ms('xlsxwriter'):.0f} ms · pandas {_import_ms('pandas'):.0f} ms")
+    print(f"{'variante':<12} {'p50 ms':>8} {'p95 ms':>8} {'pico KiB':>9} {'bloques nuevos':>15}")
+    for nombre, f in (("xlsxwriter", exportacion.excel_bytes), ("pandas", excel_pandas)):
+        f(estados[0])   # calentar imports
+        p50, p95, pico, bloques = _medir(f, estados, args.repeticiones)
+        print(f"{nombre:<12} {p50:>8.2f} {p95:>8.2f} {pico:>9.0f} {bloques:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
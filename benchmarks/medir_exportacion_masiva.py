@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Exportación masiva: tiempo y memoria pico por formato y cantidad de evaluaciones.
+
+Cada medición corre en un proceso aparte para que el pico de memoria (ru_maxrss)
+sea sólo el de esa exportación. Las evaluaciones salen de un generador que repite
+1.000 evaluaciones sintéticas (las de medir_almacen) con ids y fechas distintas:
+así el millón no depende de cargar antes un SQLite de varios GB. Con --db se
+lee de un almacén real en su lugar.
+
+Uso:  python benchmarks/medir_exportacion_masiva.py [--cantidades 10000 100000 1000000]
+                                                    [--formatos xlsx csv parquet] [--db evaluaciones.sqlite3]
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+DISTINTAS = 1_000
+
+
+def _sinteticas(n: int):
+    from evaluacion_core.exportacion import hojas
+    from medir_almacen import INICIO, estado
+
+    rng = random.Random(0)
+    base = []
+    for i in range(DISTINTAS):
+        e = estado(i, rng)
+        base.append((e["country_name"], e["datos"]["email"], e["datos"]["nombre"],
+                     {h: {"columnas": c, "filas": f} for h, c, f in hojas(e)}))
+    paso = timedelta(days=365) / n
+    for i in range(n):
+        pais, email, nombre, contenido = base[i % DISTINTAS]
+        yield {"id": f"ev{i}", "creada": (INICIO + i * paso).isoformat(timespec="seconds"),
+               "pais": pais, "email": email, "nombre": nombre, "hojas": contenido}
+
+
+def _hijo(formato: str, n: int, salida: Path, db: Path | None):
+    from evaluacion_core.exportacion_masiva import exportar
+
+    if db:
+        from evaluacion_core.almacen import Almacen
+        alm = Almacen(db, pool=1)
+        fuente = alm.iterar()
+    else:
+        fuente = _sinteticas(n)
+    t = time.perf_counter()
+    conteo = exportar(fuente, salida, formato)
+    s = time.perf_counter() - t
+    tam = salida.stat().st_size if salida.is_file() else sum(p.stat().st_size for p in salida.iterdir())
+    print(json.dumps({"s": s, "filas": conteo, "bytes": tam,
+                      "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cantidades", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--formatos", nargs="+", default=["xlsx", "csv", "parquet"])
+    ap.add_argument("--db", type=Path, default=None)
+    ap.add_argument("--hijo", nargs=3, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.hijo:
+        formato, n, salida = args.hijo
+        _hijo(formato, int(n), Path(salida), args.db)
+        return
+
+    cantidades = [0] if args.db else args.cantidades
+    tmp = Path(tempfile.mkdtemp())
+    print(f"{'formato':<8} {'evaluaciones':>12} {'s':>8} {'evals/s':>9} {'MB salida':>10} {'RSS pico MB':>12}")
+    for formato in args.formatos:
+        for n in cantidades:
+            salida = tmp / (f"{formato}_{n}.xlsx" if formato == "xlsx" else f"{formato}_{n}")
+            cmd = [sys.executable, __file__, "--hijo", formato, str(n), str(salida)]
+            if args.db:
+                cmd += ["--db", str(args.db)]
+            r = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+            evals = r["filas"]["Perfil"]
+            print(f"{formato:<8} {evals:>12,} {r['s']:>8.1f} {evals / r['s']:>9,.0f} "
+                  f"{r['bytes'] / 1e6:>10.1f} {r['rss_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Descargas simultáneas: workbook en línea (hilo de la página) vs pool de procesos.
+
+Simula N sesiones que terminan a la vez (un evento en vivo) y piden su Excel:
+cada sesión es un hilo. En línea, cada una construye su workbook en su propio
+hilo (compiten por el GIL). Con el pool, cada una sólo llama a solicitar() y
+hace polling cada 50 ms, como el fragmento de la pantalla 6.
+
+Mide cuánto queda ocupado el hilo de cada sesión (lo que congela su página),
+cuándo tiene cada una su archivo y la contrapresión con la cola llena.
+
+Uso:  python benchmarks/medir_exportador.py [--sesiones 40] [--procesos 2] [--cola-max 32]
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from evaluacion_core import exportacion, trabajos  # noqa: E402
+from medir_almacen import estado  # noqa: E402
+
+
+def _pct(v, p):
+    v = sorted(v)
+    return v[min(len(v) - 1, int(len(v) * p))]
+
+
+def _correr(sesiones, f):
+    ocupado, listo = [0.0] * len(sesiones), [0.0] * len(sesiones)
+    inicio = threading.Barrier(len(sesiones) + 1)
+
+    def sesion(i, e):
+        inicio.wait()
+        t0 = time.perf_counter()
+        ocupado[i] = f(i, e)
+        listo[i] = (time.perf_counter() - t0) * 1000
+
+    hilos = [threading.Thread(target=sesion, args=(i, e)) for i, e in enumerate(sesiones)]
+    for h in hilos:
+        h.start()
+    t = time.perf_counter()
+    inicio.wait()
+    for h in hilos:
+        h.join()
+    return ocupado, listo, (time.perf_counter() - t) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sesiones", type=int, default=40)
+    ap.add_argument("--procesos", type=int, default=trabajos.PROCESOS)
+    ap.add_argument("--cola-max", type=int, default=trabajos.COLA_MAX)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    sesiones = [estado(i, rng) for i in range(args.sesiones)]
+    exportacion.excel_bytes(sesiones[0])   # imports
+
+    def en_linea(i, e):
+        t = time.perf_counter()
+        exportacion.excel_bytes(e)
+        return (time.perf_counter() - t) * 1000
+
+    exp = trabajos.Exportador(args.procesos, args.cola_max, resultados_max=args.sesiones)
+    exp.solicitar("calentar", exportacion.excel_bytes, sesiones[0])
+    while exp.resultado("calentar") is None:
+        time.sleep(0.05)
+
+    def en_pool(i, e):
+        ocupado = 0.0
+        while True:
+            t = time.perf_counter()
+            s = exp.solicitar(i, exportacion.excel_bytes, e)
+            ocupado += (time.perf_counter() - t) * 1000
+            if s == trabajos.LISTO:
+                return ocupado
+            time.sleep(0.05)
+
+    print(f"{args.sesiones} sesiones a la vez · pool de {args.procesos} procesos, cola máx {args.cola_max}")
+    print(f"{'modo':<10} {'hilo ocupado p50/p95 ms':>24} {'archivo listo p50/p95 ms':>25} {'total ms':>9}")
+    for nombre, f in (("en línea", en_linea), ("pool", en_pool)):
+        ocupado, listo, total = _correr(sesiones, f)
+        print(f"{nombre:<10} {statistics.median(ocupado):>11.2f} / {_pct(ocupado, .95):<10.2f} "
+              f"{statistics.median(listo):>11.0f} / {_pct(listo, .95):<11.0f} {total:>9.0f}")
+    x = exp.estadisticas()
+    print(f"pool: {x['terminados']} terminados · {x['rechazados']} solicitudes rechazadas por cola llena · "
+          f"espera en cola p50 {x['espera_p50_ms']:.0f} ms / p95 {x['espera_p95_ms']:.0f} ms")
+    exp.cerrar()
+
+
+if __name__ == "__main__":
+    main()
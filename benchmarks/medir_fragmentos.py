@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Trabajo del script por interacción: rerun completo vs sólo la zona (st.fragment).
+
+Elegir un programa, marcar el PDM (pantalla 6) o cambiar una cantidad en la
+grilla (pantalla 7) antes re-ejecutaba la página entera; ahora sólo su zona
+(``_zona_programas`` / ``_render_personaliza_programa``). AppTest no sabe
+re-ejecutar un fragmento solo (cada interacción es un rerun completo), así que
+de cada interacción se toman los dos tramos que ya registra
+``evaluacion_core.tiempos``:
+
+- ``rerun``: lo que costaba la interacción antes (toda la página);
+- la zona: lo que cuesta ahora (lo único que se re-ejecuta en el navegador).
+
+Uso:  python benchmarks/medir_fragmentos.py [--repeticiones 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+APP = APP_DIR / "App evaluacion V134.py"
+sys.path.insert(0, str(APP_DIR))
+
+from evaluacion_core import tiempos  # noqa: E402
+
+PROGRAMAS = ("program_batido", "program_batido_te", "program_chupapanza")
+
+
+def _medir(at, accion, zona: str):
+    tiempos.REGISTRO.limpiar()
+    accion()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    filas = tiempos.REGISTRO.resumen()
+    return filas["rerun"]["total_ms"], filas[zona]["total_ms"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=20)
+    args = ap.parse_args()
+
+    os.environ.setdefault("EVALUACIONES_DB", str(Path(tempfile.mkdtemp()) / "fragmentos.sqlite3"))
+    os.environ.setdefault("METRICAS_ARCHIVO", "")
+    import logging
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=120)
+    at.run()
+    at.session_state["step"] = 6
+    at.run()
+
+    medidas = {"p6 elegir programa": [], "p6 PDM": [], "p7 cantidad": []}
+    for i in range(args.repeticiones):
+        medidas["p6 elegir programa"].append(_medir(
+            at, at.button(key=PROGRAMAS[i % 3]).click().run, "_zona_programas"))
+        medidas["p6 PDM"].append(_medir(
+            at, at.checkbox(key="checkbox_pdm_key").set_value(i % 2 == 0).run, "_zona_programas"))
+
+    at.session_state["step"] = 7
+    at.run()
+    filas = len(at.dataframe[0].value)
+    for i in range(args.repeticiones):
+        def editar(i=i):
+            at.session_state["personaliza_cantidades"] = {
+                "edited_rows": {i % filas: {"Cantidad": i % 4}}, "added_rows": [], "deleted_rows": []}
+            at.run()
+        medidas["p7 cantidad"].append(_medir(at, editar, "_render_personaliza_programa"))
+
+    print(f"{'interacción':<20} {'antes ms':>9} {'ahora ms':>9} {'mejora':>7}   (mediana de {args.repeticiones})")
+    for nombre, pares in medidas.items():
+        antes = statistics.median(a for a, _ in pares)
+        ahora = statistics.median(z for _, z in pares)
+        print(f"{nombre:<20} {antes:>9.2f} {ahora:>9.2f} {antes / ahora:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Peso de imágenes que reciben los pasos 3, 4 y 6, con originales y con derivados.
+
+Reproduce lo que hace st.image con cada entrada: una ruta JPEG/PNG que cabe
+en el ancho se envía tal cual; si es más ancha se reescala y recodifica (q90);
+una imagen PIL siempre se recodifica (JPEG q100 si es opaca, PNG si no).
+Antes, los pasos 3 y 6 pasaban objetos PIL; ahora pasan la ruta del derivado.
+
+Uso:  python optimizar_assets.py && python benchmarks/medir_imagenes.py
+"""
+import io
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+from PIL import Image  # noqa: E402
+
+import assets  # noqa: E402
+
+ANCHO_MAX_STREAMLIT = 2 * 730   # MAXIMUM_CONTENT_WIDTH de st.image
+
+# (archivo, cómo lo recibía st.image antes, ancho fijo)
+PASO3 = [("imagen_grasa_corporal.png", "pil", None)]
+PASO4 = [(f, "ruta", None) for f in (
+    "jessiyroi.jpg", "alexisylyn.jpg", "nicolasyscarlett.jpg", "wagnerysonia.jpg",
+    "mayraymariaantonieta.jpg", "reynaldoyandreina.jpg", "aldoycristina.jpg")]
+PASO6 = [(f, "pil", None) for f in ("Batido.jpg", "Batidoyte.jpg", "Batidoychupapanza.jpg")] + [
+    (f"icons/{f}", "ruta", 56) for f in (
+        "entrenamiento.png", "coachingcontinuo.png", "whatsapp.png",
+        "diariodecomidas.png", "suplementacion.png", "llamadaclientes.png")]
+
+
+def _guardar(im, formato, calidad):
+    buf = io.BytesIO()
+    if formato == "JPEG" and im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGB")
+    im.save(buf, format=formato, quality=calidad)
+    return len(buf.getvalue())
+
+
+def bytes_enviados(p: Path, modo: str, ancho) -> int:
+    crudo = p.read_bytes()
+    im = Image.open(io.BytesIO(crudo))
+    formato = "PNG" if im.mode in ("RGBA", "LA", "P") else "JPEG"
+    objetivo = ancho or ANCHO_MAX_STREAMLIT
+    if im.width > objetivo:
+        alto = int(im.height * objetivo / im.width)
+        return _guardar(im.resize((objetivo, alto), Image.BILINEAR), formato, 90)
+    if modo == "pil":
+        return _guardar(im, formato, 100)
+    return len(crudo) if im.format == formato else _guardar(im, formato, 90)
+
+
+def main():
+    anchos = {"imagen_grasa_corporal.png": assets.ANCHO_COMPLETO}
+    for nombre, lista in (("paso 3", PASO3), ("paso 4", PASO4), ("paso 6", PASO6)):
+        antes = despues = 0
+        for rel, modo, ancho in lista:
+            destino = ancho or anchos.get(rel) or (assets.ANCHO_TARJETA if rel.startswith("Batido") else assets.ANCHO_COMPLETO)
+            antes += bytes_enviados(APP_DIR / rel, modo, ancho)
+            # ahora todas las pantallas pasan la ruta del derivado
+            despues += bytes_enviados(assets.resolver(rel, destino), "ruta", ancho)
+        print(f"{nombre}: {antes:>10,} -> {despues:>9,} bytes  (x{antes / max(despues, 1):.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Tiempo de import de evaluacion_core (cada caso en un intérprete nuevo).
+
+Comprueba además que importar el núcleo no carga streamlit, pandas ni PIL.
+
+Uso:  python benchmarks/medir_import.py [--repeticiones 5]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+
+CASOS = [
+    ("catálogo + precios + combos", "import evaluacion_core.catalogo, evaluacion_core.precios, evaluacion_core.combos"),
+    ("composición (numpy)", "import evaluacion_core.composicion"),
+    ("exportación", "import evaluacion_core.exportacion"),
+    ("referencia: streamlit", "import streamlit"),
+]
+
+_SONDA = """
+import sys, time
+t = time.perf_counter()
+{codigo}
+ms = (time.perf_counter() - t) * 1000
+pesados = [m for m in ("streamlit", "pandas", "PIL") if m in sys.modules]
+print(f"{{ms:.1f}} {{','.join(pesados) or '-'}}")
+"""
+
+
+def medir(codigo: str, repeticiones: int):
+    tiempos, cargados = [], "-"
+    for _ in range(repeticiones):
+        out = subprocess.run([sys.executable, "-c", _SONDA.format(codigo=codigo)], cwd=APP_DIR,
+                             capture_output=True, text=True, check=True).stdout.split()
+        tiempos.append(float(out[0]))
+        cargados = out[1]
+    return sorted(tiempos)[len(tiempos) // 2], cargados
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=5)
+    args = ap.parse_args()
+    for nombre, codigo in CASOS:
+        ms, cargados = medir(codigo, args.repeticiones)
+        print(f"{nombre:<30} {ms:8.1f} ms   módulos pesados cargados: {cargados}")
+
+
+if __name__ == "__main__":
+    main()
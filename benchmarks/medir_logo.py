@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Bytes que el membrete (logo) añade a cada rerun, antes y después.
+
+Uso:  python benchmarks/medir_logo.py
+"""
+import base64
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+import branding  # noqa: E402
+from estaticos import STATIC_URL, nombre_con_hash  # noqa: E402
+
+
+def main():
+    logo = APP_DIR / "logo.png"
+    b64 = base64.b64encode(logo.read_bytes()).decode()
+    antes = branding.html_logo(f"data:image/png;base64,{b64}")
+    png = branding.logo_reducido(logo)
+    inline = branding.html_logo("data:image/png;base64," + base64.b64encode(png).decode())
+    estatico = branding.html_logo(f"{STATIC_URL}/{nombre_con_hash('logo', png, 'png')}")
+
+    print(f"logo.png original:              {logo.stat().st_size:>10,} bytes")
+    print(f"derivado {branding.LOGO_ANCHO_PX * branding.LOGO_ESCALA}px (una vez/proceso): {len(png):>10,} bytes")
+    print("por rerun (markdown enviado):")
+    print(f"  antes  (base64 del original): {len(antes.encode()):>10,} bytes")
+    print(f"  ahora  (sin static serving):  {len(inline.encode()):>10,} bytes")
+    print(f"  ahora  (app/static + hash):   {len(estatico.encode()):>10,} bytes")
+
+
+if __name__ == "__main__":
+    main()
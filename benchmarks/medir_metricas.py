@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Filas/segundo del motor de métricas por lotes frente a las funciones escalares.
+
+Genera N clientes sintéticos (1.000.000 por defecto), corre
+``metricas.calcular`` sobre todos y, como referencia, las funciones de un
+cliente en un bucle sobre una muestra.
+
+Uso:  python benchmarks/medir_metricas.py [--filas 1000000] [--muestra 20000]
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+from evaluacion_core import metricas  # noqa: E402
+
+HOY = date(2026, 1, 1)
+
+
+def clientes(n: int, semilla: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    nac = np.datetime64("1950-01-01") + rng.integers(0, 365 * 55, n).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "peso_kg": np.round(rng.uniform(40, 160, n), 1),
+        "altura_cm": rng.integers(140, 205, n).astype(float),
+        "fecha_nac": np.datetime_as_string(nac),
+        "genero": rng.choice(["HOMBRE", "MUJER"], n),
+        "masa_muscular": rng.random(n) < 0.3,
+        "rendimiento": rng.random(n) < 0.1,
+    })
+
+
+def escalar(df: pd.DataFrame):
+    """Lo que costaría con las funciones de la app, cliente por cliente."""
+    for r in df.itertuples(index=False):
+        e = metricas.edad_desde_fecha([r.fecha_nac], HOY)[0]
+        alta = r.masa_muscular or r.rendimiento
+        metricas.imc(r.peso_kg, r.altura_cm)
+        metricas.req_hidratacion_ml(r.peso_kg)
+        metricas.req_proteina(r.genero, alta, r.peso_kg)
+        metricas.bmr_mifflin(r.genero, r.peso_kg, r.altura_cm, max(e, 16))
+        metricas.rango_grasa_ref(r.genero, e)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--filas", type=int, default=1_000_000)
+    ap.add_argument("--muestra", type=int, default=20_000)
+    args = ap.parse_args()
+
+    df = clientes(args.filas)
+    t = time.perf_counter()
+    metricas.calcular(df, HOY)
+    lote = time.perf_counter() - t
+
+    muestra = df.head(args.muestra)
+    t = time.perf_counter()
+    escalar(muestra)
+    uno = time.perf_counter() - t
+
+    print(f"lote    {args.filas:>10,} filas  {lote:8.2f} s  {args.filas / lote:>12,.0f} filas/s")
+    print(f"escalar {args.muestra:>10,} filas  {uno:8.2f} s  {args.muestra / uno:>12,.0f} filas/s")
+    print(f"aceleración: x{(args.filas / lote) / (args.muestra / uno):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
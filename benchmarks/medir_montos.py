@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Formato de montos: Formateador por moneda vs el formatear_monto anterior.
+
+El anterior (copiado abajo) leía la moneda de session_state en cada llamada y
+encadenaba cuatro ``replace``; ``_mon`` de la app además lo envolvía en dos
+lecturas de la sesión. Se miden, por monto y con las monedas del catálogo:
+
+- anterior: ``formatear_monto_anterior(v, símbolo, sep)``;
+- por monto: ``precios.formateador(símbolo, sep)(v)`` (incluye buscarlo en el registro);
+- lote: ``formateador.lote(columna)``, dividido por el largo de la columna.
+
+Antes de medir verifica que las tres variantes den el mismo texto.
+
+Uso:  python benchmarks/medir_montos.py [--montos 10000] [--columna 10]
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+from evaluacion_core import catalogo, precios  # noqa: E402
+
+
+def formatear_monto_anterior(v: float | int, symbol: str = "S/", sep: str = ".") -> str:
+    s = f"{int(round(v)):,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if sep != ".":
+        s = s.replace(".", sep)
+    return f"{symbol}{s}"
+
+
+def _ns(f, n: int) -> float:
+    # el mejor de 5, en ns por llamada de f (f ya recorre n montos)
+    return min(timeit.repeat(f, number=1, repeat=5)) * 1e9 / n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--montos", type=int, default=10_000)
+    ap.add_argument("--columna", type=int, default=10, help="largo de cada lote (la tabla de la pantalla 7 tiene 10)")
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    monedas = sorted({(p.currency_symbol, p.thousands_sep) for p in catalogo.actual().paises.values()})
+    montos = [rng.choice([rng.uniform(0, 500), rng.uniform(0, 2e5), rng.randint(0, 10**7)]) for _ in range(args.montos)]
+    columnas = [montos[i:i + args.columna] for i in range(0, len(montos), args.columna)]
+
+    for simbolo, sep in monedas:
+        ref = [formatear_monto_anterior(v, simbolo, sep) for v in montos]
+        f = precios.formateador(simbolo, sep)
+        assert [f(v) for v in montos] == ref, (simbolo, sep)
+        assert [t for c in columnas for t in f.lote(c)] == ref, (simbolo, sep)
+    print(f"salida idéntica en {len(monedas)} monedas × {len(montos):,} montos")
+
+    print(f"\n{'moneda':<8} {'anterior ns':>12} {'por monto ns':>13} {'lote ns':>9} {'mejora':>7}")
+    for simbolo, sep in monedas:
+        anterior = _ns(lambda: [formatear_monto_anterior(v, simbolo, sep) for v in montos], len(montos))
+        por_monto = _ns(lambda: [precios.formateador(simbolo, sep)(v) for v in montos], len(montos))
+        f = precios.formateador(simbolo, sep)
+        lote = _ns(lambda: [f.lote(c) for c in columnas], len(montos))
+        print(f"{simbolo + ' ' + repr(sep):<8} {anterior:>12.0f} {por_monto:>13.0f} {lote:>9.0f} "
+              f"{anterior / lote:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Costo de una foto subida por el cliente: antes vs ingesta única (subidas.py).
+
+Antes, pantalla 3 y 4 hacían ``Image.open`` del archivo subido en cada rerun y
+lo pasaban a st.image como objeto PIL, que Streamlit recodifica (JPEG q100) a
+resolución completa; la sesión además retenía el archivo original. Ahora se
+procesa una vez al subirla y cada rerun sólo envía el derivado ya listo.
+
+Con fotos sintéticas de celular (EXIF girado) se mide:
+
+- ms de servidor por rerun y bytes de imagen que salen en cada rerun;
+- ms de la ingesta (una sola vez por foto; la segunda subida es un hit);
+- lo que queda en la sesión (original vs derivado).
+
+Uso:  python benchmarks/medir_subidas.py [--repeticiones 10]
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+import assets  # noqa: E402
+import subidas  # noqa: E402
+
+# (megapíxeles, ancho, alto) de cámaras de celular comunes
+FOTOS = [(8, 3264, 2448), (12, 4032, 3024), (48, 8000, 6000)]
+
+
+def _foto(ancho: int, alto: int) -> bytes:
+    """JPEG parecido a una foto (degradado + grano), girado por EXIF como los de celular."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:alto // 4, 0:ancho // 4]
+    base = np.stack([x * 255 / x.max(), y * 255 / y.max(), (x + y) * 127 / (x + y).max()], axis=-1)
+    img = Image.fromarray(base.astype(np.uint8)).resize((ancho, alto), Image.BILINEAR)
+    grano = rng.normal(0, 6, (alto, ancho, 3))
+    img = Image.fromarray(np.clip(np.asarray(img) + grano, 0, 255).astype(np.uint8))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85, exif=exif)
+    return buf.getvalue()
+
+
+def _antes(crudo: bytes) -> bytes:
+    # lo que hacía cada rerun: Image.open + st.image(PIL) -> JPEG q100 a tamaño completo
+    from streamlit.elements.lib.image_utils import _pil_to_bytes
+    return _pil_to_bytes(Image.open(io.BytesIO(crudo)), "JPEG")
+
+
+def _ms(f, n: int):
+    tiempos, r = [], None
+    for _ in range(n):
+        t = time.perf_counter()
+        r = f()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return statistics.median(tiempos), r
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=10)
+    args = ap.parse_args()
+    n = args.repeticiones
+
+    print(f"{'foto':<16} {'MB':>5} | {'antes ms/rerun':>14} {'KB/rerun':>9} | "
+          f"{'ingesta ms':>10} {'hit ms':>7} {'ahora ms/rerun':>14} {'KB/rerun':>9} | sesión antes → ahora")
+    for mpx, ancho, alto in FOTOS:
+        crudo = _foto(ancho, alto)
+        ms_antes, enviado = _ms(lambda: _antes(crudo), n)
+
+        almacen = subidas.AlmacenSubidas()
+        t = time.perf_counter()
+        foto = almacen.ingerir(crudo, assets.ANCHO_COMPLETO)
+        ms_ingesta = (time.perf_counter() - t) * 1000
+        ms_hit, _ = _ms(lambda: almacen.ingerir(crudo, assets.ANCHO_COMPLETO), n)
+        fotos = {"foto_resultado_usuario": foto}
+        ms_ahora, datos = _ms(lambda: fotos["foto_resultado_usuario"].datos, n)
+
+        print(f"{mpx:>2} MP {ancho}x{alto:<5} {len(crudo) / subidas.MB:>5.1f} | {ms_antes:>14.1f} "
+              f"{len(enviado) / 1024:>9.0f} | {ms_ingesta:>10.1f} {ms_hit:>7.1f} {ms_ahora:>14.4f} "
+              f"{len(datos) / 1024:>9.0f} | {len(crudo) / 1024:.0f} KB → {foto.peso / 1024:.0f} KB "
+              f"({foto.ancho}x{foto.alto})")
+    print("\nahora/rerun: la sesión ya tiene el derivado (sin decodificar ni hashear); "
+          "'hit ms' = subir otra vez la misma foto (sólo SHA-256).")
+
+
+if __name__ == "__main__":
+    main()
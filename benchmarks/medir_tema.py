@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Bytes de CSS que cada rerun envía al navegador, antes y después de compilar el tema.
+
+Uso:  python benchmarks/medir_tema.py
+"""
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+sys.path.insert(0, str(APP_DIR))
+
+import tema  # noqa: E402
+from estaticos import STATIC_URL, nombre_con_hash  # noqa: E402
+
+
+def main():
+    hoja = tema.compilar()
+    inline = f"<style>{hoja.css}</style>"
+    link = f'<link rel="stylesheet" href="{STATIC_URL}/{nombre_con_hash("tema", hoja.css.encode(), "css")}">'
+
+    print(f"tema.css (fuente, antes repartida en 5-6 <style> por rerun): {hoja.bytes_fuente:>8,} bytes")
+    print(f"minificado:                                               {len(hoja.css.encode()):>8,} bytes")
+    print("por rerun (markdown enviado):")
+    print(f"  ahora  (sin static serving): {len(inline.encode()):>8,} bytes")
+    print(f"  ahora  (app/static + hash):  {len(link.encode()):>8,} bytes")
+
+
+if __name__ == "__main__":
+    main()
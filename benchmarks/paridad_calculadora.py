@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Paridad de la calculadora del navegador (formulas.js) con las fórmulas de Python.
+
+Corre ``componentes/composicion/formulas.js`` con node y compara, caso por caso:
+
+- ``redondear``/``entero`` contra ``round()`` de Python (empates exactos incluidos);
+- IMC, hidratación, proteína y BMR en toda la grilla de entradas de la
+  pantalla 3 (peso 0-400 kg de a 0.1, altura 50-250 cm) contra
+  ``evaluacion_core.metricas``, y en una muestra aleatoria contra las funciones
+  de un cliente de ``evaluacion_core.composicion``;
+- los párrafos de resultados (``composicion.narrativa``) en una muestra aleatoria.
+
+Termina con código 1 si algún caso difiere.
+
+Uso:  python benchmarks/paridad_calculadora.py [--muestra 20000] [--semilla 0]
+"""
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parents[1] / "APP Evaluacion"
+FORMULAS = APP_DIR / "componentes" / "composicion" / "formulas.js"
+sys.path.insert(0, str(APP_DIR))
+
+from evaluacion_core import composicion, metricas  # noqa: E402
+
+PESOS = np.arange(4001) / 10          # lo que puede salir del input de 0.1 en 0.1
+ALTURAS = np.arange(50, 251)
+GENEROS = ("HOMBRE", "MUJER")
+
+# Recibe los casos por stdin y devuelve lo que calcula formulas.js
+_NODE = r"""
+const C = require(process.argv[1]);
+let entrada = "";
+process.stdin.on("data", (d) => entrada += d);
+process.stdin.on("end", () => {
+  const q = JSON.parse(entrada);
+  const pesos = Array.from({length: 4001}, (_, i) => i / 10);
+  const alturas = Array.from({length: 201}, (_, i) => 50 + i);
+  const out = {};
+  out.redondeo = q.redondeo.map((x) => [C.entero(x), C.redondear(x, 1), C.redondear(x, 2)]);
+  out.imc = [];
+  for (const p of pesos) for (const a of alturas) out.imc.push(C.imc(p, a));
+  out.agua = pesos.map(C.reqHidratacionMl);
+  out.proteina = [];
+  for (const g of ["HOMBRE", "MUJER"]) for (const alta of [false, true]) for (const p of pesos) out.proteina.push(C.reqProteina(g, alta, p));
+  out.bmr = [];
+  for (const g of ["HOMBRE", "MUJER"]) for (const p of pesos) for (const a of alturas) out.bmr.push(C.bmrMifflin(g, p, a, q.edad_grilla));
+  out.clientes = q.clientes.map((c) => {
+    const r = C.resultados(c.peso_kg, c.altura_cm, c.genero, c.edad, c.metas);
+    return {r: r, narrativa: C.narrativa(r, c.grasa_pct, c.genero, c.edad_ref, c.rmin, c.rmax, q.categorias)};
+  });
+  process.stdout.write(JSON.stringify(out));
+});
+"""
+
+
+def _clientes(n: int, rng: random.Random):
+    hoy = date.today()
+    casos = []
+    for _ in range(n):
+        fecha = date(rng.randint(hoy.year - 80, hoy.year - 14), rng.randint(1, 12), rng.randint(1, 28)).isoformat()
+        genero = rng.choice(GENEROS)
+        edad_ref = composicion.edad_desde_fecha(fecha) or 30
+        rmin, rmax = composicion.rango_grasa_tabla(genero, edad_ref)
+        casos.append({
+            "peso_kg": rng.choice([rng.randint(0, 4000) / 10, float(rng.randint(30, 150))]),
+            "altura_cm": rng.randint(50, 250),
+            "grasa_pct": rng.randint(8, 45),
+            "genero": genero,
+            "edad": composicion.edad_aproximada(fecha),
+            "edad_ref": edad_ref,
+            "rmin": rmin,
+            "rmax": rmax,
+            "metas": {"masa_muscular": rng.random() < .3, "rendimiento": rng.random() < .2},
+        })
+    return casos
+
+
+def _redondeos(rng: random.Random):
+    # empates exactos (x.5, x.25, x.125), casi-empates (0.45, 2.675) y valores cualesquiera
+    xs = [k / 8 for k in range(-400, 4000)] + [k / 100 + .005 for k in range(2000)]
+    xs += [k / 20 for k in range(2000)] + [rng.uniform(-500, 5000) for _ in range(20000)]
+    return xs
+
+
+def _comparar(nombre: str, esperado, obtenido) -> int:
+    esperado = [x.item() if hasattr(x, "item") else x for x in esperado]
+    malos = [(i, e, o) for i, (e, o) in enumerate(zip(esperado, obtenido)) if e != o]
+    if len(esperado) != len(obtenido):
+        malos.append(("largo", len(esperado), len(obtenido)))
+    estado = "idénticos" if not malos else f"{len(malos):,} DISTINTOS"
+    print(f"{nombre:<22} {len(esperado):>10,} casos  {estado}")
+    for m in malos[:5]:
+        print("   ", m)
+    return len(malos)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--muestra", type=int, default=20_000, help="clientes aleatorios (fórmulas de un cliente y textos)")
+    ap.add_argument("--semilla", type=int, default=0)
+    args = ap.parse_args()
+
+    node = shutil.which("node") or shutil.which("nodejs")
+    if node is None:
+        sys.exit("hace falta node para correr formulas.js")
+
+    rng = random.Random(args.semilla)
+    redondeo = _redondeos(rng)
+    clientes = _clientes(args.muestra, rng)
+    edad_grilla = 37
+    consulta = {"redondeo": redondeo, "clientes": clientes, "edad_grilla": edad_grilla,
+                "categorias": [list(c) for c in composicion.CATEGORIAS_IMC]}
+    proc = subprocess.run([node, "-e", _NODE, str(FORMULAS)], input=json.dumps(consulta),
+                          capture_output=True, text=True, check=True)
+    js = json.loads(proc.stdout)
+
+    p, a = np.meshgrid(PESOS, ALTURAS, indexing="ij")
+    fallas = 0
+    fallas += _comparar("redondeo", [[int(round(x)), round(x, 1), round(x, 2)] for x in redondeo], js["redondeo"])
+    fallas += _comparar("imc (grilla)", metricas.imc(p, a).ravel(), js["imc"])
+    fallas += _comparar("hidratación (grilla)", metricas.req_hidratacion_ml(PESOS), js["agua"])
+    fallas += _comparar("proteína (grilla)", np.concatenate([
+        metricas.req_proteina(g, alta, PESOS) for g in GENEROS for alta in (False, True)]), js["proteina"])
+    fallas += _comparar("bmr (grilla)", np.concatenate([
+        metricas.bmr_mifflin(g, p, a, edad_grilla).ravel() for g in GENEROS]), js["bmr"])
+
+    esperados = [composicion.resultados(c["peso_kg"], c["altura_cm"], c["genero"], c["edad"], c["metas"])
+                 for c in clientes]
+    fallas += _comparar("resultados (cliente)", esperados, [x["r"] for x in js["clientes"]])
+    fallas += _comparar("textos (cliente)", [
+        composicion.narrativa(r, c["grasa_pct"], c["genero"], c["edad_ref"], c["rmin"], c["rmax"])
+        for r, c in zip(esperados, clientes)], [x["narrativa"] for x in js["clientes"]])
+
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
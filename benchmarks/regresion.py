@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""Suite de regresión de rendimiento con línea base guardada en JSON.
+
+Mide tres grupos y compara contra ``benchmarks/baseline.json``:
+
+- núcleo: las funciones de evaluacion_core que usan las pantallas (cotización,
+  formato de montos, nombre mostrado, combos, workbook, métricas).
+- script: los helpers del script de la app llamados dentro de un run real de
+  Streamlit (AppTest) con la sesión de un cliente de ejemplo: ``_mon``,
+  ``_display_name``, ``_precio_programa_html_y_payload``, ``_combos_por_flags``,
+  ``_excel_bytes``.
+- pantallas: cada pantalla (1 a 7) con esa misma sesión, dentro de un rerun
+  real. Cuenta sólo el tramo ``pantallaN`` que registra evaluacion_core.tiempos
+  (no lo que agrega AppTest, que en un rerun completo pesa más que la pantalla
+  misma), y la memoria es el pico de tracemalloc dentro de ese mismo tramo.
+
+De cada caso guarda el tiempo (el mejor de varias tandas, en ms por llamada) y
+el pico de memoria asignada por llamada (tracemalloc, KiB). Los tiempos se
+normalizan con un lazo de calibración en Python puro, así una máquina más lenta
+no cuenta como regresión; igual conviene generar la línea base en la misma
+máquina (o CI) donde se corre la comparación.
+
+Falla (exit 1) si un caso es más de ``--umbral`` más lento (o usa más de
+``--umbral-memoria`` más memoria) que la línea base; cambios por debajo de un
+piso absoluto no cuentan (ruido de casos muy chicos). La línea base es la
+mediana de varias corridas y, al comparar, los grupos que salen lentos se
+vuelven a medir antes de fallar: en una máquina compartida un pico aislado no
+es una regresión.
+
+Uso:  python benchmarks/regresion.py                 # comparar
+      python benchmarks/regresion.py --guardar       # escribir la línea base
+      python benchmarks/regresion.py --solo pantallas --umbral 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "APP Evaluacion"
+APP = APP_DIR / "App evaluacion V134.py"
+BASELINE = BENCH_DIR / "baseline.json"
+sys.path.insert(0, str(APP_DIR))
+
+GRUPOS = ("nucleo", "script", "pantallas")
+UMBRAL = 0.30            # +30 % de tiempo
+UMBRAL_MEMORIA = 0.30
+PISO_MS = 0.005          # diferencias menores a 5 µs no cuentan
+PISO_KIB = 16
+TANDAS = 7
+CORRIDAS_BASE = 3      # --guardar: mediana de 3 corridas
+REINTENTOS = 2         # comparar: re-medir hasta 2 veces lo que salió lento
+TANDA_MIN_S = 0.05
+
+# sesión de ejemplo: un cliente que llegó a la pantalla 7 con datos en todas las pantallas
+ESTADO_EJEMPLO = {
+    "datos": {"nombre": "Cliente Ejemplo", "email": "cliente@ejemplo.com", "movil": "999999999",
+              "ciudad": "Lima", "fecha_nac": "1988-05-17", "genero": "MUJER",
+              "altura_cm": 165, "peso_kg": 72.5, "grasa_pct": 30},
+    "estilo_vida": {"desayuno_h": "8am", "que_desayunas": "pan", "presu_comida": 25.0},
+    "metas": {"perder_peso": True, "tonificar": False, "masa_muscular": False, "energia": True,
+              "rendimiento": False, "salud": True, "otros": ""},
+    "flags": {"p3_estrenimiento": True, "p3_baja_energia": True, "p3_dolor_articular": True},
+    "valoracion_contactos": [{"nombre": "Ref 1", "telefono": "911", "distrito": "Miraflores", "relacion": "amiga"},
+                             {"nombre": "Ref 2", "telefono": "922", "distrito": "Surco", "relacion": "primo"}],
+    "combo_elegido": {"titulo": "Batido + Te", "items": ["Batido", "Té de Hierbas"], "precio_regular": 380,
+                      "descuento_pct": 10, "precio_final": 342},
+    "country_name": "Perú",
+    "currency_symbol": "S/",
+}
+
+
+# =========================
+# Medición
+# =========================
+def calibracion() -> float:
+    """ms de un lazo fijo en Python puro (mide la máquina, no la app)."""
+    def lazo():
+        d = {}
+        for i in range(20_000):
+            d[i % 97] = d.get(i % 97, 0) + len(str(i))
+        return d
+    return medir(lazo)[0]
+
+
+def medir(f, tandas: int = TANDAS, tanda_min_s: float = TANDA_MIN_S):
+    """(mejor ms por llamada, pico KiB de una llamada)."""
+    f()     # calentar
+    n = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(n):
+            f()
+        s = time.perf_counter() - t
+        if s >= tanda_min_s or n >= 1 << 20:
+            break
+        n = max(n * 2, int(n * tanda_min_s / max(s, 1e-9)))
+    mejor = s / n
+    for _ in range(tandas - 1):
+        t = time.perf_counter()
+        for _ in range(n):
+            f()
+        mejor = min(mejor, (time.perf_counter() - t) / n)
+    tracemalloc.start()
+    f()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return mejor * 1000, pico / 1024
+
+
+# =========================
+# Grupo: núcleo
+# =========================
+def casos_nucleo():
+    import numpy as np
+    import pandas as pd
+
+    from evaluacion_core import catalogo, composicion, cotizaciones, exportacion, metricas, precios
+    from evaluacion_core.catalogo import config_pais
+    from evaluacion_core.combos import combos_por_flags
+
+    pais = config_pais("Perú")
+    prec = pais.precios
+    fmt = precios.formateador(pais.currency_symbol, pais.thousands_sep)
+    cat = catalogo.actual()
+    flags = ESTADO_EJEMPLO["flags"]
+    rng = np.random.default_rng(0)
+    n = 10_000
+    df = pd.DataFrame({
+        "genero": rng.choice(["HOMBRE", "MUJER"], n), "peso_kg": rng.uniform(45, 130, n).round(1),
+        "altura_cm": rng.integers(145, 200, n), "fecha_nac": pd.to_datetime("1950-01-01")
+        + pd.to_timedelta(rng.integers(0, 20000, n), unit="D"),
+        "masa_muscular": rng.random(n) < .3, "rendimiento": rng.random(n) < .2,
+    })
+    hoy = pd.Timestamp("2026-06-01")
+    return {
+        "formatear_monto": lambda: precios.formatear_monto(12345.6, "S/", "."),
+        "formateador_lote_10": lambda: precios.formateador("S/", ".").lote(list(prec.values())),
+        "nombre_mostrado": lambda: [cat.nombres_mostrados(c, ["p3_dolor_articular"]).lista(["Golden Beverage", "NRG"])
+                                    for c in ("PE", "CA", "MX", "ES-PEN")],
+        "cotizar_programa": lambda: precios.cotizar_programa("Batido + Te", ["Batido", "Té de Hierbas"], 10,
+                                                             prec, "PE", fmt),
+        "cotizaciones_buscar": lambda: cotizaciones.buscar("Perú", "Batido + Te", ["Batido", "Té de Hierbas"], 10),
+        "combos_por_flags": lambda: combos_por_flags(flags, cat.nombres_mostrados("PE")),
+        "total_personalizado": lambda: precios.total_personalizado({"Batido": 2, "Fibra Activa": 1}, prec, "PE"),
+        "composicion_cliente": lambda: (composicion.imc(72.5, 165), composicion.bmr_mifflin("MUJER", 72.5, 165, 38),
+                                        composicion.req_proteina("MUJER", ESTADO_EJEMPLO["metas"], 72.5),
+                                        composicion.edad_desde_fecha("1988-05-17")),
+        "metricas_lote_10k": lambda: metricas.calcular(df, hoy),
+        "hojas": lambda: exportacion.hojas(ESTADO_EJEMPLO),
+        "excel_bytes": lambda: exportacion.excel_bytes(ESTADO_EJEMPLO),
+    }
+
+
+def grupo_nucleo() -> dict:
+    return {nombre: dict(zip(("ms", "kib"), medir(f))) for nombre, f in casos_nucleo().items()}
+
+
+# =========================
+# Grupos que corren dentro de Streamlit (AppTest)
+# =========================
+# Script que AppTest ejecuta como si fuera la app: carga el script real sin
+# correr main() (run_name != "__main__"), arma la sesión de ejemplo y mide.
+_SCRIPT_HELPERS = '''
+import json, runpy, sys
+import streamlit as st
+sys.path.insert(0, {bench!r})
+import regresion as r
+
+g = runpy.run_path({app!r}, run_name="regresion")
+g["init_state"]()
+g["_apply_country_config"](r.ESTADO_EJEMPLO["country_name"])
+for k in ("datos", "estilo_vida", "metas", "valoracion_contactos", "combo_elegido"):
+    st.session_state[k] = r.ESTADO_EJEMPLO[k]
+for k, v in r.ESTADO_EJEMPLO["flags"].items():
+    st.session_state[k] = v
+
+casos = {{
+    "_mon": lambda: g["_mon"](12345.6),
+    "_display_name": lambda: [g["_display_name"](p) for p in ("Golden Beverage", "NRG", "Batido", "Beta Heart")],
+    "_nombres_texto": lambda: g["_nombres"]().texto(("Golden Beverage", "NRG", "Batido", "Beta Heart")),
+    "_precio_programa_html_y_payload": lambda: g["_precio_programa_html_y_payload"]("Batido + Te", ["Batido", "Té de Hierbas"], 10),
+    "_combos_por_flags": lambda: g["_combos_por_flags"](),
+    "_excel_bytes": lambda: g["_excel_bytes"](),
+}}
+res = {{k: dict(zip(("ms", "kib"), r.medir(f))) for k, f in casos.items()}}
+with open({salida!r}, "w") as fh:
+    json.dump(res, fh)
+'''
+
+
+def grupo_script() -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    salida = Path(tempfile.mkdtemp()) / "script.json"
+    at = AppTest.from_string(_SCRIPT_HELPERS.format(bench=str(BENCH_DIR), app=str(APP), salida=str(salida)),
+                             default_timeout=600)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return json.loads(salida.read_text())
+
+
+def _tramo_con_memoria(tiempos, picos: dict):
+    """``tiempos.tramo`` que además anota el pico de memoria de cada pantalla.
+
+    AppTest asigna por su cuenta (compilar el script, armar el árbol) más que
+    cualquier pantalla; el pico se toma sólo entre la entrada y la salida del
+    tramo ``pantallaN``, con tracemalloc ya activo.
+    """
+    class Tramo(tiempos.tramo):
+        __slots__ = ("base",)
+
+        def __enter__(self):
+            if self.nombre.startswith("pantalla") and tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                self.base = tracemalloc.get_traced_memory()[0]
+            return super().__enter__()
+
+        def __exit__(self, *exc):
+            if self.nombre.startswith("pantalla") and tracemalloc.is_tracing():
+                picos[self.nombre] = (tracemalloc.get_traced_memory()[1] - self.base) / 1024
+            return super().__exit__(*exc)
+    return Tramo
+
+
+def grupo_pantallas(reruns: int = TANDAS) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    from evaluacion_core import tiempos
+
+    picos = {}
+    original = tiempos.tramo
+    tiempos.tramo = _tramo_con_memoria(tiempos, picos)    # el script lo busca en cada rerun
+    try:
+        return _pantallas(AppTest, tiempos, picos, reruns)
+    finally:
+        tiempos.tramo = original
+
+
+def _pantallas(AppTest, tiempos, picos: dict, reruns: int) -> dict:
+    at = AppTest.from_file(str(APP), default_timeout=120)
+    at.run()
+    ss = at.session_state
+    for k in ("datos", "estilo_vida", "metas", "valoracion_contactos", "combo_elegido"):
+        ss[k] = ESTADO_EJEMPLO[k]
+    for k, v in ESTADO_EJEMPLO["flags"].items():
+        ss[k] = v
+
+    res = {}
+    for paso in range(1, 8):
+        ss["step"] = paso
+        at.run()    # calentar (imágenes, caches)
+        ms = []
+        for _ in range(reruns):
+            tiempos.REGISTRO.limpiar()
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"pantalla {paso}: {at.exception[0].message}")
+            ms.append(tiempos.REGISTRO.resumen()[f"pantalla{paso}"]["total_ms"])
+        tracemalloc.start()
+        at.run()
+        tracemalloc.stop()
+        res[f"pantalla{paso}"] = {"ms": min(ms), "kib": picos[f"pantalla{paso}"]}
+    return res
+
+
+# =========================
+# Comparación
+# =========================
+def comparar(actual: dict, base: dict, umbral: float, umbral_mem: float):
+    escala = actual["calibracion_ms"] / base["calibracion_ms"]
+    filas, regresiones = [], []
+    for grupo, casos in actual["grupos"].items():
+        for caso, r in casos.items():
+            b = base["grupos"].get(grupo, {}).get(caso)
+            if b is None:
+                filas.append((grupo, caso, r, None, "nuevo"))
+                continue
+            esperado_ms = b["ms"] * escala
+            marca = []
+            if r["ms"] > esperado_ms * (1 + umbral) and r["ms"] - esperado_ms > PISO_MS:
+                marca.append(f"tiempo +{(r['ms'] / esperado_ms - 1) * 100:.0f}%")
+            if r["kib"] > b["kib"] * (1 + umbral_mem) and r["kib"] - b["kib"] > PISO_KIB:
+                marca.append(f"memoria +{(r['kib'] / b['kib'] - 1) * 100:.0f}%")
+            if marca:
+                regresiones.append((grupo, caso, ", ".join(marca)))
+            filas.append((grupo, caso, r, {"ms": esperado_ms, "kib": b["kib"]}, " · ".join(marca) or "ok"))
+    return filas, regresiones
+
+
+def _correr(grupos, medidores) -> dict:
+    cal = calibracion()
+    resultado = {g: medidores[g]() for g in grupos}
+    # después de medir la CPU ya está caliente: el menor de los dos
+    return {"calibracion_ms": min(cal, calibracion()), "grupos": resultado}
+
+
+def _combinar(corridas, como) -> dict:
+    """Una corrida por caso con ``como`` (min, median) de ms y KiB, en la calibración de la primera."""
+    cal = corridas[0]["calibracion_ms"]
+    grupos = {}
+    for g, casos in corridas[0]["grupos"].items():
+        grupos[g] = {}
+        for caso in casos:
+            ms = [c["grupos"][g][caso]["ms"] * cal / c["calibracion_ms"] for c in corridas]
+            kib = [c["grupos"][g][caso]["kib"] for c in corridas]
+            grupos[g][caso] = {"ms": como(ms), "kib": como(kib)}
+    return {"calibracion_ms": cal, "grupos": grupos}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--guardar", action="store_true", help="escribir la línea base en vez de comparar")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--solo", choices=GRUPOS, nargs="+", default=list(GRUPOS))
+    ap.add_argument("--umbral", type=float, default=UMBRAL)
+    ap.add_argument("--umbral-memoria", type=float, default=UMBRAL_MEMORIA)
+    ap.add_argument("--corridas", type=int, default=CORRIDAS_BASE,
+                    help="con --guardar: corridas completas (se guarda la mediana de cada caso)")
+    ap.add_argument("--reintentos", type=int, default=REINTENTOS,
+                    help="al comparar: volver a medir los grupos con regresiones (cuenta el mejor)")
+    ap.add_argument("--json", type=Path, default=None, help="guardar también el resultado de esta corrida")
+    args = ap.parse_args()
+
+    os.environ.setdefault("EVALUACIONES_DB", str(Path(tempfile.mkdtemp()) / "regresion.sqlite3"))
+    os.environ.setdefault("METRICAS_ARCHIVO", "")
+    import logging
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    medidores = {"nucleo": grupo_nucleo, "script": grupo_script, "pantallas": grupo_pantallas}
+    info = {"python": platform.python_version(), "maquina": platform.machine(),
+            "creada": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                     capture_output=True, text=True).stdout.strip()}
+
+    if args.guardar:
+        # la mediana de varias corridas: una corrida con suerte no deja una base imposible de alcanzar
+        actual = {**info, **_combinar([_correr(args.solo, medidores) for _ in range(max(args.corridas, 1))],
+                                      statistics.median)}
+        previo = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {"grupos": {}}
+        if set(actual["grupos"]) != set(previo["grupos"]) and "calibracion_ms" in previo:
+            # guardado parcial: los grupos nuevos se llevan a la calibración de la línea base previa
+            escala = previo["calibracion_ms"] / actual["calibracion_ms"]
+            for casos in actual["grupos"].values():
+                for r in casos.values():
+                    r["ms"] *= escala
+            actual = {**previo, "grupos": {**previo["grupos"], **actual["grupos"]}}
+        args.baseline.write_text(json.dumps(actual, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+        print(f"línea base -> {args.baseline} ({sum(len(c) for c in actual['grupos'].values())} casos)")
+        return
+
+    if not args.baseline.exists():
+        sys.exit(f"no hay línea base en {args.baseline}: correr con --guardar")
+    base = json.loads(args.baseline.read_text(encoding="utf-8"))
+    corridas = [_correr(args.solo, medidores)]
+    actual = corridas[0]
+    filas, regresiones = comparar(actual, base, args.umbral, args.umbral_memoria)
+    for _ in range(args.reintentos):
+        if not regresiones:
+            break
+        # una máquina compartida tiene picos: sólo es regresión si se repite
+        grupos = sorted({g for g, _, _ in regresiones}, key=args.solo.index)
+        otra = _correr(grupos, medidores)
+        corridas.append({"calibracion_ms": otra["calibracion_ms"],
+                         "grupos": {**{g: actual["grupos"][g] for g in args.solo}, **otra["grupos"]}})
+        actual = _combinar(corridas, min)
+        filas, regresiones = comparar(actual, base, args.umbral, args.umbral_memoria)
+    if args.json:
+        args.json.write_text(json.dumps({**info, **actual}, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    print(f"calibración {actual['calibracion_ms']:.2f} ms (base {base['calibracion_ms']:.2f} ms, "
+          f"commit base {base.get('commit', '?')}, {len(corridas)} corrida(s))")
+    print(f"{'caso':<42} {'ms':>10} {'base ms':>10} {'KiB':>9} {'base KiB':>9}  estado")
+    for grupo, caso, r, b, estado in filas:
+        bms = f"{b['ms']:.4f}" if b else "-"
+        bkib = f"{b['kib']:.0f}" if b else "-"
+        print(f"{grupo + '/' + caso:<42} {r['ms']:>10.4f} {bms:>10} {r['kib']:>9.0f} {bkib:>9}  {estado}")
+    if regresiones:
+        print(f"\n{len(regresiones)} regresión(es) (umbral tiempo +{args.umbral:.0%}, memoria +{args.umbral_memoria:.0%}):")
+        for grupo, caso, marca in regresiones:
+            print(f"  - {grupo}/{caso}: {marca}")
+        sys.exit(1)
+    print("\nsin regresiones")
+
+
+if __name__ == "__main__":
+    main()